@@ -6,6 +6,7 @@ import keyboard  # 用于键盘事件监听
 import time  # 用于时间相关操作
 import json  # 用于JSON文件操作
 import os  # 用于操作系统相关功能
+from health_bar_kernel import get_hp_percentage  # 血量测量由共享的血条测量内核提供
 
 def load_config():
     """从配置文件加载设置
@@ -124,73 +125,6 @@ def get_color_at_position():
             print("退出颜色获取模式")
             break 
 
-def get_hp_percentage(x1, y1, x2, y2, hp_color_lower, hp_color_upper):
-    """获取指定区域内的血条百分比
-    
-    通过图像处理技术识别并计算血条的剩余百分比。
-    
-    参数:
-        x1, y1 (int): 血条框左上角坐标
-        x2, y2 (int): 血条框右下角坐标
-        hp_color_lower (np.array): 血条颜色的BGR下限 (注意：这里之前文档写的是HSV，但fluent_ui.py传入的是BGR)
-        hp_color_upper (np.array): 血条颜色的BGR上限 (注意：这里之前文档写的是HSV，但fluent_ui.py传入的是BGR)
-    
-    返回:
-        float: 血量百分比（0-100）
-    """
-    # 验证坐标的有效性
-    if x1 == x2 or y1 == y2:
-        print(f"错误：起始坐标({x1},{y1})和结束坐标({x2},{y2})不能相同")
-        return 0
-    if x2 < x1 or y2 < y1:
-        print(f"错误：结束坐标({x2},{y2})x轴、y轴必须大于起始坐标({x1},{y1})")
-        return 0
-        
-    # 截取屏幕指定区域
-    try:
-        screenshot = pyautogui.screenshot(region=(x1, y1, x2-x1, y2-y1))
-        frame = np.array(screenshot)
-        
-        # 转换为OpenCV格式 (原始截图是RGB)
-        frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR) # 从RGB转为BGR
-    
-        # 注意：这里的颜色匹配是在BGR空间进行的，因为fluent_ui.py中取色后直接保存的是BGR范围
-        # 如果期望在HSV空间匹配，则frame_bgr需要先转换为HSV，并且hp_color_lower/upper也应该是HSV格式
-        
-        # 创建血条颜色的掩码 (在BGR空间)
-        mask = cv2.inRange(frame_bgr, hp_color_lower, hp_color_upper)
-        
-        # 调试输出：掩码信息
-        white_pixels = np.sum(mask > 0)
-        total_pixels = mask.size
-        detection_ratio = (white_pixels / total_pixels) * 100 if total_pixels > 0 else 0
-        print(f"检测到的像素比例: {detection_ratio:.2f}% ({white_pixels}/{total_pixels}像素)")
-        
-        # 如果几乎没有检测到任何像素，可能是颜色范围设置不正确
-        if white_pixels < 5:
-            print(f"警告: 几乎没有检测到血条颜色，请检查颜色范围设置: {hp_color_lower} - {hp_color_upper}")
-        
-        # 从右向左扫描血条
-        total_width = x2 - x1
-        hp_end = 0
-        
-        for x in range(total_width-1, -1, -1):
-            column = mask[:, x]
-            if np.any(column > 0):
-                hp_end = x + 1
-                break
-        
-        # 计算血量百分比
-        hp_percentage = (hp_end / total_width) * 100
-        print(f"血条宽度: {hp_end}/{total_width} = {hp_percentage:.1f}%")
-        
-        return hp_percentage
-    except Exception as e:
-        print(f"错误：处理图像时发生异常 - {str(e)}")
-        import traceback
-        traceback.print_exc()  # 打印详细的堆栈跟踪
-        return 0
-
 # 全局变量初始化
 x1, y1 = 100, 100  # 血条左上角默认坐标
 x2, y2 = 300, 120  # 血条右下角默认坐标
@@ -0,0 +1,118 @@
+import cv2
+import numpy as np
+
+from config_defaults import ROI_SETTINGS
+
+
+def refine_bar_roi(frames, hp_color_lower, hp_color_upper, settings=None):
+    """从多帧血条截图中找出血条填充所在的紧凑区域
+
+    校准时框选的区域包含名称、图标和边框等大量非血条像素。
+    合并多帧的颜色掩码后，按行统计填充像素数，取填充最多的一行所在的连续行带作为血条的行范围。
+    列范围从最左侧的填充列到截图的右边缘：血条从左向右填充，左边缘不随血量变化；
+    右边缘则取校准的血条框，细化时队友未必满血，填充的右端不能代表血条的右端。
+
+    参数:
+        frames (list): 同一区域的多帧BGR截图
+        hp_color_lower (array-like): 血条颜色的BGR下限
+        hp_color_upper (array-like): 血条颜色的BGR上限
+        settings (dict): 细化参数，默认使用 ROI_SETTINGS
+
+    返回:
+        tuple: 相对于截图左上角的 (x1, y1, x2, y2)，没有检测到血条时返回None
+    """
+    settings = settings or ROI_SETTINGS
+    frames = [frame for frame in frames if frame is not None and frame.size > 0]
+    if not frames:
+        return None
+
+    lower = np.asarray(hp_color_lower, dtype=np.uint8)
+    upper = np.asarray(hp_color_upper, dtype=np.uint8)
+    combined = None
+    for frame in frames:
+        mask = cv2.inRange(frame, lower, upper) > 0
+        combined = mask if combined is None else (combined | mask)
+
+    row_counts = combined.sum(axis=1)
+    peak_row = int(np.argmax(row_counts))
+    peak = row_counts[peak_row]
+    if peak < settings['min_fill_pixels']:
+        return None
+
+    # 从峰值行向上下扩展，直到行内填充像素明显减少
+    row_threshold = peak * settings['row_fill_ratio']
+    top = peak_row
+    while top > 0 and row_counts[top - 1] >= row_threshold:
+        top -= 1
+    bottom = peak_row
+    while bottom < len(row_counts) - 1 and row_counts[bottom + 1] >= row_threshold:
+        bottom += 1
+
+    columns = np.flatnonzero(combined[top:bottom + 1].any(axis=0))
+    if columns.size == 0:
+        return None
+
+    padding = settings['padding']
+    height, width = combined.shape
+    return (max(0, int(columns[0]) - padding),
+            max(0, top - padding),
+            width,
+            min(height, bottom + 1 + padding))
+
+
+def spread_rows(first, last, count):
+    """在行范围的中间部分均匀选取扫描行
+
+    以行带中心为基准，其余行取在中心上下各四分之一行带高度处，避开容易受边框和抗锯齿影响的边缘行。
+
+    参数:
+        first, last (int): 行带的第一行和最后一行（包含）
+        count (int): 扫描行数（1-3）
+
+    返回:
+        list: 从上到下排列、去重后的行号
+    """
+    center = (first + last) // 2
+    quarter = (last - first) // 4
+    if count <= 1:
+        rows = [center]
+    elif count == 2:
+        rows = [center - quarter, center + quarter]
+    else:
+        rows = [center - quarter, center, center + quarter]
+    return sorted(set(rows))
+
+
+def pick_scanlines(frames, hp_color_lower, hp_color_upper, count, settings=None):
+    """从紧凑区域的多帧截图中选取扫描线模式使用的行
+
+    与 refine_bar_roi 相同，按行统计合并掩码的填充像素，找出血条填充所在的行带，
+    再在行带中部选取 count 行。
+
+    参数:
+        frames (list): 紧凑区域的多帧BGR截图
+        hp_color_lower (array-like): 血条颜色的BGR下限
+        hp_color_upper (array-like): 血条颜色的BGR上限
+        count (int): 扫描行数（1-3）
+        settings (dict): 细化参数，默认使用 ROI_SETTINGS
+
+    返回:
+        list: 相对于截图顶部的行号，没有检测到血条时返回None
+    """
+    settings = settings or ROI_SETTINGS
+    frames = [frame for frame in frames if frame is not None and frame.size > 0]
+    if not frames:
+        return None
+
+    lower = np.asarray(hp_color_lower, dtype=np.uint8)
+    upper = np.asarray(hp_color_upper, dtype=np.uint8)
+    row_counts = None
+    for frame in frames:
+        counts = (cv2.inRange(frame, lower, upper) > 0).sum(axis=1)
+        row_counts = counts if row_counts is None else row_counts + counts
+
+    peak = row_counts.max()
+    if peak < settings['min_fill_pixels']:
+        return None
+    band = np.flatnonzero(row_counts >= peak * settings['row_fill_ratio'])
+    return spread_rows(int(band[0]), int(band[-1]), max(1, min(3, count)))
@@ -0,0 +1,140 @@
+"""血条测量内核基准测试
+
+在合成的血条截图上比较原来的 get_hp_percentage 测量方式（inRange、np.sum 统计像素比例、
+Python 循环从右向左扫描列）、health_bar_kernel 中各个内核以及扫描线模式（3行）的耗时，
+并检查测量结果是否一致。
+合成截图模拟带边框和背景噪声的血条，尺寸覆盖小团队框到大型单人血条。
+截图本身的耗时与内核无关，不计入结果；加 --capture 时额外测量一次真实截图的耗时作为参考。
+
+用法:
+    python benchmark_hp_kernel.py
+    python benchmark_hp_kernel.py --repeat 2000 --capture
+"""
+import sys
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+import health_bar_kernel
+from bar_roi import spread_rows
+
+# (宽, 高)：小团队框、普通队友框、大型血条
+BAR_SIZES = [(60, 6), (170, 12), (400, 30)]
+FILL_LEVELS = [0.0, 0.05, 0.37, 0.8, 1.0]
+HP_COLOR_LOWER = np.array([0, 0, 160], dtype=np.uint8)
+HP_COLOR_UPPER = np.array([80, 80, 255], dtype=np.uint8)
+
+
+def make_bar(width, height, fill, rng):
+    """生成一张合成血条截图
+
+    参数:
+        width, height (int): 截图尺寸
+        fill (float): 填充比例（0-1）
+        rng (np.random.Generator): 随机数生成器
+
+    返回:
+        np.ndarray: BGR截图
+    """
+    frame = rng.integers(20, 70, size=(height, width, 3), dtype=np.uint8)  # 暗色背景噪声
+    fill_end = int(round(width * fill))
+    if fill_end > 0:
+        bar = frame[1:height - 1, :fill_end]
+        bar[..., 0] = rng.integers(10, 50, size=bar.shape[:2])
+        bar[..., 1] = rng.integers(10, 50, size=bar.shape[:2])
+        bar[..., 2] = rng.integers(190, 240, size=bar.shape[:2])
+    frame[0, :] = frame[-1, :] = (90, 90, 90)  # 上下边框
+    return frame
+
+
+def legacy_measure(frame_bgr, lower, upper):
+    """原 get_hp_percentage 的测量方式（去掉了打印），作为基准"""
+    mask = cv2.inRange(frame_bgr, lower, upper)
+    white_pixels = np.sum(mask > 0)
+    total_pixels = mask.size
+    _ = (white_pixels / total_pixels) * 100 if total_pixels > 0 else 0
+    total_width = mask.shape[1]
+    hp_end = 0
+    for x in range(total_width - 1, -1, -1):
+        if np.any(mask[:, x] > 0):
+            hp_end = x + 1
+            break
+    return hp_end / total_width * 100
+
+
+def time_call(func, frames, repeat):
+    """测量 func 在所有截图上的平均单次耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            func(frame, HP_COLOR_LOWER, HP_COLOR_UPPER)
+    return (time.perf_counter() - start) * 1e6 / (repeat * len(frames))
+
+
+def kernel_measure(kernel):
+    """把内核包装成与 legacy_measure 相同的接口（返回血量百分比）"""
+    def measure(frame_bgr, lower, upper):
+        fill_end, _ = kernel(frame_bgr, lower, upper)
+        return fill_end / frame_bgr.shape[1] * 100
+    return measure
+
+
+def scanline_measure(frame_bgr, lower, upper):
+    """扫描线模式（当前内核，3行），各行不一致时退回整个区域"""
+    rows = spread_rows(0, frame_bgr.shape[0] - 1, 3)
+    result = health_bar_kernel.measure_rows(frame_bgr, lower, upper, rows, 2)
+    if result is None:
+        result = health_bar_kernel.get_kernel(health_bar_kernel.get_kernel_name())(frame_bgr, lower, upper)
+    return result[0] / frame_bgr.shape[1] * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比较血条测量内核的耗时')
+    parser.add_argument('--repeat', type=int, default=500, help='每种尺寸的重复次数')
+    parser.add_argument('--capture', action='store_true', help='额外测量一次真实截图的耗时')
+    args = parser.parse_args()
+    repeat = max(1, args.repeat)
+
+    candidates = [('get_hp_percentage', legacy_measure)]
+    for name in health_bar_kernel.available_kernels():
+        kernel = health_bar_kernel.get_kernel(name)
+        if kernel is None:
+            print(f"内核 {name} 不可用（缺少依赖），已跳过")
+            continue
+        candidates.append((name, kernel_measure(kernel)))
+    health_bar_kernel.configure_kernel()
+    candidates.append((f'scanline/{health_bar_kernel.get_kernel_name()}', scanline_measure))
+
+    rng = np.random.default_rng(0)
+    print(f"{'尺寸':<12}" + ''.join(f"{name + '(us)':>22}" for name, _ in candidates))
+    mismatches = 0
+    for width, height in BAR_SIZES:
+        frames = [make_bar(width, height, fill, rng) for fill in FILL_LEVELS]
+        # 先各调用一次：检查结果一致，同时完成 JIT 编译等预热
+        expected = [legacy_measure(frame, HP_COLOR_LOWER, HP_COLOR_UPPER) for frame in frames]
+        for name, func in candidates[1:]:
+            results = [func(frame, HP_COLOR_LOWER, HP_COLOR_UPPER) for frame in frames]
+            for fill, want, got in zip(FILL_LEVELS, expected, results):
+                if abs(want - got) > 1e-6:
+                    mismatches += 1
+                    print(f"[{name}] {width}x{height} 填充 {fill:.0%}: 期望 {want:.2f}%，得到 {got:.2f}%")
+        timings = [time_call(func, frames, repeat) for _, func in candidates]
+        print(f"{f'{width}x{height}':<12}" + ''.join(f"{t:>22.2f}" for t in timings))
+
+    if args.capture:
+        width, height = BAR_SIZES[1]
+        start = time.perf_counter()
+        health_bar_kernel.capture_frame(0, 0, width, height)
+        print(f"\n参考：截取一个 {width}x{height} 区域耗时 {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    if mismatches:
+        print(f"\n有 {mismatches} 个测量结果与 get_hp_percentage 不一致")
+        return 1
+    print("\n所有内核的测量结果与 get_hp_percentage 一致")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""图像预处理档位基准测试
+
+在已标注的职业图标截图集上，分别用 fast / balanced / quality 三个预处理档位运行职业图标匹配，
+报告每个档位的预处理耗时、匹配耗时和识别准确率，并可将最优档位写入主配置。
+
+截图集目录结构:
+    crops/
+        labels.json        {"文件名.png": "职业名称", ...}
+        文件名.png ...
+
+用法:
+    python benchmark_preprocess.py crops
+    python benchmark_preprocess.py crops --repeat 5 --apply
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+
+def load_labeled_crops(crops_dir):
+    """读取已标注的截图集
+
+    参数:
+        crops_dir (str): 截图集目录，需包含 labels.json
+
+    返回:
+        list: [(文件名, BGR图像, 职业名称), ...]
+    """
+    labels_file = os.path.join(crops_dir, 'labels.json')
+    with open(labels_file, 'r', encoding='utf-8') as f:
+        labels = json.load(f)
+
+    samples = []
+    for filename, profession in labels.items():
+        path = os.path.join(crops_dir, filename)
+        # cv2.imread 不支持中文路径，使用 imdecode 读取
+        image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            print(f"无法读取截图: {path}，已跳过")
+            continue
+        samples.append((filename, image, profession))
+    return samples
+
+
+def benchmark_profile(recognizer, profile, samples, icons, repeat):
+    """测试单个预处理档位
+
+    返回:
+        dict: 包含 profile、accuracy、preprocess_ms（每张截图的平均预处理耗时）和 match_ms（每张截图的平均匹配总耗时）
+    """
+    recognizer.preprocess_profile = profile
+
+    # 单独计时预处理，这部分是档位之间唯一的差别
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, image, _ in samples:
+            recognizer.preprocess_image(image, for_ocr=False)
+    preprocess_ms = (time.perf_counter() - start) * 1000 / (repeat * len(samples))
+
+    correct = 0
+    start = time.perf_counter()
+    for filename, image, expected in samples:
+        profession, score = recognizer.match_profession_icon_with_score(image, icons)
+        if profession == expected:
+            correct += 1
+        else:
+            print(f"[{profile}] {filename}: 期望 {expected}，识别为 {profession} (分数: {score:.3f})")
+    match_ms = (time.perf_counter() - start) * 1000 / len(samples)
+
+    return {
+        'profile': profile,
+        'accuracy': correct / len(samples),
+        'preprocess_ms': preprocess_ms,
+        'match_ms': match_ms
+    }
+
+
+def choose_profile(results):
+    """选择准确率最高的档位，准确率相同时选择最快的档位"""
+    return max(results, key=lambda r: (r['accuracy'], -r['match_ms']))['profile']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比较不同图像预处理档位的耗时和职业识别准确率')
+    parser.add_argument('crops_dir', help='已标注的职业图标截图目录（包含 labels.json）')
+    parser.add_argument('--repeat', type=int, default=3, help='预处理计时的重复次数')
+    parser.add_argument('--apply', action='store_true', help='将最优档位写入主配置的 recognition.preprocess_profile')
+    args = parser.parse_args()
+
+    samples = load_labeled_crops(args.crops_dir)
+    if not samples:
+        print("截图集为空，无法进行基准测试")
+        return 1
+
+    from teammate_recognition import TeammateRecognition, PREPROCESS_PROFILES
+    # 只测试图标预处理和匹配，不调用OCR：识别器的OCR实例在第一次识别名称时才创建，这里不会加载PaddleOCR
+    recognizer = TeammateRecognition()
+    icons = recognizer.load_profession_icons()
+    if not icons:
+        print("没有加载任何职业图标模板，无法进行基准测试")
+        return 1
+
+    results = [benchmark_profile(recognizer, profile, samples, icons, max(1, args.repeat))
+               for profile in PREPROCESS_PROFILES]
+
+    print(f"\n共 {len(samples)} 张截图，{len(icons)} 个职业图标")
+    print(f"{'档位':<10}{'准确率':>10}{'预处理(ms)':>14}{'匹配(ms)':>12}")
+    for r in results:
+        print(f"{r['profile']:<10}{r['accuracy']:>10.1%}{r['preprocess_ms']:>14.2f}{r['match_ms']:>12.2f}")
+
+    best = choose_profile(results)
+    print(f"\n推荐档位: {best}")
+
+    if args.apply:
+        from config_manager import get_config
+        config = get_config()
+        config.set_json('recognition.preprocess_profile', best)
+        config.save_config()
+        print(f"已将预处理档位 {best} 写入主配置")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+import cv2
+import numpy as np
+
+from config_defaults import COLOR_MODEL_SETTINGS
+
+
+def load_color_model_settings():
+    """读取颜色模型设置，配置中缺少的项使用默认值
+
+    返回的是配置管理器的只读视图，配置文件被修改后自动更新
+    """
+    try:
+        from config_manager import get_config
+        return get_config().view('color_model', COLOR_MODEL_SETTINGS)
+    except Exception as e:
+        print(f"加载颜色模型设置失败: {str(e)}")
+        return dict(COLOR_MODEL_SETTINGS)
+
+
+def _chroma(color):
+    """颜色的色度（通道最大值与最小值之差），血条填充通常比背景鲜艳得多"""
+    return float(np.max(color) - np.min(color))
+
+
+def fit_color_model(frames, seed_bgr=None, settings=None):
+    """根据血条区域的多帧截图拟合血条颜色模型
+
+    将所有像素用k-means聚成若干类，与取色像素最接近的一类（没有取色像素时取色度最高的一类）视为血条填充，
+    其余视为背景。对填充像素按通道做高斯拟合，以 均值 ± z·标准差 作为BGR上下限，
+    并用背景像素落入该范围的比例估计误检率。
+
+    参数:
+        frames (list): 血条区域的多帧BGR截图
+        seed_bgr (tuple): 用户选取的血条像素BGR值，可以为None
+        settings (dict): 颜色模型参数，默认使用 COLOR_MODEL_SETTINGS
+
+    返回:
+        dict: 包含 lower、upper（np.uint8数组）、mean、std、fill_ratio、
+              true_positive_rate 和 false_positive_rate；填充像素过少时返回None
+    """
+    settings = settings or COLOR_MODEL_SETTINGS
+    frames = [frame for frame in frames if frame is not None and frame.size > 0]
+    if not frames:
+        return None
+
+    pixels = np.concatenate([frame.reshape(-1, 3) for frame in frames]).astype(np.float32)
+    max_pixels = settings['max_pixels']
+    if len(pixels) > max_pixels:
+        # 均匀抽样，避免区域较大时k-means过慢
+        pixels = pixels[np.linspace(0, len(pixels) - 1, max_pixels).astype(np.int64)]
+
+    clusters = min(settings['clusters'], len(pixels))
+    if clusters < 2:
+        return None
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1.0)
+    _, labels, centers = cv2.kmeans(pixels, clusters, None, criteria, 3, cv2.KMEANS_PP_CENTERS)
+    labels = labels.ravel()
+
+    if seed_bgr is not None:
+        seed = np.asarray(seed_bgr, dtype=np.float32)
+        fill_label = int(np.argmin(np.linalg.norm(centers - seed, axis=1)))
+    else:
+        fill_label = int(np.argmax([_chroma(center) for center in centers]))
+
+    fill = pixels[labels == fill_label]
+    background = pixels[labels != fill_label]
+    if len(fill) < settings['min_fill_pixels']:
+        print(f"血条填充像素过少 ({len(fill)})，无法拟合颜色模型")
+        return None
+
+    mean = fill.mean(axis=0)
+    std = fill.std(axis=0)
+    half_width = np.maximum(settings['z_score'] * std, settings['min_half_width'])
+    lower = np.clip(np.floor(mean - half_width), 0, 255).astype(np.uint8)
+    upper = np.clip(np.ceil(mean + half_width), 0, 255).astype(np.uint8)
+
+    model = {
+        'lower': lower,
+        'upper': upper,
+        'mean': mean.round(1).tolist(),
+        'std': std.round(2).tolist(),
+        'fill_ratio': len(fill) / len(pixels),
+        'true_positive_rate': in_range_ratio(fill, lower, upper),
+        'false_positive_rate': in_range_ratio(background, lower, upper)
+    }
+    print(f"颜色模型: {lower.tolist()} - {upper.tolist()}，"
+          f"命中率 {model['true_positive_rate']:.1%}，预计误检率 {model['false_positive_rate']:.2%}")
+    return model
+
+
+def in_range_ratio(pixels, lower, upper):
+    """计算像素落入BGR范围的比例
+
+    参数:
+        pixels (np.ndarray): N×3 的像素数组
+        lower, upper (array-like): BGR上下限
+
+    返回:
+        float: 比例，没有像素时为0
+    """
+    if len(pixels) == 0:
+        return 0.0
+    inside = np.all((pixels >= lower) & (pixels <= upper), axis=1)
+    return float(inside.mean())
+
+
+def model_summary(model):
+    """返回可写入配置文件的颜色模型统计信息（不含上下限本身）"""
+    return {
+        'mean': model['mean'],
+        'std': model['std'],
+        'true_positive_rate': round(model['true_positive_rate'], 4),
+        'false_positive_rate': round(model['false_positive_rate'], 4)
+    }
+
+
+class AdaptiveColorModel:
+    """在线自适应的血条颜色模型
+
+    游戏的低血量闪烁、增益色调和昼夜光照会让血条颜色慢慢偏离校准时的范围。
+    每次测量后，从已填充部分中取出落在当前范围（外扩一定余量）内的高置信度像素，
+    用有界的指数滑动平均移动颜色范围的中心；范围宽度保持校准值不变。
+
+    护栏:
+        - 每次移动不超过 adapt_max_step
+        - 相对校准中心的总偏移不超过 adapt_max_drift
+        - 血量为0或高置信度像素不足时不更新
+
+    属性:
+        base_lower, base_upper (np.ndarray): 校准时的颜色范围
+        center (np.ndarray): 当前范围中心（浮点BGR）
+        drift (float): 当前中心相对校准中心在各通道上的最大偏移
+    """
+
+    def __init__(self, lower, upper, settings=None):
+        self.settings = settings or COLOR_MODEL_SETTINGS
+        self.base_lower = np.asarray(lower, dtype=np.uint8).copy()
+        self.base_upper = np.asarray(upper, dtype=np.uint8).copy()
+        self.base_center = (self.base_lower.astype(np.float32) + self.base_upper) / 2
+        self.half_width = (self.base_upper.astype(np.float32) - self.base_lower) / 2
+        self.center = self.base_center.copy()
+        self.drift = 0.0
+        self.drift_reported = False
+        self.limit_reported = False
+
+    def matches(self, lower, upper):
+        """判断颜色范围是否仍是创建该模型时的校准范围（用户重新取色后需要重建模型）"""
+        return np.array_equal(self.base_lower, np.asarray(lower)) and np.array_equal(self.base_upper, np.asarray(upper))
+
+    @property
+    def lower(self):
+        return np.clip(np.round(self.center - self.half_width), 0, 255).astype(np.uint8)
+
+    @property
+    def upper(self):
+        return np.clip(np.round(self.center + self.half_width), 0, 255).astype(np.uint8)
+
+    def update(self, frame, hp_percentage):
+        """用一帧测量结果更新颜色范围
+
+        参数:
+            frame (np.ndarray): 测量区域的BGR截图
+            hp_percentage (float): 该帧用当前范围测得的血量百分比
+
+        返回:
+            str: 漂移超过报告阈值或达到上限时返回提示信息，否则返回None
+        """
+        settings = self.settings
+        if frame is None or frame.size == 0 or hp_percentage <= 0:
+            return None
+
+        fill_end = int(round(frame.shape[1] * hp_percentage / 100))
+        if fill_end <= 0:
+            return None
+        pixels = frame[:, :fill_end].reshape(-1, 3).astype(np.float32)
+
+        margin = settings['adapt_search_margin']
+        # 先转为浮点再外扩，避免uint8溢出回绕
+        search_lower = self.lower.astype(np.float32) - margin
+        search_upper = self.upper.astype(np.float32) + margin
+        inside = np.all((pixels >= search_lower) & (pixels <= search_upper), axis=1)
+        if inside.sum() < max(settings['min_fill_pixels'], settings['adapt_min_coverage'] * len(pixels)):
+            return None
+
+        observed = pixels[inside].mean(axis=0)
+        step = np.clip(settings['adapt_rate'] * (observed - self.center),
+                       -settings['adapt_max_step'], settings['adapt_max_step'])
+        max_drift = settings['adapt_max_drift']
+        offset = np.clip(self.center + step - self.base_center, -max_drift, max_drift)
+        self.center = self.base_center + offset
+        self.drift = float(np.max(np.abs(offset)))
+
+        return self._drift_message()
+
+    def _drift_message(self):
+        """根据当前漂移生成一次性的提示信息"""
+        settings = self.settings
+        threshold = settings['drift_report_threshold']
+        if self.drift >= settings['adapt_max_drift']:
+            if not self.limit_reported:
+                self.limit_reported = True
+                return (f"血条颜色漂移已达到上限 {settings['adapt_max_drift']}，"
+                        f"当前范围 {self.lower.tolist()} - {self.upper.tolist()}，建议重新取色")
+            return None
+        if self.drift >= threshold:
+            if not self.drift_reported:
+                self.drift_reported = True
+                return (f"血条颜色已漂移 {self.drift:.0f}，"
+                        f"自动调整为 {self.lower.tolist()} - {self.upper.tolist()}")
+            return None
+
+        # 漂移明显回落后允许再次报告
+        if self.drift < threshold / 2:
+            self.drift_reported = False
+            self.limit_reported = False
+        return None
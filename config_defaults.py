@@ -49,6 +49,130 @@ UI_SETTINGS = {
     'sampling_rate': 500
 }
 
+# 队友识别设置
+RECOGNITION_SETTINGS = {
+    'max_workers': 0,  # 并行识别的工作线程数，0表示自动（CPU核心数，最多4个）；每个线程持有一个OCR实例（各占数百MB内存）
+    'name_confidence_threshold': 0.85,  # 名称无分歧时单次采样即可确定所需的置信度
+    'profession_confidence_threshold': 0.85,  # 职业图标无分歧时单次采样即可确定所需的匹配分数
+    'unknown_name_confidence_factor': 0.9,  # 不在已知名称中的新名称的置信度折扣
+    'unknown_name_min_votes': 2,  # 不在已知名称中的新名称至少需要的一致票数（OCR置信度再高也不能单次采样确定）
+    'vote_margin': 2,  # 出现分歧时领先票数达到该值即停止采样
+    'preprocess_profile': 'balanced'  # 图像预处理档位: fast / balanced / quality，可用 benchmark_preprocess.py --apply 按实测结果设置
+}
+
+# 血条自动检测设置
+DETECTION_SETTINGS = {
+    'close_kernel_width': 5,  # 水平闭运算核宽度，用于连接被文字切断的血条像素
+    'min_bar_width': 8,  # 血条线段的最小宽度（像素）
+    'min_bar_height': 2,  # 血条的最小高度（像素）
+    'max_bar_height': 30,  # 血条的最大高度（像素）
+    'min_bar_aspect': 3.0,  # 血条线段的最小宽高比
+    'min_fill_ratio': 0.6,  # 连通域面积占外接矩形的最小比例
+    'align_tolerance': 4,  # 同一队伍血条左边缘和高度的允许偏差（像素）
+    'spacing_tolerance': 0.15,  # 血条间距相对中位间距整数倍的允许偏差
+    'frame_height_ratio': 0.9,  # 队友框高度占血条间距的比例
+    'single_bar_pitch_ratio': 6.0,  # 只有一条血条时，按血条高度估算间距的倍数
+    'icon_gap': 2,  # 职业图标与血条之间的间隔（像素）
+    'track_reference_columns': 3,  # 填充末端右侧取作底槽颜色的列数
+    'track_edge_threshold': 30  # 与底槽颜色相差超过该值（BGR任一通道）的列视为底槽右边框
+}
+
+# 血条紧凑区域细化设置
+ROI_SETTINGS = {
+    'refine_frames': 5,  # 细化时采集的帧数
+    'refine_interval': 0.05,  # 采集帧之间的间隔（秒）
+    'min_fill_pixels': 5,  # 峰值行最少的填充像素数，低于该值认为没有检测到血条
+    'row_fill_ratio': 0.5,  # 行内填充像素数不低于峰值行的该比例时视为血条的一部分
+    'padding': 0,  # 紧凑区域向外扩展的像素数
+    'refine_on_monitor_start': True  # 开始监控时为尚未细化的队员自动细化
+}
+
+# 血条颜色模型设置
+COLOR_MODEL_SETTINGS = {
+    'frames': 5,  # 拟合颜色模型时采集的帧数
+    'interval': 0.05,  # 采集帧之间的间隔（秒）
+    'clusters': 2,  # k-means聚类数（血条填充与背景）
+    'z_score': 2.5,  # 颜色范围取 均值 ± z·标准差
+    'min_half_width': 4,  # 每个通道范围的最小半宽，避免纯色血条得到过窄的范围
+    'max_pixels': 20000,  # 参与聚类的最大像素数
+    'min_fill_pixels': 20,  # 拟合所需的最少填充像素数
+    'adaptive': True,  # 监控时根据高置信度填充像素缓慢调整颜色范围，跟随光照和色调变化
+    'adapt_rate': 0.05,  # 自适应的指数滑动平均系数
+    'adapt_max_step': 2.0,  # 每次测量颜色中心在每个通道上的最大移动量
+    'adapt_max_drift': 40,  # 颜色中心相对校准值在每个通道上的最大偏移
+    'adapt_search_margin': 12,  # 寻找高置信度像素时颜色范围的外扩余量
+    'adapt_min_coverage': 0.3,  # 已填充部分中高置信度像素的最低占比，低于该值不更新
+    'drift_report_threshold': 15  # 漂移超过该值时报告一次
+}
+
+# 血量滤波设置
+HP_FILTER_SETTINGS = {
+    'enabled': True,  # 是否对每次测量的血量做α-β滤波
+    'alpha': 0.6,  # 血量修正系数：越大越跟手（延迟小、噪声大），越小越平滑（延迟大、噪声小）
+    'beta': 0.1,  # 速度修正系数
+    'outlier_gate': 25.0,  # 测量值与预测值相差超过该百分比时视为离群值
+    'max_outlier_ticks': 2,  # 连续离群超过该次数后认为血量确实突变
+    'accept_drops': True,  # 大幅掉血（爆发伤害）不做离群判断，立即采用测量值，置信度取 initial_confidence
+    'outlier_confidence_decay': 0.5,  # 每次离群时置信度的衰减系数
+    'initial_confidence': 0.5,  # 首次测量或突变后的置信度（应不低于 min_action_confidence，否则突变后不会触发自动选择）
+    'confidence_rate': 0.3,  # 置信度向测量一致程度靠拢的速度
+    'min_action_confidence': 0.4  # 自动选择和语音警告所需的最低置信度
+}
+
+# 分诊（自动选择目标排序）设置
+TRIAGE_SETTINGS = {
+    'history_seconds': 3.0,  # 估计掉血速度所用的血量历史时长（秒）
+    'lookahead_seconds': 1.5,  # 按预测该时长后的血量排序（秒）
+    'role_weight': 1.5,  # priority_roles 中职业的紧急度权重
+    'priority_profession_bonus': 10.0,  # 单独设置的优先职业的分数加成（百分比）
+    'predictive_select': True  # 预测血量将低于阈值的队友也可以被自动选择
+}
+
+# 血条测量内核设置
+HP_KERNEL_SETTINGS = {
+    'backend': 'auto',  # 血条测量内核: auto（有 numba 时使用 numba）/ numpy / numba，可用 benchmark_hp_kernel.py 比较耗时
+    'solid_fill_ratio': 0.6  # 已填充部分中匹配颜色的像素比例低于该值时按比例降低测量置信度
+}
+
+# 扫描线测量设置
+SCANLINE_SETTINGS = {
+    'enabled': True,  # 每次测量只判断穿过血条中部的几行，而不是整个区域
+    'rows': 3,  # 扫描行数（1-3），校准细化血条区域时选取
+    'agree_tolerance': 2,  # 各行填充位置相差不超过该列数视为一致；多数行不一致时退回整个区域的测量
+    'disagreement_confidence': 0.7  # 各行不一致时测量置信度乘以该系数
+}
+
+# 边缘估计设置
+EDGE_ESTIMATE_SETTINGS = {
+    'mode': 'cross_check',  # off: 不使用 / cross_check: 检验颜色测量结果 / edge: 有明显边缘时直接使用边缘估计的血量
+    'min_contrast': 25.0,  # 填充边缘两侧亮度+饱和度均值的最小差值，低于该值认为没有明显边缘
+    'agree_tolerance': 8.0,  # 边缘估计与颜色测量相差不超过该百分比视为一致
+    'disagreement_penalty': 0.5  # 两者不一致时该次读数的置信度乘以该系数（不累积）
+}
+
+# 队员状态判断设置（没有血条填充时区分阵亡、超出范围和无法识别）
+MEMBER_STATUS_SETTINGS = {
+    'dead_max_saturation': 30.0,  # 血条区域平均饱和度不高于该值视为发灰，判断为阵亡
+    'faded_max_brightness': 110.0  # 仍有颜色但平均亮度不高于该值视为变暗，判断为超出范围或淡出
+}
+
+# 遮挡检测设置（鼠标、自动选择的点击、提示框或飘字遮挡血条时丢弃读数）
+OCCLUSION_SETTINGS = {
+    'enabled': True,
+    'cursor_margin': 8,  # 鼠标距血条框不超过该像素数时视为遮挡（鼠标指针和悬停提示）
+    'click_hold_seconds': 0.8,  # 自动选择点击血条后，该时长内截取的读数视为受点击高亮影响
+    'overlay_white_increase': 0.2,  # 测量行中白色像素比例比该队员的基线（常驻的血量数字等）高出该值时视为被文字或提示框遮挡
+    'white_baseline_rate': 0.1,  # 每次采用读数时白色像素比例基线向当前值靠近的比例（基线在细化血条区域时采集）
+    'max_rejected_ticks': 5,  # 连续丢弃超过该次数后不再丢弃，改为降低置信度采用读数（避免鼠标长期停留时血量不再更新）
+    'occluded_confidence': 0.3  # 不再丢弃后遮挡读数的置信度系数
+}
+
+# 启动设置
+STARTUP_SETTINGS = {
+    'time_budget_ms': 2000,  # 从导入程序到主窗口首次显示的时间预算（毫秒），startup_profiler.py 超出时返回非零退出码
+    'report_top': 15  # 启动耗时报告中每张表显示的模块数
+}
+
 # 所有默认配置
 DEFAULT_CONFIG = {
     'voice_settings': VOICE_SETTINGS,
@@ -56,5 +180,17 @@ DEFAULT_CONFIG = {
     'default_hp_color': DEFAULT_HP_COLOR,
     'auto_select': AUTO_SELECT_SETTINGS,
     'hotkeys': HOTKEY_SETTINGS,
-    'ui_settings': UI_SETTINGS
+    'ui_settings': UI_SETTINGS,
+    'recognition': RECOGNITION_SETTINGS,
+    'detection': DETECTION_SETTINGS,
+    'bar_roi': ROI_SETTINGS,
+    'color_model': COLOR_MODEL_SETTINGS,
+    'hp_filter': HP_FILTER_SETTINGS,
+    'triage': TRIAGE_SETTINGS,
+    'hp_kernel': HP_KERNEL_SETTINGS,
+    'scanline': SCANLINE_SETTINGS,
+    'edge_estimate': EDGE_ESTIMATE_SETTINGS,
+    'member_status': MEMBER_STATUS_SETTINGS,
+    'occlusion': OCCLUSION_SETTINGS,
+    'startup': STARTUP_SETTINGS
 } 
\ No newline at end of file
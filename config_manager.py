@@ -1,12 +1,107 @@
+import io
 import os
 import json
 import logging
+import threading
+from types import MappingProxyType
+from collections.abc import Mapping
 from configparser import ConfigParser
 
+from persistence import schedule_write, get_writer
+
+# 每个文件最多记住的本程序写入内容数（延迟写入器一次写出后即可清理，这里只是上限）
+MAX_WRITTEN_TEXTS = 16
+
+
+def freeze(value):
+    """把配置数据转换为只读结构：字典转为 MappingProxyType，列表转为元组"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def diff_keys(old, new, prefix=''):
+    """比较两份配置，返回发生变化的叶子键路径（点号分隔）"""
+    if isinstance(old, Mapping) and isinstance(new, Mapping):
+        changed = set()
+        for key in set(old) | set(new):
+            path = f"{prefix}.{key}" if prefix else str(key)
+            if key not in old or key not in new:
+                changed.add(path)
+            else:
+                changed |= diff_keys(old[key], new[key], path)
+        return changed
+    return {prefix} if old != new else set()
+
+
+def lookup(data, key, default=None):
+    """按点号分隔的路径在嵌套字典中查找值"""
+    if not key:
+        return data
+    value = data
+    for part in key.split('.'):
+        if isinstance(value, Mapping) and part in value:
+            value = value[part]
+        else:
+            return default
+    return value
+
+
+def key_matches(keys, path):
+    """判断变化的键路径是否落在订阅的键范围内（订阅键本身、其子键或其父键发生变化）"""
+    for key in keys:
+        if path == key or path.startswith(key + '.') or key.startswith(path + '.'):
+            return True
+    return False
+
+
+class ConfigView(Mapping):
+    """JSON配置中某一节的预解析只读视图
+    
+    创建时按路径查找一次并与默认值合并，之后读取只是一次字典查找；
+    配置变化（包括外部修改文件后的热重载）时由 ConfigManager 通知视图重新解析并整体替换。
+    """
+    
+    def __init__(self, manager, key, defaults=None):
+        self.key = key
+        self.defaults = dict(defaults or {})
+        self._values = MappingProxyType({})
+        self.resolve(manager.snapshot)
+        manager.subscribe(self._on_change, [key])
+    
+    def resolve(self, snapshot):
+        """从快照中重新解析该节的值"""
+        values = dict(self.defaults)
+        section = lookup(snapshot['json'], self.key)
+        if isinstance(section, Mapping):
+            values.update(section)
+        self._values = MappingProxyType(values)
+    
+    def _on_change(self, changed, snapshot):
+        self.resolve(snapshot)
+    
+    def __getitem__(self, key):
+        return self._values[key]
+    
+    def __iter__(self):
+        return iter(self._values)
+    
+    def __len__(self):
+        return len(self._values)
+    
+    def __repr__(self):
+        return f"ConfigView({self.key!r}, {dict(self._values)!r})"
+
 class ConfigManager:
     """
     集中管理应用程序配置的类
     使用ConfigParser处理配置文件，并提供统一的读写接口
+    
+    每次配置变化后生成一份不可变快照（snapshot），并只通知订阅了变化键的订阅者。
+    check_reload() 通过文件的修改时间判断配置文件是否被外部修改，修改后重新解析一次并通知订阅者，
+    无需重启程序。频繁读取的配置可以使用 view() 返回的预解析视图。
     """
     
     # 配置文件类型和实例映射
@@ -47,11 +142,22 @@ class ConfigManager:
         # 兼容性字典 (用于保存不适合ini格式的复杂数据)
         self.json_config = {}
         
+        self._lock = threading.RLock()
+        self.subscribers = []       # [(回调, 订阅的键列表或None, 是否只接收外部修改), ...]
+        self.views = {}             # 键 -> ConfigView
+        self._file_stamps = {}      # 文件路径 -> (修改时间, 大小)
+        self._written_texts = {}    # 文件路径 -> 本程序交给写入器、可能出现在磁盘上的内容列表，用于忽略自己的写入
+        
         # 从文件加载配置
         self.load_config()
+        self.snapshot = self._build_snapshot()
+        self._file_stamps = self._stat_files()
     
     def load_config(self):
         """从配置文件加载配置"""
+        # 重新创建解析器，重新加载时不会保留文件中已删除的项
+        self.config_parser = ConfigParser()
+        
         # 加载ini配置
         if os.path.exists(self.config_file):
             try:
@@ -70,25 +176,160 @@ class ConfigManager:
                 logging.error(f"加载配置文件 {self.json_config_file} 时出错: {str(e)}")
     
     def save_config(self):
-        """保存配置到文件"""
+        """保存配置到文件
+        
+        在调用线程中把当前配置序列化为文本，由延迟写入器在后台合并写入并原子替换，
+        调用方不会等待磁盘。短时间内多次保存只写最后一次。
+        """
         # 保存ini配置
         try:
-            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                self.config_parser.write(f)
-            logging.info(f"配置已保存到 {self.config_file}")
+            buffer = io.StringIO()
+            self.config_parser.write(buffer)
+            self._schedule_write(self.config_file, buffer.getvalue())
+            logging.info(f"配置将保存到 {self.config_file}")
         except Exception as e:
             logging.error(f"保存配置到 {self.config_file} 时出错: {str(e)}")
         
         # 保存json配置
         if self.json_config:
             try:
-                with open(self.json_config_file, 'w', encoding='utf-8') as f:
-                    json.dump(self.json_config, f, ensure_ascii=False, indent=4)
-                logging.info(f"配置已保存到 {self.json_config_file}")
+                self._schedule_write(self.json_config_file, json.dumps(self.json_config, ensure_ascii=False, indent=4))
+                logging.info(f"配置将保存到 {self.json_config_file}")
             except Exception as e:
                 logging.error(f"保存配置到 {self.json_config_file} 时出错: {str(e)}")
     
+    def _schedule_write(self, path, text):
+        """交给延迟写入器，并记住写入的内容
+        
+        记住的是所有尚未确认被新内容取代的写入：写入器可能在更新的内容已经排队后，
+        才把较早的内容写到磁盘上，此时磁盘上较早的内容同样是本程序写的。
+        """
+        with self._lock:
+            texts = self._written_texts.setdefault(path, [])
+            if text in texts:
+                texts.remove(text)
+            texts.append(text)
+            del texts[:-MAX_WRITTEN_TEXTS]
+            schedule_write(path, text)
+    
+    def _is_own_text(self, path, text):
+        """磁盘上的内容是否是本程序写入的
+        
+        写入器中已没有该文件待写入或正在写出的内容时，比磁盘上的内容更早的记录不会再出现，可以清理
+        （更晚的记录保留：读取文件后写入器可能刚好写出了更新的内容）。
+        """
+        texts = self._written_texts.get(path)
+        if not texts or text not in texts:
+            return False
+        if get_writer().pending_text(path) is None:
+            del texts[:texts.index(text)]
+        return True
+    
+    def _stat_files(self):
+        """获取配置文件的修改时间和大小"""
+        stamps = {}
+        for path in (self.config_file, self.json_config_file):
+            try:
+                stat = os.stat(path)
+                stamps[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                stamps[path] = None
+        return stamps
+    
+    def _build_snapshot(self):
+        """根据当前配置生成不可变快照"""
+        ini = {section: dict(self.config_parser[section]) for section in self.config_parser.sections()}
+        return freeze({'json': self.json_config, 'ini': ini})
+    
+    def _publish(self, external=False):
+        """生成新快照并通知订阅了变化键的订阅者
+        
+        参数:
+            external (bool): 变化是否来自外部修改配置文件（重新加载）
+        
+        返回:
+            set: 发生变化的键路径；ini配置的键以 'ini.节名.键名' 表示
+        """
+        with self._lock:
+            previous = self.snapshot
+            snapshot = self._build_snapshot()
+            changed = diff_keys(previous['json'], snapshot['json'])
+            changed |= {f"ini.{path}" for path in diff_keys(previous['ini'], snapshot['ini'])}
+            self.snapshot = snapshot
+            subscribers = list(self.subscribers)
+        if changed:
+            for callback, keys, external_only in subscribers:
+                if external_only and not external:
+                    continue
+                matched = changed if keys is None else {path for path in changed if key_matches(keys, path)}
+                if matched:
+                    try:
+                        callback(matched, snapshot)
+                    except Exception as e:
+                        logging.error(f"配置变化通知失败: {str(e)}")
+        return changed
+    
+    def check_reload(self):
+        """检查配置文件是否被外部修改，修改过则重新加载并通知订阅者
+        
+        只比较文件的修改时间和大小，未变化时不读取文件；本程序自己写入的内容不会触发重新加载。
+        
+        返回:
+            set: 发生变化的键路径，没有变化时为空集合
+        """
+        stamps = self._stat_files()
+        if stamps == self._file_stamps:
+            return set()
+        with self._lock:
+            changed_files = [path for path in stamps if stamps[path] != self._file_stamps.get(path)]
+            self._file_stamps = stamps
+            external = False
+            for path in changed_files:
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        text = f.read()
+                except OSError:
+                    continue
+                if not self._is_own_text(path, text):
+                    external = True
+            if not external:
+                return set()
+            logging.info("检测到配置文件被外部修改，重新加载")
+            self.load_config()
+        return self._publish(external=True)
+    
+    def subscribe(self, callback, keys=None, external_only=False):
+        """订阅配置变化
+        
+        参数:
+            callback (callable): callback(changed, snapshot)，changed 为订阅范围内发生变化的键路径集合
+            keys (list): 订阅的键路径（如 'auto_select'、'ini.voice.rate'），None 表示订阅所有变化
+            external_only (bool): 只接收配置文件被外部修改后的通知；程序自己修改配置的地方已经应用了新值，
+                                  界面等订阅者通常只需要处理外部修改
+        """
+        with self._lock:
+            self.subscribers.append((callback, list(keys) if keys is not None else None, external_only))
+    
+    def unsubscribe(self, callback):
+        """取消订阅"""
+        with self._lock:
+            self.subscribers = [entry for entry in self.subscribers if entry[0] != callback]
+    
+    def view(self, key, defaults=None):
+        """获取JSON配置某一节的预解析只读视图（同一个键共用一个视图）
+        
+        参数:
+            key (str): 配置键（支持点号分隔的路径）
+            defaults (dict): 配置中缺少的项使用的默认值
+        
+        返回:
+            ConfigView: 只读视图，配置变化后自动更新
+        """
+        with self._lock:
+            if key not in self.views:
+                self.views[key] = ConfigView(self, key, defaults)
+            return self.views[key]
+    
     def get(self, section, key, default=None, value_type=str):
         """
         获取配置值
@@ -122,10 +363,12 @@ class ConfigManager:
             key (str): 配置键
             value: 配置值
         """
-        if section not in self.config_parser:
-            self.config_parser[section] = {}
-        
-        self.config_parser[section][key] = str(value)
+        with self._lock:
+            if section not in self.config_parser:
+                self.config_parser[section] = {}
+            
+            self.config_parser[section][key] = str(value)
+        self._publish()
     
     def get_json(self, key, default=None):
         """
@@ -166,23 +409,24 @@ class ConfigManager:
             value: 配置值
         """
         try:
-            if not key:  # 设置整个配置
-                if isinstance(value, dict):
-                    self.json_config = value
-                return
-            
-            # 处理嵌套键
-            parts = key.split('.')
-            config = self.json_config
-            
-            # 遍历路径，创建必要的子字典
-            for i, part in enumerate(parts[:-1]):
-                if part not in config or not isinstance(config[part], dict):
-                    config[part] = {}
-                config = config[part]
-            
-            # 设置最终值
-            config[parts[-1]] = value
+            with self._lock:
+                if not key:  # 设置整个配置
+                    if isinstance(value, dict):
+                        self.json_config = value
+                else:
+                    # 处理嵌套键
+                    parts = key.split('.')
+                    config = self.json_config
+                    
+                    # 遍历路径，创建必要的子字典
+                    for i, part in enumerate(parts[:-1]):
+                        if part not in config or not isinstance(config[part], dict):
+                            config[part] = {}
+                        config = config[part]
+                    
+                    # 设置最终值
+                    config[parts[-1]] = value
+            self._publish()
             
         except Exception as e:
             logging.error(f"设置JSON配置 {key} 时出错: {str(e)}")
@@ -212,7 +456,9 @@ class ConfigManager:
             
             # 删除最终键
             if parts[-1] in config:
-                del config[parts[-1]]
+                with self._lock:
+                    del config[parts[-1]]
+                self._publish()
                 return True
             return False
             
@@ -6,17 +6,17 @@ import json
 import threading
 import pyautogui
 import time
-import asyncio
-import edge_tts
 import tempfile
 import queue # 新增导入
 import logging
 from config_manager import ConfigManager, get_config
 from config_defaults import DEFAULT_CONFIG
-# 移除 playsound 导入
-# from playsound import playsound
-# 添加 pygame 导入
-import pygame
+from startup_profiler import PhaseTimer
+# 语音播报相关的模块只在第一次播报时导入，不拖慢主窗口启动
+from lazy_import import lazy_import, is_loaded
+asyncio = lazy_import('asyncio')
+edge_tts = lazy_import('edge_tts')
+pygame = lazy_import('pygame')
 from PyQt5.QtCore import Qt, QTimer, QByteArray, QBuffer, QIODevice, QPoint, QSize, QRect, QThread, pyqtSignal, QObject, QEvent, QUrl, QPropertyAnimation
 from PyQt5.QtGui import QPixmap, QImage, QIcon, QColor, QFont, QKeySequence, QDesktopServices
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
@@ -33,11 +33,11 @@ from qfluentwidgets import (FluentWindow, NavigationItemPosition, PushButton,
                            SpinBox, DoubleSpinBox, ScrollArea, CardWidget, HeaderCardWidget,
                            InfoBarPosition, NavigationInterface, setThemeColor, FluentIcon as FIF)
 
-# 导入血条校准模块
-from health_bar_calibration import HealthBarCalibration
+# 血条校准模块（以及它依赖的PaddleOCR）在第一次校准或识别时才在用到的地方导入
 
 # 导入血条监控模块
-from health_monitor import HealthMonitor, MonitorSignals
+from health_monitor import HealthMonitor, MonitorSignals, ColorCalibrationThread
+from member_status import ALIVE, UNMEASURED, STATUS_LABELS
 
 # 动态导入带空格的模块
 import importlib.util
@@ -3286,14 +3286,10 @@ import json
 import threading
 import pyautogui
 import time
-import asyncio
-import edge_tts
 import tempfile
 import queue # 新增导入
 # 移除 playsound 导入
 # from playsound import playsound
-# 添加 pygame 导入
-import pygame
 from PyQt5.QtCore import Qt, QTimer, QByteArray, QBuffer, QIODevice, QPoint, QSize, QRect, QThread, pyqtSignal, QObject, QEvent, QUrl, QPropertyAnimation
 from PyQt5.QtGui import QPixmap, QImage, QIcon, QColor, QFont, QKeySequence, QDesktopServices
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
@@ -3310,26 +3306,9 @@ from qfluentwidgets import (FluentWindow, NavigationItemPosition, PushButton,
                            SpinBox, DoubleSpinBox, ScrollArea, CardWidget, HeaderCardWidget,
                            InfoBarPosition, NavigationInterface, setThemeColor, FluentIcon as FIF)
 
-# 导入血条校准模块
-from health_bar_calibration import HealthBarCalibration
-
 # 导入血条监控模块
 from health_monitor import HealthMonitor, MonitorSignals
 
-# 动态导入带空格的模块
-import importlib.util
-
-# 动态导入带空格的模块
-module_name = "team_members(choice box)"
-module_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "team_members(choice box).py")
-spec = importlib.util.spec_from_file_location(module_name, module_path)
-team_members_module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(team_members_module)
-
-# 从module中获取Team和TeamMember类
-Team = team_members_module.Team
-TeamMember = team_members_module.TeamMember
-
 # 设置应用全局样式
 GLOBAL_STYLE = """
 QWidget {
@@ -6580,8 +6559,6 @@ import json
 import threading
 import pyautogui
 import time
-import asyncio
-import edge_tts
 import tempfile
 import queue # 新增导入
 import logging
@@ -6589,8 +6566,6 @@ from config_manager import ConfigManager, get_config
 from config_defaults import DEFAULT_CONFIG
 # 移除 playsound 导入
 # from playsound import playsound
-# 添加 pygame 导入
-import pygame
 from PyQt5.QtCore import Qt, QTimer, QByteArray, QBuffer, QIODevice, QPoint, QSize, QRect, QThread, pyqtSignal, QObject, QEvent, QUrl, QPropertyAnimation
 from PyQt5.QtGui import QPixmap, QImage, QIcon, QColor, QFont, QKeySequence, QDesktopServices
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
@@ -6607,26 +6582,9 @@ from qfluentwidgets import (FluentWindow, NavigationItemPosition, PushButton,
                            SpinBox, DoubleSpinBox, ScrollArea, CardWidget, HeaderCardWidget,
                            InfoBarPosition, NavigationInterface, setThemeColor, FluentIcon as FIF)
 
-# 导入血条校准模块
-from health_bar_calibration import HealthBarCalibration
-
 # 导入血条监控模块
 from health_monitor import HealthMonitor, MonitorSignals
 
-# 动态导入带空格的模块
-import importlib.util
-
-# 动态导入带空格的模块
-module_name = "team_members(choice box)"
-module_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "team_members(choice box).py")
-spec = importlib.util.spec_from_file_location(module_name, module_path)
-team_members_module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(team_members_module)
-
-# 从module中获取Team和TeamMember类
-Team = team_members_module.Team
-TeamMember = team_members_module.TeamMember
-
 # 设置应用全局样式
 GLOBAL_STYLE = """
 QWidget {
@@ -9860,14 +9818,10 @@ import json
 import threading
 import pyautogui
 import time
-import asyncio
-import edge_tts
 import tempfile
 import queue # 新增导入
 # 移除 playsound 导入
 # from playsound import playsound
-# 添加 pygame 导入
-import pygame
 from PyQt5.QtCore import Qt, QTimer, QByteArray, QBuffer, QIODevice, QPoint, QSize, QRect, QThread, pyqtSignal, QObject, QEvent, QUrl, QPropertyAnimation
 from PyQt5.QtGui import QPixmap, QImage, QIcon, QColor, QFont, QKeySequence, QDesktopServices
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
@@ -9884,26 +9838,9 @@ from qfluentwidgets import (FluentWindow, NavigationItemPosition, PushButton,
                            SpinBox, DoubleSpinBox, ScrollArea, CardWidget, HeaderCardWidget,
                            InfoBarPosition, NavigationInterface, setThemeColor, FluentIcon as FIF)
 
-# 导入血条校准模块
-from health_bar_calibration import HealthBarCalibration
-
 # 导入血条监控模块
 from health_monitor import HealthMonitor, MonitorSignals
 
-# 动态导入带空格的模块
-import importlib.util
-
-# 动态导入带空格的模块
-module_name = "team_members(choice box)"
-module_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "team_members(choice box).py")
-spec = importlib.util.spec_from_file_location(module_name, module_path)
-team_members_module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(team_members_module)
-
-# 从module中获取Team和TeamMember类
-Team = team_members_module.Team
-TeamMember = team_members_module.TeamMember
-
 # 设置应用全局样式
 GLOBAL_STYLE = """
 QWidget {
@@ -10028,6 +9965,7 @@ class ColorPickerMessageBox(MessageBoxBase):
                 import numpy as np
                 self.color_lower = np.array([max(0, c - 30) for c in bgr_values], dtype=np.uint8)
                 self.color_upper = np.array([min(255, c + 30) for c in bgr_values], dtype=np.uint8)
+                self.pixel_color_bgr = bgr_values
                 
                 self.statusLabel.setText(f"状态：成功获取颜色！RGB: {rgb_tuple}")
                 self.statusLabel.setTextColor("#2ecc71", QColor(46, 204, 113))
@@ -11894,24 +11832,11 @@ class UnifiedColorPickerMessageBox(MessageBoxBase):
 class MainWindow(FluentWindow):
     def __init__(self):
         """初始化主窗口"""
+        startup_timer = PhaseTimer('MainWindow')
         super().__init__()
+        startup_timer.mark('创建窗口框架')
         
-        # 初始化 pygame mixer
-        try:
-            pygame.mixer.init()
-            pygame.mixer.set_num_channels(16) # 设置足够多的声道
-        except pygame.error as e:
-            print(f"Pygame mixer 初始化失败: {e}")
-            # 可以选择禁用语音功能或显示错误提示
-            InfoBar.error(
-                title='音频初始化失败',
-                content='无法初始化音频播放组件 (pygame.mixer)，语音播报功能将不可用。',
-                orient=Qt.Horizontal,
-                isClosable=True,
-                position=InfoBarPosition.TOP,
-                duration=5000,
-                parent=self
-            )
+        # pygame mixer 在第一次语音播报时由语音工作线程初始化，见 _execute_speech
         
         self._icon_capture_show_selection_timer = None
         self._icon_capture_do_grab_timer = None
@@ -11945,12 +11870,15 @@ class MainWindow(FluentWindow):
         self.default_hp_color_lower = None  # 默认血条颜色下限
         self.default_hp_color_upper = None  # 默认血条颜色上限
         self.load_default_colors()  # 从配置加载默认颜色设置
+        startup_timer.mark('创建队伍')
         
         # 初始化健康监控相关属性
         self.health_monitor = HealthMonitor(self.team)  # 创建健康监控实例
         # 连接监控信号
         self.health_monitor.signals.update_signal.connect(self.update_health_display)
         self.health_monitor.signals.status_signal.connect(self.update_monitor_status)
+        self.health_monitor.signals.team_changed_signal.connect(self.on_team_layout_changed)
+        startup_timer.mark('创建健康监控')
         
         # 创建界面
         self.teamRecognitionInterface = QWidget()
@@ -11971,16 +11899,30 @@ class MainWindow(FluentWindow):
         
         # 初始化界面
         self.initTeamRecognitionInterface()
+        startup_timer.mark('队员识别页面')
         self.initHealthMonitorInterface()
+        startup_timer.mark('血条监控页面')
         self.initAssistInterface()
+        startup_timer.mark('辅助功能页面')
         self.initSettingsInterface()
+        startup_timer.mark('设置页面')
         self.initVoiceSettingsInterface() # 新增：调用语音设置界面初始化
+        startup_timer.mark('语音设置页面')
         
         # 初始化导航
         self.initNavigation()
+        startup_timer.mark('导航栏')
         
         # --- 加载设置 ---
         self.load_settings() # 在UI初始化后加载设置
+        startup_timer.mark('加载设置')
+        
+        # 配置文件被外部修改后自动重新加载：定时按修改时间检查，只有订阅的配置节变化时才刷新界面
+        get_config().subscribe(self.on_settings_changed, ['voice_settings', 'low_health_alert_settings'],
+                               external_only=True)
+        self.config_reload_timer = QTimer(self)
+        self.config_reload_timer.timeout.connect(get_config().check_reload)
+        self.config_reload_timer.start(1000)
         
         # 显示提示信息
         InfoBar.success(
@@ -11995,6 +11937,7 @@ class MainWindow(FluentWindow):
         
         # 在__init__方法末尾添加：
         self.load_teammates()
+        startup_timer.mark('加载队友')
         
         # 初始化语音队列和工作线程
         self.speech_queue = queue.Queue()
@@ -12006,6 +11949,9 @@ class MainWindow(FluentWindow):
         self.pygame_event_timer = QTimer(self)
         self.pygame_event_timer.timeout.connect(self._process_pygame_events)
         self.pygame_event_timer.start(100) # 每 100ms 检查一次
+        startup_timer.mark('语音线程和定时器')
+        # 各阶段耗时由 startup_profiler.py 汇报，这里只在调试日志中记录总耗时
+        logging.debug(f"主窗口初始化耗时: {startup_timer.total_ms():.0f} ms")
     
     def initNavigation(self):
         """初始化导航栏"""
@@ -12355,16 +12301,23 @@ class MainWindow(FluentWindow):
         setAllColorsBtn.setIcon(FIF.BRUSH) # 使用 BRUSH 图标
         setAllColorsBtn.setMinimumWidth(120)
         
+        # 切换校准集按钮：监控运行时也可以切换队伍布局
+        switchCalibrationBtn = PushButton("切换校准集")
+        switchCalibrationBtn.setIcon(FIF.SYNC)
+        switchCalibrationBtn.setMinimumWidth(120)
+        
         # 连接按钮事件
         startMonitorBtn.clicked.connect(self.health_monitor.start_monitoring)
         stopMonitorBtn.clicked.connect(self.health_monitor.stop_monitoring)
         setColorBtn.clicked.connect(self.setTeammateHealthBarColor)  # 连接到单个设置方法
         setAllColorsBtn.clicked.connect(self.handleSetAllTeammatesColor) # 连接到统一设置方法
+        switchCalibrationBtn.clicked.connect(self.switchCalibrationSet)
         
         controlLayout.addWidget(startMonitorBtn)
         controlLayout.addWidget(stopMonitorBtn)
         controlLayout.addWidget(setColorBtn)  # 添加单个设置按钮
         controlLayout.addWidget(setAllColorsBtn) # 添加统一设置按钮
+        controlLayout.addWidget(switchCalibrationBtn)
         controlLayout.addStretch(1)
         
         # 血条展示区域
@@ -13146,6 +13099,43 @@ class MainWindow(FluentWindow):
         result = show_selection_box(on_selection)
         return result
 
+    def calibrate_colors_in_background(self, members, seed_bgr, on_finished):
+        """在后台线程中为队员采集截图并拟合颜色模型，完成后在界面线程中调用 on_finished
+        
+        参数:
+            members: 要拟合颜色的队员列表
+            seed_bgr: 用户选取的血条像素BGR值
+            on_finished: 回调 on_finished(results)，results 为 [(队员, 颜色模型或None), ...]
+            
+        返回:
+            bool: 是否已开始拟合（上一次拟合尚未完成时返回False）
+        """
+        thread = getattr(self, 'color_calibration_thread', None)
+        if thread is not None and thread.isRunning():
+            self.show_safe_infobar('请稍候', '正在拟合血条颜色，请等待完成后再设置', 'warning', 2000)
+            return False
+        self.color_calibration_thread = ColorCalibrationThread(members, seed_bgr)
+        self.color_calibration_thread.result_signal.connect(on_finished)
+        self.color_calibration_thread.start()
+        return True
+
+    def apply_picked_color(self, member, model, color_lower, color_upper):
+        """应用拟合结果，拟合失败时使用取色像素的固定范围
+        
+        返回:
+            bool: 是否根据血条区域拟合
+        """
+        if model is not None:
+            member.apply_color_model(model)
+            return True
+        member.hp_color_lower = color_lower
+        member.hp_color_upper = color_upper
+        member.color_model = None
+        
+        # 保存到配置文件
+        member.save_config()
+        return False
+
     def set_health_bar_color(self, member):
         """设置队员血条颜色"""
         # 使用ColorPickerMessageBox代替普通QDialog
@@ -13155,22 +13145,24 @@ class MainWindow(FluentWindow):
         if color_picker_dialog.exec():
             # 更新队友的血条颜色设置
             if hasattr(color_picker_dialog, 'color_lower') and hasattr(color_picker_dialog, 'color_upper'):
-                member.hp_color_lower = color_picker_dialog.color_lower
-                member.hp_color_upper = color_picker_dialog.color_upper
+                color_lower, color_upper = color_picker_dialog.color_lower, color_picker_dialog.color_upper
+                
+                def on_fitted(results):
+                    # 优先根据整个血条区域拟合颜色模型，失败时使用取色像素的固定范围
+                    self.apply_picked_color(member, results[0][1], color_lower, color_upper)
                     
-                # 保存到配置文件
-                member.save_config()
+                    # 显示成功提示
+                    InfoBar.success(
+                        title='设置成功',
+                        content=f'已设置 {member.name} 的血条颜色',
+                        orient=Qt.Horizontal,
+                        isClosable=True,
+                        position=InfoBarPosition.TOP,
+                        duration=2000,
+                        parent=self
+                    )
                 
-                # 显示成功提示
-                InfoBar.success(
-                    title='设置成功',
-                    content=f'已设置 {member.name} 的血条颜色',
-                    orient=Qt.Horizontal,
-                    isClosable=True,
-                    position=InfoBarPosition.TOP,
-                    duration=2000,
-                    parent=self
-                )
+                self.calibrate_colors_in_background([member], color_picker_dialog.pixel_color_bgr, on_fitted)
 
     def load_teammates(self):
         """加载所有队友配置"""
@@ -13274,6 +13266,52 @@ class MainWindow(FluentWindow):
                         3000
                     )
 
+    def switchCalibrationSet(self):
+        """选择校准集并切换队伍布局，监控无需停止"""
+        try:
+            from health_bar_calibration import HealthBarCalibration
+            calibration = HealthBarCalibration()
+            if not calibration.get_calibration_set_names():
+                self.show_safe_infobar(
+                    '无可用校准数据集',
+                    '请先通过"选择识别位置"创建校准数据',
+                    'warning',
+                    3000
+                )
+                return
+            
+            dialog = CalibrationSelectionMessageBox(calibration, self)
+            if not dialog.exec() or not dialog.selected_calibration:
+                return
+            
+            if not self.health_monitor.switch_calibration_set(dialog.selected_calibration):
+                self.show_safe_infobar(
+                    '切换失败',
+                    f'校准集 "{dialog.selected_calibration}" 中没有已识别的队友，请先识别一次',
+                    'warning',
+                    3000
+                )
+        except Exception as e:
+            print(f"切换校准集时出错: {e}")
+            self.show_safe_infobar(
+                '切换失败',
+                f'切换校准集时出错: {str(e)}',
+                'error',
+                3000
+            )
+    
+    def on_team_layout_changed(self, set_name):
+        """校准集切换后刷新队友信息和血条显示（快捷键切换时在UI线程中执行）"""
+        self.team = self.health_monitor.team
+        self.update_teammate_info()
+        self.init_health_bars_ui()
+        self.show_safe_infobar(
+            '已切换校准集',
+            f'当前校准集: {set_name}，共 {len(self.team.members)} 名队友',
+            'success',
+            2000
+        )
+    
     def loadTeammate(self):
         print('loadTeammate called')
         try:
@@ -13314,17 +13352,8 @@ class MainWindow(FluentWindow):
         
         if confirm_dialog.exec():
             try:
-                # 删除所有队友配置文件
-                deleted_count = 0
-                for member in self.team.members:
-                    config_file = f"{member.name}_config.json"
-                    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), config_file)
-                    if os.path.exists(config_path):
-                        os.remove(config_path)
-                        deleted_count += 1
-                
-                # 清空队友列表
-                self.team.members = []
+                # 删除所有队友配置并清空队友列表（只写入一次配置存储）
+                deleted_count = self.team.clear_members()
                 
                 # 更新队友信息显示
                 self.update_teammate_info()
@@ -13647,8 +13676,10 @@ class MainWindow(FluentWindow):
             
             # 进行队友识别
             self.recognition_in_progress = True
+            self.streamed_recognition_results = []
             self.recognition_thread = RecognitionThread(calibration, calibration_dialog.selected_calibration)
             self.recognition_thread.progress_signal.connect(self.update_recognition_progress)
+            self.recognition_thread.teammate_signal.connect(self.add_recognition_result)
             self.recognition_thread.result_signal.connect(self.update_recognition_results)
             self.recognition_thread.finished.connect(self.recognition_finished)
             self.recognition_thread.start()
@@ -13689,14 +13720,63 @@ class MainWindow(FluentWindow):
         <div style='text-align:center; margin-top:5px;'>{percentage}% ({current}/{total})</div>
         """
         
+        # 已经完成识别的队友逐个显示在进度下方
+        streamed_html = "".join(self._recognition_card_html(data)
+                                for data in getattr(self, 'streamed_recognition_results', []))
+        
         # 更新预览显示
         self.teammateInfoPreview.setText(f"<html><body style='color: white;'>"
                                        f"<div style='font-weight: bold; font-size: 16px;'>识别进行中</div>"
                                        f"<div style='margin:8px 0;'>{message}</div>"
                                        f"{progress_html}"
+                                       f"<div style='color: #333333;'>{streamed_html}</div>"
                                        f"</body></html>")
         QApplication.processEvents()  # 立即更新UI
     
+    def add_recognition_result(self, recognized_data):
+        """识别线程每完成一个队友时调用，立即记录结果以便在进度中显示
+        
+        参数:
+            recognized_data: 单个队友的识别结果字典，包含 'name'、'profession' 和 'health_bar'
+        """
+        if not hasattr(self, 'streamed_recognition_results'):
+            self.streamed_recognition_results = []
+        self.streamed_recognition_results.append(recognized_data)
+    
+    def _recognition_card_html(self, recognized_data):
+        """生成单个队友识别结果的HTML卡片
+        
+        参数:
+            recognized_data: 包含 'name'、'profession' 和 'health_bar' 的字典
+        """
+        name = recognized_data.get('name')
+        profession = recognized_data.get('profession', '未知')
+        health_bar_info = recognized_data.get('health_bar', {})
+        
+        card_bg = "#ffffff"  # 白色背景
+        border = "1px solid #e0e0e0" # 浅灰色边框
+        
+        position = f"({health_bar_info.get('x1', 0)}, {health_bar_info.get('y1', 0)}) - "
+        position += f"({health_bar_info.get('x2', 0)}, {health_bar_info.get('y2', 0)})"
+        
+        # 尝试获取职业图标路径 (与 update_teammate_preview 逻辑一致)
+        icon_html = ""
+        profession_icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profession_icons", f"{profession}.png")
+        if os.path.exists(profession_icon_path):
+            icon_uri = QUrl.fromLocalFile(profession_icon_path).toString()
+            icon_html = f"<img src='{icon_uri}' width='24' height='24' style='vertical-align: middle; margin-right: 8px;'/>"
+
+        return f"""
+        <div style='background: {card_bg}; border: {border}; border-radius: 8px; padding: 10px; margin-bottom: 12px;'>
+            <div style='font-weight: bold; font-size: 16px; margin-bottom: 8px;'>
+                {icon_html}{name} <span style='color: #3498db;'>({profession})</span>
+            </div>
+            <div style='margin-bottom: 6px;'>
+                <span style='color: #666666;'>血条位置:</span> {position}
+            </div>
+        </div>
+        """
+    
     def update_recognition_results(self, teammates_data):
         """更新识别结果显示，并更新到队友数据和血条监控界面
         
@@ -13717,7 +13797,6 @@ class MainWindow(FluentWindow):
             for recognized_data in teammates_data:
                 name = recognized_data.get('name')
                 new_profession = recognized_data.get('profession', '未知') # 获取识别到的职业
-                health_bar_info = recognized_data.get('health_bar', {})
 
                 # 更新到 self.team.members
                 member_updated = False
@@ -13748,30 +13827,8 @@ class MainWindow(FluentWindow):
                 #     # new_member.save_config()
                 #     pass # 暂不处理新增，仅更新已有
 
-                # --- HTML 预览部分（保持不变，使用识别到的职业） ---
-                card_bg = "#ffffff"  # 白色背景
-                border = "1px solid #e0e0e0" # 浅灰色边框
-                
-                position = f"({health_bar_info.get('x1', 0)}, {health_bar_info.get('y1', 0)}) - "
-                position += f"({health_bar_info.get('x2', 0)}, {health_bar_info.get('y2', 0)})"
-                
-                # 尝试获取职业图标路径 (与 update_teammate_preview 逻辑一致)
-                icon_html = ""
-                profession_icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profession_icons", f"{new_profession}.png")
-                if os.path.exists(profession_icon_path):
-                    icon_uri = QUrl.fromLocalFile(profession_icon_path).toString()
-                    icon_html = f"<img src='{icon_uri}' width='24' height='24' style='vertical-align: middle; margin-right: 8px;'/>"
-
-                html += f"""
-                <div style='background: {card_bg}; border: {border}; border-radius: 8px; padding: 10px; margin-bottom: 12px;'>
-                    <div style='font-weight: bold; font-size: 16px; margin-bottom: 8px;'>
-                        {icon_html}{name} <span style='color: #3498db;'>({new_profession})</span>
-                    </div>
-                    <div style='margin-bottom: 6px;'>
-                        <span style='color: #666666;'>血条位置:</span> {position}
-                    </div>
-                </div>
-                """
+                # --- HTML 预览部分（使用识别到的职业） ---
+                html += self._recognition_card_html(recognized_data)
         
         html += "</body></html>"
         self.teammateInfoPreview.setText(html)
@@ -13933,10 +13990,13 @@ class MainWindow(FluentWindow):
             current_hp_from_signal = health_percentage
             
             # 根据存活状态和血量设置颜色
+            member_status = getattr(member_in_ui_order, 'status', ALIVE)
             final_color = "#2ecc71" # 默认健康绿色
             if not is_alive:
                 final_color = "#777777"  # 灰色表示离线/死亡
                 current_hp_from_signal = 0.0 # 死亡时血量视为0
+            elif member_status in UNMEASURED:
+                final_color = "#95a5a6"  # 浅灰表示超出范围/无法识别，血条保持上一次的血量
             elif current_hp_from_signal <= 30:
                 final_color = "#e74c3c"  # 红色表示危险
             elif current_hp_from_signal <= 60:
@@ -13965,7 +14025,10 @@ class MainWindow(FluentWindow):
                     if member_frame: member_frame.update()
             
             if value_label:
-                value_label.setText(f"{current_hp_from_signal:.1f}%")
+                if is_alive and member_status in UNMEASURED:
+                    value_label.setText(STATUS_LABELS[member_status])
+                else:
+                    value_label.setText(f"{current_hp_from_signal:.1f}%")
                 value_label.setStyleSheet(f"color: {final_color}; font-weight: bold; font-size: 15px;")
             
             if name_label:
@@ -13992,14 +14055,8 @@ class MainWindow(FluentWindow):
         
         # check_health_warnings 使用原始的 health_data，这部分不需要修改
         # 因为它关心的是实际的血量数据，而不是UI顺序
-        low_hp_count = 0
-        total_alive = 0
-        # 重新从 health_data_map 的值计算，以确保与UI更新的数据源一致
-        for _, (hp, alive_status) in health_data_map.items():
-            if alive_status:
-                total_alive += 1
-                if hp <= 30: # 使用30%作为低血量标准
-                    low_hp_count += 1
+        # 在队伍的结构数组状态上向量化统计，使用30%作为低血量标准
+        low_hp_count, total_alive = self.team.count_low_health(30)
         
         self.check_health_warnings(health_data, low_hp_count, total_alive)
 
@@ -14053,8 +14110,18 @@ class MainWindow(FluentWindow):
             # 获取警告阈值
             warning_threshold = getattr(self, 'warning_threshold', 30.0)
             
-            # 遍历所有队友
+            # 血量估计置信度不足的队友（例如刚出现离群测量）等下一次测量也低于阈值时才警告
+            from hp_filter import load_hp_filter_settings
+            min_confidence = load_hp_filter_settings()['min_action_confidence']
+            member_map = {member.name: member for member in self.team.members}
+            
+            # 遍历所有队友（血量为滤波后的值）
             for name, health, is_alive in health_data:
+                member = member_map.get(name)
+                if member is not None and member.status != ALIVE:
+                    continue  # 超出范围或无法识别的队友血量是沿用的旧值，不警告
+                if member is not None and not member.is_low_health_confirmed(warning_threshold, min_confidence):
+                    continue
                 if is_alive and health <= warning_threshold:
                     # 检查冷却时间
                     teammate_warning_key = f"low_health_{name}"
@@ -14129,17 +14196,28 @@ class MainWindow(FluentWindow):
             # 保存设置
             self.save_settings()
             
+            # 把所有延迟写入的配置同步写入磁盘
+            from persistence import flush_all
+            flush_all()
+            
             # 调用PyQt基类方法
             super().closeEvent(event)
             
-            # 确保pygame已退出
-            pygame.quit()
+            # 确保pygame已退出（没有播报过语音时pygame从未导入，无需处理）
+            if is_loaded(pygame):
+                pygame.quit()
             
             # 安全显示退出消息
             self.show_safe_infobar('程序已关闭', '感谢使用VitalSync', 'info', 1000)
             
         except Exception as e:
             print(f"关闭时出错: {e}")
+            # 出错时也尽量保存尚未写入的配置
+            try:
+                from persistence import flush_all
+                flush_all()
+            except Exception as flush_err:
+                print(f"写入配置时出错: {flush_err}")
             # 调用基类方法确保应用关闭
             super().closeEvent(event)
 
@@ -14237,7 +14315,7 @@ class MainWindow(FluentWindow):
                 print(f"[{threading.current_thread().name}] 准备加载和播放 {generated_path}")
                 try:
                     if not pygame.mixer.get_init():
-                        print(f"[{threading.current_thread().name}] Pygame mixer 未初始化，尝试重新初始化...")
+                        print(f"[{threading.current_thread().name}] Pygame mixer 未初始化，正在初始化...")
                         pygame.mixer.init()
                         pygame.mixer.set_num_channels(16) # 确保声道已设置
 
@@ -14287,6 +14365,8 @@ class MainWindow(FluentWindow):
 
     def _process_pygame_events(self):
         """由 QTimer 调用，处理 Pygame 事件队列和检查播放结束状态。"""
+        if not is_loaded(pygame):
+            return # 还没有播报过语音，不为了检查状态而导入 pygame
         if not pygame.get_init() or not pygame.mixer.get_init():
             return # Pygame 未初始化，不做处理
 
@@ -14383,6 +14463,11 @@ class MainWindow(FluentWindow):
         self.voice_volume_param = f"{volume_percent:+}%"
         # print(f"语音音量更新为: {self.voice_volume_param}") # 调试信息
         self.save_settings() # 保存更改
+    def on_settings_changed(self, changed, snapshot):
+        """配置文件中的语音或警告设置被外部修改后重新加载到界面"""
+        print(f"配置已变化: {', '.join(sorted(changed))}")
+        self.load_settings()
+
     def load_settings(self):
         """加载应用程序设置"""
         # 使用配置管理器获取配置
@@ -14922,11 +15007,11 @@ class MainWindow(FluentWindow):
         if color_picker_dialog.exec():
                     # 更新队友的血条颜色设置
             if hasattr(color_picker_dialog, 'color_lower') and hasattr(color_picker_dialog, 'color_upper'):
-                member.hp_color_lower = color_picker_dialog.color_lower
-                member.hp_color_upper = color_picker_dialog.color_upper
-                    
-                    # 保存到配置文件
-                member.save_config()
+                color_lower, color_upper = color_picker_dialog.color_lower, color_picker_dialog.color_upper
+                # 优先根据整个血条区域拟合颜色模型，失败时使用取色像素的固定范围
+                self.calibrate_colors_in_background(
+                    [member], color_picker_dialog.pixel_color_bgr,
+                    lambda results: self.apply_picked_color(member, results[0][1], color_lower, color_upper))
 
     def handleSetAllTeammatesColor(self):
         """处理统一设置所有队友血条颜色的请求"""
@@ -14948,7 +15033,6 @@ class MainWindow(FluentWindow):
     def _apply_picked_color_to_all_teammates(self, pixel_color_rgb):
         """将选取的颜色应用到所有队友的配置中"""
         import numpy as np
-        success_count = 0
         if not self.team.members:
             return
 
@@ -14962,21 +15046,33 @@ class MainWindow(FluentWindow):
         self.default_hp_color_upper = color_upper
         self.save_default_colors()  # 保存默认颜色到配置文件
 
-        for member in self.team.members:
-            try:
-                # 创建颜色上下限（允许一定范围的变化） - 使用BGR值
-                member.hp_color_lower = np.copy(color_lower)  # 使用拷贝防止引用共享
-                member.hp_color_upper = np.copy(color_upper)  # 使用拷贝防止引用共享
-                member.save_config()
-                success_count += 1
-            except Exception as e:
-                print(f"为队友 {member.name} 更新颜色配置时出错: {e}")
-                # 可以在这里用 InfoBar 提示单个队友更新失败，但可能会过多
+        # 优先根据各队友的血条区域拟合颜色模型，取色像素用于区分血条和背景；
+        # 每个队友的多帧采集在后台线程中进行，全部完成后再在界面线程中应用
+        self.calibrate_colors_in_background(
+            self.team.members, bgr_values,
+            lambda results: self._apply_fitted_colors(results, color_lower, color_upper))
+
+    def _apply_fitted_colors(self, results, color_lower, color_upper):
+        """在界面线程中应用统一取色后各队友的拟合结果"""
+        success_count = 0
+        fitted_count = 0
+        # 所有队友的配置合并为一次写入
+        from member_store import get_member_store
+        with get_member_store().transaction():
+            for member, model in results:
+                try:
+                    # 创建颜色上下限（允许一定范围的变化） - 使用BGR值，使用拷贝防止引用共享
+                    if self.apply_picked_color(member, model, np.copy(color_lower), np.copy(color_upper)):
+                        fitted_count += 1
+                    success_count += 1
+                except Exception as e:
+                    print(f"为队友 {member.name} 更新颜色配置时出错: {e}")
+                    # 可以在这里用 InfoBar 提示单个队友更新失败，但可能会过多
         
         if success_count > 0:
             self.show_safe_infobar(
                 '统一设置成功',
-                f'已为 {success_count} 名队友统一更新了血条颜色。',
+                f'已为 {success_count} 名队友统一更新了血条颜色，其中 {fitted_count} 名根据血条区域拟合。',
                 'success',
                 3000
             )
@@ -15010,15 +15106,8 @@ class MainWindow(FluentWindow):
             selected_member = selection_dialog.get_selected_member()
             if selected_member:
                 try:
-                    # 删除配置文件
-                    config_file = f"{selected_member.name}_config.json"
-                    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), config_file)
-                    if os.path.exists(config_path):
-                        os.remove(config_path)
-                    
-                    # 从队伍中移除队员
-                    selected_idx = self.team.members.index(selected_member)
-                    self.team.members.pop(selected_idx)
+                    # 从队伍中移除队员并删除其配置
+                    self.team.remove_member(selected_member)
                     
                     # 更新队友信息显示
                     self.update_teammate_info()
@@ -15043,44 +15132,16 @@ class MainWindow(FluentWindow):
 
     def load_teammates(self):
         """加载所有队友配置"""
+        from member_store import get_member_store
         self.team_members = []
         
-        # 获取当前目录
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        # 扫描队友配置文件
-        for filename in os.listdir(current_dir):
-            if filename.endswith('_config.json') and filename != 'hotkeys_config.json':
-                try:
-                    # 排除系统配置文件
-                    if filename.startswith(('hotkeys', 'settings', 'config', 'system')):
-                        continue
-                        
-                    # 从文件名提取队友名称
-                    member_name = filename[:-12]  # 移除'_config.json'
-                    
-                    # 读取配置获取职业信息
-                    config_path = os.path.join(current_dir, filename)
-                    with open(config_path, 'r', encoding='utf-8') as f:
-                        config = json.load(f)
-                        
-                        # 检查是否是有效的队友配置
-                        if 'profession' not in config or 'health_bar' not in config:
-                            continue
-                        
-                        # 获取职业信息
-                        profession = config.get('profession', '未知')
-                        
-                        # 添加到队友列表
-                        self.team_members.append({
-                            'name': member_name,
-                            'profession': profession,
-                            'config': config
-                        })
-                        
-                except Exception as e:
-                    print(f'加载配置文件 {filename} 时出错: {str(e)}')
-                    continue
+        # 从队员配置存储读取，不扫描程序目录
+        for member_name, config in get_member_store().items():
+            self.team_members.append({
+                'name': member_name,
+                'profession': config.get('profession', '未知'),
+                'config': config
+            })
         
         # 更新队友信息显示
         self.update_teammate_info()
@@ -15146,19 +15207,22 @@ class MainWindow(FluentWindow):
             # 获取自动选择配置文件路径
             config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "auto_select_config.json")
             
-            # 读取现有配置
-            if os.path.exists(config_file):
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-            else:
-                config = {}
+            # 读取现有配置（只在第一次保存时读取文件，之后使用内存中的副本，待写入的内容不会被旧文件覆盖）
+            config = getattr(self, '_auto_select_file_config', None)
+            if config is None:
+                if os.path.exists(config_file):
+                    with open(config_file, 'r', encoding='utf-8') as f:
+                        config = json.load(f)
+                else:
+                    config = {}
+                self._auto_select_file_config = config
             
             # 更新配置
             config['priority_profession'] = self.health_monitor.priority_profession
             
-            # 保存配置
-            with open(config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=4)
+            # 交给延迟写入器在后台保存
+            from persistence import schedule_write
+            schedule_write(config_file, json.dumps(config, ensure_ascii=False, indent=4))
                 
         except Exception as e:
             print(f"保存优先职业设置失败: {e}")
@@ -15186,9 +15250,9 @@ class MainWindow(FluentWindow):
                     'upper': self.default_hp_color_upper.tolist()
                 }
             }
-            with open(config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=4)
-            print(f"默认血条颜色设置已保存到 {config_file}")
+            from persistence import schedule_write
+            schedule_write(config_file, json.dumps(config, ensure_ascii=False, indent=4))
+            print(f"默认血条颜色设置将保存到 {config_file}")
         except Exception as e:
             print(f"保存默认血条颜色设置失败: {e}")
 
@@ -15266,69 +15330,69 @@ class MainWindow(FluentWindow):
 
     def check_calibration_file(self):
         """检查校准文件是否有效，必要时尝试修复"""
-        import os
         import json
+        from persistence import schedule_write, read_text, file_exists
         
         calibration_file = "health_bars_calibration.json"
         
-        # 检查文件是否存在
-        if not os.path.exists(calibration_file):
+        # 检查文件是否存在（包括已保存但尚未写入磁盘的内容）
+        if not file_exists(calibration_file):
             print(f"校准文件 {calibration_file} 不存在")
             return False
         
         # 尝试加载文件检查是否有效
         try:
-            with open(calibration_file, 'r', encoding='utf-8') as f:
+            content = read_text(calibration_file)
+            try:
+                data = json.loads(content)
+                # 检查基本结构
+                if not isinstance(data, dict):
+                    print(f"校准文件不是有效的JSON对象: {type(data)}")
+                    return False
+                
+                # 检查是否包含校准集
+                if 'calibration_sets' not in data or not isinstance(data['calibration_sets'], dict):
+                    print(f"校准文件中没有有效的calibration_sets数据")
+                    return False
+                    
+                # 检查是否有至少一个校准集
+                if len(data['calibration_sets']) == 0:
+                    print(f"校准文件中没有任何校准集")
+                    return False
+                
+                # 文件有效
+                return True
+                
+            except json.JSONDecodeError as e:
+                print(f"校准文件JSON解析失败: {e}")
+                
+                # 尝试修复文件
                 try:
-                    data = json.load(f)
-                    # 检查基本结构
-                    if not isinstance(data, dict):
-                        print(f"校准文件不是有效的JSON对象: {type(data)}")
-                        return False
+                    # 尝试简单替换常见的无效JSON字符
+                    content = content.replace('\n', ' ').replace('\r', '')
+                    data = json.loads(content)
                     
-                    # 检查是否包含校准集
-                    if 'calibration_sets' not in data or not isinstance(data['calibration_sets'], dict):
-                        print(f"校准文件中没有有效的calibration_sets数据")
-                        return False
-                        
-                    # 检查是否有至少一个校准集
-                    if len(data['calibration_sets']) == 0:
-                        print(f"校准文件中没有任何校准集")
-                        return False
+                    # 如果成功解析，则写回文件
+                    schedule_write(calibration_file, json.dumps(data, indent=4, ensure_ascii=False))
                     
-                    # 文件有效
+                    print("校准文件已尝试修复")
                     return True
+                except Exception as fix_err:
+                    print(f"尝试修复校准文件失败: {fix_err}")
+                    return False
                     
-                except json.JSONDecodeError as e:
-                    print(f"校准文件JSON解析失败: {e}")
-                    
-                    # 尝试修复文件
-                    try:
-                        # 读取原始内容
-                        f.seek(0)
-                        content = f.read()
-                        
-                        # 尝试简单替换常见的无效JSON字符
-                        content = content.replace('\n', ' ').replace('\r', '')
-                        data = json.loads(content)
-                        
-                        # 如果成功解析，则写回文件
-                        with open(calibration_file, 'w', encoding='utf-8') as out_f:
-                            json.dump(data, out_f, indent=4, ensure_ascii=False)
-                        
-                        print("校准文件已尝试修复")
-                        return True
-                    except Exception as fix_err:
-                        print(f"尝试修复校准文件失败: {fix_err}")
-                        return False
-                        
         except Exception as e:
             print(f"读取校准文件时出错: {e}")
             return False
 
 class RecognitionThread(QThread):
-    """队友识别线程类"""
+    """队友识别线程类
+    
+    在后台线程中逐个血条执行真实识别，每个队友识别完成后立即通过 teammate_signal 发出，
+    调用 requestInterruption() 后会在血条之间停止识别。
+    """
     progress_signal = pyqtSignal(dict)  # 进度信号
+    teammate_signal = pyqtSignal(dict)  # 单个队友识别结果信号
     result_signal = pyqtSignal(list)    # 结果信号
     
     def __init__(self, calibration, set_name):
@@ -15347,50 +15411,43 @@ class RecognitionThread(QThread):
         try:
             # 加载校准数据
             print(f"开始加载校准集: {self.set_name}")
-            self.calibration.load_calibration(self.set_name)
-            health_bars = self.calibration.health_bars
+            if not self.calibration.load_calibration(self.set_name):
+                self.progress_signal.emit({
+                    'current': 0,
+                    'total': 1,
+                    'message': f'加载校准集 {self.set_name} 失败'
+                })
+                self.result_signal.emit([])
+                return
             
-            # 打印血条信息，检查是否正确加载
-            print(f"加载到 {len(health_bars)} 个血条位置:")
-            for i, bar in enumerate(health_bars):
-                print(f"血条 {i+1}: x1={bar.get('x1')}, y1={bar.get('y1')}, x2={bar.get('x2')}, y2={bar.get('y2')}")
+            total = len(self.calibration.health_bars)
+            completed = [0]  # 已完成识别的血条数量
             
-            results = []
+            self.progress_signal.emit({
+                'current': 0,
+                'total': total,
+                'message': f'正在识别 {total} 个血条区域...'
+            })
             
-            # 循环识别每个血条区域
-            for i, health_bar in enumerate(health_bars):
-                # 检查是否被中断
-                if self.isInterruptionRequested():
-                    break
-                    
-                # 发送进度信号
+            def on_teammate(index, teammate):
+                """单个队友识别完成后立即发送结果"""
+                completed[0] += 1
+                self.teammate_signal.emit(teammate)
                 self.progress_signal.emit({
-                    'current': i + 1,
-                    'total': len(health_bars),
-                    'message': f'正在识别第 {i+1}/{len(health_bars)} 个血条区域'
+                    'current': completed[0],
+                    'total': total,
+                    'message': f"已识别第 {index+1} 个血条: {teammate['name']} ({teammate['profession']})"
                 })
-                
-                # 延时一点时间，防止识别过快造成UI更新不及时
-                self.msleep(100)
-                
-                # 执行识别...
-                # 这里会实际调用calibration对象进行识别
-                # 为了简化示例，我们这里创建一个模拟结果
-                result = {
-                    'name': f"队友{i+1}",
-                    'profession': '未知',
-                    'health_bar': health_bar
-                }
-                results.append(result)
             
-            # 如果没有被中断，发送完整结果
-            if not self.isInterruptionRequested():
-                # 实际执行识别
-                print("开始执行队友识别...")
-                teammates = self.calibration.recognize_teammates()
-                print(f"识别完成，返回 {len(teammates) if teammates else 0} 个队友信息")
-                # 发送结果信号
-                self.result_signal.emit(teammates if teammates else results)
+            print("开始执行队友识别...")
+            teammates = self.calibration.recognize_teammates(
+                on_result=on_teammate,
+                should_stop=self.isInterruptionRequested
+            )
+            print(f"识别完成，返回 {len(teammates)} 个队友信息")
+            
+            # 被中断时也发送已完成的部分结果
+            self.result_signal.emit(teammates)
         
         except Exception as e:
             # 发送错误信息
@@ -16206,8 +16263,12 @@ class TextInputMessageBox(MessageBoxBase):
         except Exception as e:
             print(f"设置阴影效果时出错: {e}")
 
-def main():
-    """主函数，用于启动应用程序"""
+def create_application():
+    """创建并配置 QApplication（高DPI、全局异常处理、样式、字体和主题）
+
+    返回:
+        QApplication: 应用程序实例
+    """
     # 设置高DPI支持 - 在创建应用程序之前进行设置
     # 注意：必须在QApplication实例化之前设置这些属性
     QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
@@ -16235,6 +16296,11 @@ def main():
     
     # 设置主题
     setTheme(Theme.AUTO)
+    return app
+
+def main():
+    """主函数，用于启动应用程序"""
+    app = create_application()
     
     # 创建主窗口
     window = MainWindow()
@@ -16243,7 +16309,8 @@ def main():
     exit_code = app.exec_()
 
     # 确保 pygame 在退出时正确清理 (虽然 closeEvent 里有，这里再加一层保险)
-    pygame.quit()
+    if is_loaded(pygame):
+        pygame.quit()
 
     sys.exit(exit_code)
 
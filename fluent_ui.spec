@@ -38,7 +38,8 @@ a = Analysis(
         'ppocr', 'ppstructure', 'requests', 'shapely', 'pyclipper', 
         'skimage', 'lmdb', 'albumentations', 'docx', 'paddle', 'PIL', 
         'scipy', 'yaml', 'lxml', 'fontTools', 'certifi', 'pyautogui', 
-        'pygame', 'edge_tts', 'keyboard', 'qtawesome', 'prettytable'
+        'pygame', 'edge_tts', 'keyboard', 'qtawesome', 'prettytable',
+        'health_bar_kernel', 'member_status', 'occlusion', 'paddleocr'
     ],
     hookspath=[],
     hooksconfig={},
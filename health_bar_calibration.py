@@ -23,7 +23,9 @@ from qfluentwidgets import (InfoBar, InfoBarPosition, MessageBoxBase, SubtitleLa
                            TransparentPushButton, LineEdit, StrongBodyLabel, FluentIcon as FIF)
 
 from 选择框 import show_selection_box
-from teammate_recognition import TeammateRecognition
+from persistence import schedule_write, read_text, file_exists, flush_all
+from health_bar_detection import detect_health_bars
+from config_defaults import DEFAULT_HP_COLOR, DETECTION_SETTINGS
 
 # 动态导入带空格的模块
 module_name = "team_members(choice box)"
@@ -54,9 +56,9 @@ class HealthBarCalibration:
         self.calibration_sets = {}  # 存储多组校准数据
         self.current_set_name = ""  # 当前使用的校准组名称
         self.health_bars = []  # 当前选择的血条区域列表
-        self.recognition = TeammateRecognition()  # 队友识别工具
+        self._recognition = None  # 队友识别工具，第一次识别时才创建
         self.signals = CalibrationSignals()
-        self.is_first_run = not os.path.exists(self.calibration_file)
+        self.is_first_run = not file_exists(self.calibration_file)
         
         # 新增：初始化全局默认颜色属性
         self.default_hp_color_lower = None
@@ -65,50 +67,67 @@ class HealthBarCalibration:
         # 加载校准数据
         self.load_all_calibration_sets()
     
+    @property
+    def recognition(self):
+        """队友识别工具
+        
+        创建时会加载PaddleOCR和已知名称索引，耗时数秒；只在第一次识别时创建，
+        切换校准集、读取布局等不需要识别的操作不会触发。
+        """
+        if self._recognition is None:
+            from teammate_recognition import TeammateRecognition
+            self._recognition = TeammateRecognition()
+        return self._recognition
+    
+    def write_calibration_file(self, data):
+        """保存校准文件：交给延迟写入器原子写入，不阻塞调用线程
+        
+        参数:
+            data (dict): 完整的校准文件内容
+        """
+        schedule_write(self.calibration_file, json.dumps(data, ensure_ascii=False, indent=4))
+    
     def load_all_calibration_sets(self):
-        """加载所有校准数据集"""
-        if not os.path.exists(self.calibration_file):
+        """加载所有校准数据集（包括已保存但尚未写入磁盘的内容）"""
+        if not file_exists(self.calibration_file):
             print(f"校准文件 {self.calibration_file} 不存在")
             self.calibration_sets = {}
             return False
             
         try:
             print(f"尝试加载校准文件: {self.calibration_file}")
-            with open(self.calibration_file, 'r', encoding='utf-8') as f:
+            content = read_text(self.calibration_file)
+            try:
+                data = json.loads(content)
+                print("JSON解析成功")
+                
+                if 'calibration_sets' in data and isinstance(data['calibration_sets'], dict):
+                    self.calibration_sets = data['calibration_sets']
+                    print(f"校准集数量: {len(self.calibration_sets)}")
+                    print(f"校准集名称: {list(self.calibration_sets.keys())}")
+                
+                    # 加载最后使用的校准集
+                    if 'last_used' in data and data['last_used'] in self.calibration_sets:
+                        self.current_set_name = data['last_used']
+                        self.health_bars = self.calibration_sets[self.current_set_name]['health_bars']
+                        print(f"加载最后使用的校准集: {self.current_set_name}")
+                    else:
+                        print("无最后使用的校准集或其已不存在")
+                
+                    return len(self.calibration_sets) > 0
+                else:
+                    print("校准文件中找不到有效的校准集数据")
+            except json.JSONDecodeError as json_err:
+                print(f"校准文件JSON解析失败: {json_err}")
                 try:
-                    data = json.load(f)
-                    print("JSON解析成功")
-                    
+                    # 尝试用不同的方式手动解析
+                    data = json.loads(content)
                     if 'calibration_sets' in data and isinstance(data['calibration_sets'], dict):
                         self.calibration_sets = data['calibration_sets']
-                        print(f"校准集数量: {len(self.calibration_sets)}")
-                        print(f"校准集名称: {list(self.calibration_sets.keys())}")
-                    
-                        # 加载最后使用的校准集
-                        if 'last_used' in data and data['last_used'] in self.calibration_sets:
-                            self.current_set_name = data['last_used']
-                            self.health_bars = self.calibration_sets[self.current_set_name]['health_bars']
-                            print(f"加载最后使用的校准集: {self.current_set_name}")
-                        else:
-                            print("无最后使用的校准集或其已不存在")
-                    
+                        print(f"使用替代方法成功加载校准集: {len(self.calibration_sets)}")
                         return len(self.calibration_sets) > 0
-                    else:
-                        print("校准文件中找不到有效的校准集数据")
-                except json.JSONDecodeError as json_err:
-                    print(f"校准文件JSON解析失败: {json_err}")
-                    # 尝试不同的编码方式
-                    f.seek(0)
-                    content = f.read()
-                    try:
-                        # 尝试用不同的方式手动解析
-                        data = json.loads(content)
-                        if 'calibration_sets' in data and isinstance(data['calibration_sets'], dict):
-                            self.calibration_sets = data['calibration_sets']
-                            print(f"使用替代方法成功加载校准集: {len(self.calibration_sets)}")
-                            return len(self.calibration_sets) > 0
-                    except Exception as alt_err:
-                        print(f"替代解析方法也失败: {alt_err}")
+                except Exception as alt_err:
+                    print(f"替代解析方法也失败: {alt_err}")
         except Exception as e:
             print(f"加载血条校准数据失败: {str(e)}")
             import traceback
@@ -182,8 +201,7 @@ class HealthBarCalibration:
                 'last_used': self.current_set_name
             }
             
-            with open(self.calibration_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
+            self.write_calibration_file(data)
             
             return True
         except Exception as e:
@@ -279,6 +297,87 @@ class HealthBarCalibration:
             traceback.print_exc()
             return False
     
+    def auto_calibrate(self, region=None):
+        """自动检测血条位置并保存为新的校准集
+        
+        截取整个屏幕（或指定区域），按血条颜色检测纵向排列的队伍血条，
+        无需逐个框选。界面布局变化后可以直接重新运行。
+        
+        参数:
+            region (tuple): 截取区域 (x1, y1, x2, y2)，为None时截取整个屏幕
+            
+        返回:
+            bool: 是否检测到血条并成功保存
+        """
+        try:
+            self.signals.status_signal.emit("正在自动检测血条位置...")
+            self.signals.progress_signal.emit(0)
+            
+            hp_color_lower, hp_color_upper = self._get_detection_colors()
+            settings = dict(DETECTION_SETTINGS)
+            try:
+                from config_manager import get_config
+                settings.update(get_config().get_json('detection', {}))
+            except Exception as e:
+                print(f"加载血条检测设置失败: {str(e)}")
+            
+            if region is None:
+                import pyautogui
+                screen = cv2.cvtColor(np.array(pyautogui.screenshot()), cv2.COLOR_RGB2BGR)
+                origin = (0, 0)
+            else:
+                screen = self._capture_screen_area(*region)
+                origin = (region[0], region[1])
+            if screen is None:
+                self.signals.status_signal.emit("截取屏幕失败，无法自动检测血条")
+                return False
+            
+            start_time = time.time()
+            health_bars = detect_health_bars(screen, hp_color_lower, hp_color_upper, origin, settings)
+            print(f"血条自动检测耗时: {(time.time() - start_time) * 1000:.1f} ms")
+            self.signals.progress_signal.emit(50)
+            
+            if not health_bars:
+                self.signals.status_signal.emit("未检测到血条，请检查血条颜色设置或手动校准")
+                return False
+            
+            self.current_set_name = f"自动{len(health_bars)}条血条_{time.strftime('%m%d%H%M')}"
+            self.health_bars = health_bars
+            
+            success = self.save_calibration()
+            if success:
+                self.signals.status_signal.emit(f"自动检测到 {len(health_bars)} 条血条并保存为 '{self.current_set_name}'")
+                self.signals.progress_signal.emit(100)
+                self.signals.complete_signal.emit(self.health_bars)
+            else:
+                self.signals.status_signal.emit("血条自动检测完成但保存失败")
+            return success
+        except Exception as e:
+            self.signals.status_signal.emit(f"自动检测血条时发生错误: {e}")
+            print(f"自动检测血条时发生错误: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+    
+    def _get_detection_colors(self):
+        """获取自动检测使用的血条颜色范围
+        
+        优先使用全局默认颜色，其次使用配置中的默认血条颜色
+        
+        返回:
+            tuple: (BGR下限, BGR上限)
+        """
+        if self.default_hp_color_lower is not None and self.default_hp_color_upper is not None:
+            return self.default_hp_color_lower, self.default_hp_color_upper
+        
+        color = DEFAULT_HP_COLOR
+        try:
+            from config_manager import get_config
+            color = get_config().get_json('default_hp_color', DEFAULT_HP_COLOR)
+        except Exception as e:
+            print(f"加载默认血条颜色失败: {str(e)}")
+        return np.array(color['lower'], dtype=np.uint8), np.array(color['upper'], dtype=np.uint8)
+    
     def get_calibration_set_names(self):
         """获取所有校准集名称
         
@@ -300,6 +399,80 @@ class HealthBarCalibration:
             return self.calibration_sets[set_name]
         return None
     
+    def get_next_set_name(self, set_name=None):
+        """获取下一个校准集名称，用于快捷键循环切换
+        
+        参数:
+            set_name (str): 当前校准集名称，默认使用 current_set_name
+            
+        返回:
+            str: 下一个校准集名称，没有校准集时返回None
+        """
+        names = self.get_calibration_set_names()
+        if not names:
+            return None
+        if set_name is None:
+            set_name = self.current_set_name
+        if set_name not in names:
+            return names[0]
+        return names[(names.index(set_name) + 1) % len(names)]
+    
+    def get_set_layout(self, set_name):
+        """获取校准集中已识别队友的血条布局
+        
+        切换校准集时直接使用识别阶段保存的名称和职业，不需要重新识别。
+        
+        参数:
+            set_name (str): 校准集名称
+            
+        返回:
+            tuple: (布局列表, 未识别的血条数)；布局列表中每项包含
+                   name、profession、x1、y1、x2、y2 和 bar（紧凑血条区域，可能为None）
+        """
+        info = self.get_calibration_set_info(set_name)
+        if not info:
+            return [], 0
+        layout = []
+        unrecognized = 0
+        for health_bar in info.get('health_bars', []):
+            if not health_bar.get('recognition_done') or not health_bar.get('name'):
+                unrecognized += 1
+                continue
+            layout.append({
+                'name': health_bar['name'],
+                'profession': health_bar.get('profession', '未知'),
+                'x1': health_bar['x1'],
+                'y1': health_bar['y1'],
+                'x2': health_bar['x2'],
+                'y2': health_bar['y2'],
+                'bar': health_bar.get('bar')
+            })
+        return layout, unrecognized
+    
+    def set_last_used(self, set_name):
+        """记录最后使用的校准集，不修改校准数据本身
+        
+        参数:
+            set_name (str): 校准集名称
+            
+        返回:
+            bool: 是否成功保存
+        """
+        if set_name not in self.calibration_sets:
+            return False
+        self.current_set_name = set_name
+        self.health_bars = self.calibration_sets[set_name]['health_bars']
+        try:
+            data = {
+                'calibration_sets': self.calibration_sets,
+                'last_used': set_name
+            }
+            self.write_calibration_file(data)
+            return True
+        except Exception as e:
+            print(f"保存最后使用的校准集失败: {str(e)}")
+            return False
+    
     def delete_calibration_set(self, set_name):
         """删除指定的校准集
         
@@ -331,8 +504,7 @@ class HealthBarCalibration:
                     'last_used': self.current_set_name
                 }
                 
-                with open(self.calibration_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=4)
+                self.write_calibration_file(data)
                 
                 return True
             except Exception as e:
@@ -383,75 +555,68 @@ class HealthBarCalibration:
             traceback.print_exc()
             return None
     
-    def recognize_teammates(self):
+    def recognize_teammates(self, on_result=None, max_workers=None, should_stop=None):
         """识别血条区域对应的队友
         
-        对每个已校准的血条区域进行队友识别，并保存识别结果
+        先依次截取所有血条区域，再通过线程池并行识别，每个血条一个任务，
+        每个队友识别完成后立即处理并回调，无需等待全部完成。
+        
+        参数:
+            on_result: 单个队友识别完成时的回调 on_result(index, teammate)，teammate为队友信息字典
+            max_workers: 并行识别的工作线程数，默认使用识别设置中的值
+            should_stop: 返回True时停止识别，已完成的队友结果仍会保存
         
         返回:
-            list: 识别到的队友信息列表
+            list: 识别到的队友信息列表（按血条顺序）
         """
         if not self.health_bars:
             self.signals.status_signal.emit("请先选择校准集")
             return []
         
-        teammates = []
         profession_icons = self.recognition.load_profession_icons()
         
+        # 截取所有血条区域的图像
+        tasks = []
         for i, health_bar in enumerate(self.health_bars):
-            self.signals.status_signal.emit(f"正在识别第 {i+1}/{len(self.health_bars)} 个血条的队友...")
-            self.signals.progress_signal.emit(int(i * 100 / len(self.health_bars)))
+            if should_stop and should_stop():
+                self.signals.status_signal.emit("队友识别已取消")
+                return []
+            x1, y1, x2, y2 = health_bar['x1'], health_bar['y1'], health_bar['x2'], health_bar['y2']
+            screenshot = self._capture_screen_area(x1, y1, x2, y2)
+            if screenshot is not None:
+                tasks.append((i, [screenshot]))
+        
+        self.signals.status_signal.emit(f"正在并行识别 {len(tasks)} 个血条的队友...")
+        
+        teammates_by_index = {}
+        completed = [0]  # 已完成的识别任务数
+        
+        def handle_result(i, recognition_result):
+            completed[0] += 1
+            self.signals.progress_signal.emit(int(completed[0] * 100 / len(self.health_bars)))
+            if recognition_result is None:
+                self.signals.status_signal.emit(f"识别第 {i+1} 个血条的队友时出错")
+                return
             
             try:
-                # 截取血条区域的图像
-                x1, y1, x2, y2 = health_bar['x1'], health_bar['y1'], health_bar['x2'], health_bar['y2']
-                screenshot = self._capture_screen_area(x1, y1, x2, y2)
-                
-                if screenshot is None:
-                    continue
-                
-                # 识别队友职业
-                profession = self.recognition.match_profession_icon(screenshot, profession_icons)
-                
-                # 识别队友名称
-                name = self.recognition.extract_name(screenshot)
-                if name == '未识别':
-                    name = f"队友{i+1}"
-                
-                # 更新血条信息
-                health_bar['recognition_done'] = True
-                health_bar['name'] = name
-                health_bar['profession'] = profession or '未知'
-                
-                # 创建队友对象
-                teammate = TeamMember(name, profession or '未知')
-                teammate.x1 = x1
-                teammate.y1 = y1
-                teammate.x2 = x2
-                teammate.y2 = y2
-                
-                # 应用颜色设置
-                if self.default_hp_color_lower is not None and self.default_hp_color_upper is not None:
-                    teammate.hp_color_lower = np.copy(self.default_hp_color_lower)
-                    teammate.hp_color_upper = np.copy(self.default_hp_color_upper)
-                else:
-                    # 如果没有全局默认颜色，则使用硬编码的备用值
-                    teammate.hp_color_lower = np.array([45, 80, 130]) 
-                    teammate.hp_color_upper = np.array([60, 160, 210])
-                
-                # 保存队友配置
-                teammate.save_config()
-                
-                teammates.append({
-                    'name': name,
-                    'profession': profession or '未知',
-                    'health_bar': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2}
-                })
-                
-                self.signals.status_signal.emit(f"识别到队友: {name} ({profession or '未知'})")
-                
+                teammate = self._apply_recognition_result(i, recognition_result)
             except Exception as e:
                 self.signals.status_signal.emit(f"识别第 {i+1} 个血条的队友时出错: {str(e)}")
+                return
+            
+            teammates_by_index[i] = teammate
+            self.signals.status_signal.emit(f"识别到队友: {teammate['name']} ({teammate['profession']})")
+            if on_result:
+                on_result(i, teammate)
+        
+        self.recognition.recognize_many(tasks, profession_icons, on_result=handle_result,
+                                        max_workers=max_workers, should_stop=should_stop)
+        
+        teammates = [teammates_by_index[i] for i in sorted(teammates_by_index)]
+        
+        # 整批识别结束后再加入已知名称：识别期间名称索引不变，吸附结果与完成顺序无关
+        for teammate in teammates:
+            self.recognition.remember_name(teammate['name'])
         
         # 更新当前校准集中的识别状态
         if self.current_set_name:
@@ -463,6 +628,59 @@ class HealthBarCalibration:
         
         return teammates
     
+    def _apply_recognition_result(self, i, recognition_result):
+        """将单个血条的识别结果写入校准数据并保存队友配置
+        
+        参数:
+            i (int): 血条序号
+            recognition_result (dict): TeammateRecognition.recognize_teammate 的返回值
+            
+        返回:
+            dict: 队友信息，包含 name、profession 和 health_bar
+        """
+        health_bar = self.health_bars[i]
+        x1, y1, x2, y2 = health_bar['x1'], health_bar['y1'], health_bar['x2'], health_bar['y2']
+        profession = recognition_result['profession']
+        
+        # 识别队友名称
+        name = recognition_result['name']
+        if name == '未识别':
+            name = f"队友{i+1}"
+        
+        # 更新血条信息
+        health_bar['recognition_done'] = True
+        health_bar['name'] = name
+        health_bar['profession'] = profession or '未知'
+        
+        # 创建队友对象
+        teammate = TeamMember(name, profession or '未知')
+        teammate.x1 = x1
+        teammate.y1 = y1
+        teammate.x2 = x2
+        teammate.y2 = y2
+        
+        # 应用颜色设置
+        if self.default_hp_color_lower is not None and self.default_hp_color_upper is not None:
+            teammate.hp_color_lower = np.copy(self.default_hp_color_lower)
+            teammate.hp_color_upper = np.copy(self.default_hp_color_upper)
+        else:
+            # 如果没有全局默认颜色，则使用硬编码的备用值
+            teammate.hp_color_lower = np.array([45, 80, 130]) 
+            teammate.hp_color_upper = np.array([60, 160, 210])
+        
+        # 紧凑血条区域：自动检测时已得到，手动框选时从截图中细化
+        if health_bar.get('bar'):
+            teammate.bar_roi = dict(health_bar['bar'])
+            teammate.save_config()
+        elif not teammate.refine_bar_roi():
+            teammate.save_config()
+        
+        return {
+            'name': name,
+            'profession': profession or '未知',
+            'health_bar': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2}
+        }
+    
     def _capture_screen_area(self, x1, y1, x2, y2):
         """截取屏幕区域
         
@@ -492,9 +710,10 @@ class HealthBarCalibration:
         self.current_set_name = ""
         self.health_bars = []
         
-        # 删除校准文件
-        if os.path.exists(self.calibration_file):
+        # 删除校准文件（先写出尚未落盘的保存，避免删除后又被延迟写入器写回）
+        if file_exists(self.calibration_file):
             try:
+                flush_all()
                 os.remove(self.calibration_file)
             except Exception as e:
                 self.signals.status_signal.emit(f"删除校准文件失败: {str(e)}")
@@ -532,9 +751,10 @@ class HealthBarCalibration:
         self.current_set_name = ""
         self.health_bars = []
         
-        # 删除校准文件
-        if os.path.exists(self.calibration_file):
+        # 删除校准文件（先写出尚未落盘的保存，避免删除后又被延迟写入器写回）
+        if file_exists(self.calibration_file):
             try:
+                flush_all()
                 os.remove(self.calibration_file)
             except Exception as e:
                 self.signals.status_signal.emit(f"删除校准文件失败: {str(e)}")
@@ -571,8 +791,7 @@ class HealthBarCalibration:
                 'last_used': self.current_set_name
             }
             
-            with open(self.calibration_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
+            self.write_calibration_file(data)
             
             self.signals.status_signal.emit("已清除所有队友识别结果")
             return True
@@ -705,6 +924,12 @@ class CalibrationDialog(QDialog):
         self.calibrate_btn.clicked.connect(self.show_calibration_options)
         buttons_layout.addWidget(self.calibrate_btn)
         
+        # 自动检测按钮
+        self.auto_detect_btn = QPushButton("自动检测")
+        self.auto_detect_btn.setToolTip("按血条颜色自动检测队伍血条位置，界面布局变化后可直接重新检测")
+        self.auto_detect_btn.clicked.connect(self.auto_calibrate)
+        buttons_layout.addWidget(self.auto_detect_btn)
+        
         # 识别队友按钮
         self.recognize_btn = QPushButton("识别队友")
         self.recognize_btn.clicked.connect(self.recognize_teammates)
@@ -895,6 +1120,26 @@ class CalibrationDialog(QDialog):
         self.setEnabled(True)  # 恢复对话框
         self.update_button_states()
     
+    def auto_calibrate(self):
+        """自动检测血条位置"""
+        self.setEnabled(False)  # 禁用对话框，防止用户操作
+        QApplication.processEvents()  # 更新UI
+        
+        try:
+            success = self.calibration.auto_calibrate()
+            if success:
+                self.result_label.setText("自动检测完成！\n\n" + 
+                                         f"已检测到 {len(self.calibration.health_bars)} 个血条位置\n\n" + 
+                                         '接下来可以点击"识别队友"进行自动识别')
+                self.load_calibration_sets()
+            else:
+                self.result_label.setText("未能自动检测到血条，请检查血条颜色设置或使用\"新建校准\"手动框选")
+        except Exception as e:
+            self.result_label.setText(f"自动检测过程中出错: {str(e)}")
+        
+        self.setEnabled(True)  # 恢复对话框
+        self.update_button_states()
+    
     def on_calibration_complete(self, health_bars):
         """校准完成后的回调"""
         self.update_button_states()
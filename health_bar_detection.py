@@ -0,0 +1,235 @@
+import cv2
+import numpy as np
+
+from config_defaults import DETECTION_SETTINGS
+
+
+def find_bar_segments(image, hp_color_lower, hp_color_upper, settings=None):
+    """在截图中查找血条颜色的水平线段
+
+    先按颜色范围生成掩码，用水平方向的闭运算连接被文字或边框切断的像素，
+    再用连通域统计筛选出又扁又长的区域。
+
+    参数:
+        image (np.ndarray): BGR格式截图
+        hp_color_lower (array-like): 血条颜色的BGR下限
+        hp_color_upper (array-like): 血条颜色的BGR上限
+        settings (dict): 检测参数，默认使用 DETECTION_SETTINGS
+
+    返回:
+        list: [(x, y, w, h), ...]，按y坐标排序
+    """
+    settings = settings or DETECTION_SETTINGS
+    lower = np.asarray(hp_color_lower, dtype=np.uint8)
+    upper = np.asarray(hp_color_upper, dtype=np.uint8)
+    mask = cv2.inRange(image, lower, upper)
+
+    # 只在水平方向闭运算，避免把上下相邻的两条血条连成一块
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (settings['close_kernel_width'], 1))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    segments = []
+    for label in range(1, count):
+        x, y, w, h, area = stats[label]
+        if h < settings['min_bar_height'] or h > settings['max_bar_height']:
+            continue
+        if w < settings['min_bar_width'] or w < h * settings['min_bar_aspect']:
+            continue
+        # 填充率太低的连通域通常是文字或图标碎片
+        if area < w * h * settings['min_fill_ratio']:
+            continue
+        segments.append((int(x), int(y), int(w), int(h)))
+
+    segments.sort(key=lambda s: s[1])
+    return segments
+
+
+def measure_track_end(image, segment, settings=None):
+    """从填充末端向右测量血条底槽（未填充部分）的右端
+
+    取血条所在的行，计算填充末端右侧每列的平均颜色；以紧邻填充的几列为底槽颜色，
+    颜色与之相差超过阈值的第一列视为底槽的右边框。满血时填充右侧紧接边框，返回值约等于填充末端。
+
+    参数:
+        image (np.ndarray): BGR格式截图
+        segment (tuple): 填充线段 (x, y, w, h)
+        settings (dict): 检测参数，默认使用 DETECTION_SETTINGS
+
+    返回:
+        int: 底槽右端的x坐标（不含）
+    """
+    settings = settings or DETECTION_SETTINGS
+    x, y, w, h = segment
+    fill_end = x + w
+    band = image[y:y + h, fill_end:]
+    if band.shape[1] == 0:
+        return fill_end
+    columns = band.astype(np.float32).mean(axis=0)
+    # 跳过紧贴填充末端的抗锯齿列，取其后几列作为底槽颜色
+    reference_columns = columns[1:1 + settings['track_reference_columns']]
+    if len(reference_columns) == 0:
+        return fill_end
+    reference = reference_columns.mean(axis=0)
+    difference = np.abs(columns - reference).max(axis=1)
+    edges = np.nonzero(difference[1:] > settings['track_edge_threshold'])[0]
+    return fill_end + (int(edges[0]) + 1 if edges.size else band.shape[1])
+
+
+def vote_bar_end(group, track_ends, tolerance):
+    """按队伍中各血条的右端投票确定满血时血条的右端
+
+    满血的血条填充末端就是右端，未满血的血条底槽右端才是右端；而满血血条右侧的
+    底槽测量会越过边框落到背景上，得到任意的位置。候选位置为所有填充末端和底槽右端，
+    一个血条的填充末端或底槽右端与候选位置相差不超过 tolerance 即支持该位置，取支持最多的位置。
+    支持数相同时取靠左的：全员满血时底槽测量可能一致地落到面板边缘上，与填充末端票数相同。
+    只有一条血条时无法判断，按最宽的填充计算（与底槽右端票数相同）。
+
+    参数:
+        group (list): 同一队伍的线段 [(x, y, w, h), ...]
+        track_ends (list): 与线段对应的底槽右端
+        tolerance (int): 视为同一位置的最大偏差（像素）
+
+    返回:
+        int: 血条右端的x坐标（不含），不小于最宽的填充末端
+    """
+    fill_ends = [x + w for x, _, w, _ in group]
+    best_end, best_support = max(fill_ends), 0
+    for candidate in fill_ends + list(track_ends):
+        if candidate < max(fill_ends):
+            continue
+        support = sum(1 for fill_end, track_end in zip(fill_ends, track_ends)
+                      if abs(fill_end - candidate) <= tolerance or abs(track_end - candidate) <= tolerance)
+        if support > best_support or (support == best_support and candidate < best_end):
+            best_end, best_support = candidate, support
+    return best_end
+
+
+def group_party_stack(segments, settings=None, image=None):
+    """将线段分组为纵向排列的队伍血条
+
+    队伍血条从左侧开始填充，因此同一队伍的血条左边缘对齐、高度相近，并以固定间距纵向排列。
+    取左边缘对齐的最大一组线段，按中位间距检查间隔是否规则，
+    间隔为整数倍时补上缺失的血条（例如血量为0的队友）。
+    线段只是血条的填充部分，满血宽度由各血条的右端投票决定（传入截图时），
+    因此检测时没有队友满血也能得到完整的血条宽度，参见 vote_bar_end。
+
+    参数:
+        segments (list): find_bar_segments 返回的线段
+        settings (dict): 检测参数，默认使用 DETECTION_SETTINGS
+        image (np.ndarray): 检测用的BGR截图，用于测量底槽；为None时以最宽的填充作为满血宽度
+
+    返回:
+        tuple: (血条列表, 间距)。血条列表为 [(x, y, w, h, 是否为补全), ...]，
+               间距在少于两条血条时为None
+    """
+    settings = settings or DETECTION_SETTINGS
+    if not segments:
+        return [], None
+
+    tolerance = settings['align_tolerance']
+    groups = []
+    for segment in segments:
+        for group in groups:
+            x0, _, _, h0 = group[0]
+            if abs(segment[0] - x0) <= tolerance and abs(segment[3] - h0) <= tolerance:
+                group.append(segment)
+                break
+        else:
+            groups.append([segment])
+
+    # 优先取成员最多的一组，数量相同时取总宽度最大的一组
+    group = max(groups, key=lambda g: (len(g), sum(s[2] for s in g)))
+    group.sort(key=lambda s: s[1])
+
+    # 所有血条共用对齐后的左边缘、高度和满血宽度
+    left = int(np.median([s[0] for s in group]))
+    height = int(np.median([s[3] for s in group]))
+    full_width = max(s[2] for s in group)
+    if image is not None:
+        track_ends = [measure_track_end(image, segment, settings) for segment in group]
+        bar_end = vote_bar_end(group, track_ends, tolerance)
+        full_width = max(full_width, bar_end - left)
+
+    if len(group) < 2:
+        _, y, _, h = group[0]
+        return [(left, y, full_width, h, False)], None
+
+    gaps = np.diff([s[1] for s in group])
+    pitch = float(np.median(gaps))
+    if pitch <= 0:
+        return [(left, y, full_width, h, False) for _, y, _, h in group], None
+
+    bars = [(left, group[0][1], full_width, height, False)]
+    spacing_tolerance = settings['spacing_tolerance']
+    for previous, current in zip(group, group[1:]):
+        steps = (current[1] - previous[1]) / pitch
+        rounded = int(round(steps))
+        if rounded < 1 or abs(steps - rounded) > spacing_tolerance:
+            # 间距不规则的线段不属于队伍框
+            print(f"忽略间距不规则的血条候选: y={current[1]} (间距倍数 {steps:.2f})")
+            continue
+        for k in range(1, rounded):
+            bars.append((left, int(round(previous[1] + k * pitch)), full_width, height, True))
+        bars.append((left, current[1], full_width, height, False))
+
+    return bars, pitch
+
+
+def detect_health_bars(image, hp_color_lower, hp_color_upper, origin=(0, 0), settings=None):
+    """从整屏或窗口截图中自动检测队伍血条
+
+    参数:
+        image (np.ndarray): BGR格式截图
+        hp_color_lower (array-like): 血条颜色的BGR下限
+        hp_color_upper (array-like): 血条颜色的BGR上限
+        origin (tuple): 截图左上角在屏幕上的坐标，返回的坐标都会加上该偏移
+        settings (dict): 检测参数，默认使用 DETECTION_SETTINGS
+
+    返回:
+        list: 每条血条一个字典，格式与校准数据一致:
+              x1/y1/x2/y2 为整个队友框（名称、图标和血条），供队友识别使用；
+              bar 为紧贴血条的区域，name_region 和 icon_region 为名称栏和职业图标区域；
+              interpolated 表示该血条是按间距补全的（检测时血条为空）
+    """
+    settings = settings or DETECTION_SETTINGS
+    if image is None or image.size == 0:
+        print("错误: 检测血条的截图为空")
+        return []
+
+    segments = find_bar_segments(image, hp_color_lower, hp_color_upper, settings)
+    bars, pitch = group_party_stack(segments, settings, image)
+    if not bars:
+        return []
+
+    screen_h, screen_w = image.shape[:2]
+    ox, oy = origin
+    # 只有一条血条时无法得知间距，按血条高度估算队友框高度
+    if pitch is None:
+        pitch = bars[0][3] * settings['single_bar_pitch_ratio']
+    frame_height = int(round(pitch * settings['frame_height_ratio']))
+
+    results = []
+    for x, y, w, h, interpolated in bars:
+        # 队友框以血条底边为底，名称栏位于血条上方，职业图标位于血条左侧
+        frame_y1 = max(0, y + h - frame_height)
+        frame_y2 = min(screen_h, y + h)
+        icon_size = frame_y2 - frame_y1
+        icon_x1 = max(0, x - icon_size - settings['icon_gap'])
+        icon_x2 = max(icon_x1, x - settings['icon_gap'])
+        bar_x2 = min(screen_w, x + w)
+
+        results.append({
+            'x1': ox + icon_x1,
+            'y1': oy + frame_y1,
+            'x2': ox + bar_x2,
+            'y2': oy + frame_y2,
+            'bar': {'x1': ox + x, 'y1': oy + y, 'x2': ox + bar_x2, 'y2': oy + y + h},
+            'name_region': {'x1': ox + x, 'y1': oy + frame_y1, 'x2': ox + bar_x2, 'y2': oy + y},
+            'icon_region': {'x1': ox + icon_x1, 'y1': oy + frame_y1, 'x2': ox + icon_x2, 'y2': oy + frame_y2},
+            'interpolated': interpolated,
+            'recognition_done': False
+        })
+
+    print(f"自动检测到 {len(results)} 条血条" + (f"，间距 {pitch:.1f} 像素" if len(results) > 1 else ""))
+    return results
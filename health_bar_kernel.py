@@ -0,0 +1,600 @@
+"""血条测量内核
+
+血量测量的唯一入口：截图、颜色掩码和填充宽度计算都在这里完成，
+队员血量更新、监控线程和独立测试脚本共用同一个模块对象。
+
+稳定接口:
+    measure(frame, lower, upper, rows=None)   测量一帧截图，返回血量百分比
+    measure_reading(frame, lower, upper, rows=None, timestamp=None)  测量一帧截图，返回 HpReading
+    measure_batch(frames, lowers, uppers, rows_list=None, timestamp=None)  测量多帧截图，返回 HpReading 列表
+    capture_frame(x1, y1, x2, y2)             截取一个区域
+    capture_regions(regions)                  一次截图截取多个区域
+    get_hp_percentage(x1, y1, x2, y2, lower, upper)  截图并测量一个区域
+    estimate_edge(frame, rows=None)           不依赖颜色范围，按亮度/饱和度剖面估计填充边缘
+
+填充宽度的计算可以替换为其他实现（查找表、JIT 编译等）：用 register_kernel() 注册，
+use_kernel() 切换，调用方不需要任何改动。内核函数的签名为
+kernel(frame_bgr, lower, upper) -> (填充到的列数, 匹配像素数)。
+
+内置两个内核:
+    numpy  cv2.inRange 生成掩码后按列扫描，始终可用
+    numba  安装了 numba 时可用，一次遍历截图完成颜色判断、最右填充列和匹配像素计数，
+           不生成任何中间数组；第一次使用时才导入 numba 并编译（结果缓存在磁盘上）
+使用哪个内核由配置 hp_kernel.backend 决定，默认 auto 表示有 numba 时使用 numba。
+可用 benchmark_hp_kernel.py 比较各内核的耗时。
+
+扫描线模式：传入 rows 时只对这几行做颜色判断（每行调用一次内核），各行的填充位置多数一致时
+取一致的结果，否则自动退回整个区域的测量。水平血条只需要几行就能确定填充边缘，
+每个队员的计算量按血条高度成倍减少。
+
+边缘估计：把截图（或扫描行）压缩为每列一个亮度+饱和度值的一维剖面，取剖面上左右两侧均值差
+最大的位置作为填充边缘。不需要颜色范围，只遍历一次一维剖面，用于交叉检验颜色测量的结果：
+颜色范围设置错误时颜色测量会得到0%，而边缘估计仍能找到填充边缘。
+
+测量记录 HpReading 中的填充位置精确到亚像素：血条边缘的抗锯齿列只有部分被填充，
+按该列亮度+饱和度在填充色和背景之间的位置插值。置信度综合了填充的致密程度
+（填充部分中匹配颜色的像素比例）和扫描行是否一致，下游可以对低置信度的读数多等一个tick再行动。
+记录中还带有测量行的平均亮度、饱和度和白色像素比例：没有填充时据此区分阵亡（发灰）、
+超出范围（变暗）和无法识别，参见 member_status.classify_reading；白色像素过多说明血条被提示框或
+飘字遮挡，参见 occlusion.check_occlusion。
+"""
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+import pyautogui
+
+from config_defaults import HP_KERNEL_SETTINGS, SCANLINE_SETTINGS, EDGE_ESTIMATE_SETTINGS
+
+# 匹配像素少于该值时提示颜色范围可能设置错误
+MIN_MATCHED_PIXELS = 5
+
+# BGR三个通道都不低于该值的像素视为白色（提示框、飘字等叠加在血条上的文字）
+WHITE_LEVEL = 200
+
+# 一次测量的结果
+#   hp: 血量百分比（0-100，亚像素精度）
+#   position: 亚像素填充位置（列，0到width）
+#   width: 截图宽度（列）
+#   fill_ratio: 已填充部分中匹配血条颜色的像素比例
+#   confidence: 置信度（0-1）
+#   timestamp: 截图时间
+#   brightness: 测量行的平均亮度（各像素BGR最大值，0-255）
+#   saturation: 测量行的平均饱和度（各像素BGR最大值-最小值，0-255）
+#   white_ratio: 测量行中白色像素（见 WHITE_LEVEL）的比例
+HpReading = namedtuple('HpReading', ['hp', 'position', 'width', 'fill_ratio', 'confidence', 'timestamp',
+                                     'brightness', 'saturation', 'white_ratio'])
+
+
+def measure_numpy(frame_bgr, lower, upper):
+    """默认内核：cv2.inRange 生成颜色掩码，取最右侧含有血条颜色的列
+
+    参数:
+        frame_bgr (np.ndarray): BGR格式的血条截图
+        lower (np.ndarray): 血条颜色的BGR下限（uint8）
+        upper (np.ndarray): 血条颜色的BGR上限（uint8）
+
+    返回:
+        tuple: (填充到的列数, 匹配像素数)
+    """
+    mask = cv2.inRange(frame_bgr, lower, upper)
+    columns = np.flatnonzero(mask.any(axis=0))
+    fill_end = int(columns[-1]) + 1 if columns.size else 0
+    return fill_end, cv2.countNonZero(mask)
+
+
+def _load_numba_kernel():
+    """导入 numba 并编译融合内核
+
+    返回:
+        callable: 内核函数，numba 不可用时返回None
+    """
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+
+    @njit(cache=True, nogil=True)
+    def _fused_scan(frame, lower, upper):
+        height, width = frame.shape[0], frame.shape[1]
+        l0, l1, l2 = lower[0], lower[1], lower[2]
+        u0, u1, u2 = upper[0], upper[1], upper[2]
+        fill_end = 0
+        matched = 0
+        for y in range(height):
+            for x in range(width):
+                c0 = frame[y, x, 0]
+                c1 = frame[y, x, 1]
+                c2 = frame[y, x, 2]
+                if l0 <= c0 <= u0 and l1 <= c1 <= u1 and l2 <= c2 <= u2:
+                    matched += 1
+                    if x >= fill_end:
+                        fill_end = x + 1
+        return fill_end, matched
+
+    def measure_numba(frame_bgr, lower, upper):
+        """融合内核：一次遍历完成颜色判断、最右填充列和匹配像素计数"""
+        fill_end, matched = _fused_scan(frame_bgr, lower, upper)
+        return int(fill_end), int(matched)
+
+    return measure_numba
+
+
+_kernels = {'numpy': measure_numpy}
+# 需要额外依赖的内核在第一次使用时才加载
+_kernel_loaders = {'numba': _load_numba_kernel}
+_active_name = 'numpy'
+_active_kernel = measure_numpy
+_configured = False
+
+
+def register_kernel(name, kernel):
+    """注册一个填充宽度内核
+
+    参数:
+        name (str): 内核名称
+        kernel (callable): kernel(frame_bgr, lower, upper) -> (填充到的列数, 匹配像素数)
+    """
+    _kernels[name] = kernel
+
+
+def use_kernel(name):
+    """切换当前使用的内核
+
+    参数:
+        name (str): 已注册的内核名称
+
+    返回:
+        bool: 是否切换成功，名称未注册时保持原内核
+    """
+    global _active_name, _active_kernel, _configured
+    kernel = get_kernel(name)
+    if kernel is None:
+        print(f"血条测量内核 {name} 不可用，继续使用 {_active_name}")
+        return False
+    _active_name, _active_kernel = name, kernel
+    _configured = True
+    return True
+
+
+def get_kernel(name):
+    """获取内核函数，需要时先加载
+
+    返回:
+        callable: 内核函数，不存在或依赖缺失时返回None
+    """
+    kernel = _kernels.get(name)
+    if kernel is None and name in _kernel_loaders:
+        try:
+            kernel = _kernel_loaders[name]()
+        except Exception as e:
+            print(f"加载血条测量内核 {name} 失败: {str(e)}")
+            kernel = None
+        if kernel is not None:
+            _kernels[name] = kernel
+        else:
+            # 依赖缺失时不再重复尝试
+            _kernel_loaders.pop(name, None)
+    return kernel
+
+
+def configure_kernel(backend=None):
+    """按配置选择内核
+
+    参数:
+        backend (str): 内核名称或 auto，默认读取配置 hp_kernel.backend
+
+    返回:
+        str: 实际使用的内核名称
+    """
+    global _configured
+    if backend is None:
+        backend = get_kernel_settings()['backend']
+    if backend == 'auto':
+        if not (get_kernel('numba') and use_kernel('numba')):
+            use_kernel('numpy')
+    elif not use_kernel(backend):
+        use_kernel('numpy')
+    _configured = True
+    print(f"血条测量内核: {_active_name}")
+    return _active_name
+
+
+def get_kernel_name():
+    """当前使用的内核名称"""
+    return _active_name
+
+
+def available_kernels():
+    """所有已注册和可按需加载的内核名称"""
+    return list(_kernels) + [name for name in _kernel_loaders if name not in _kernels]
+
+
+def load_kernel_settings():
+    """读取血条测量内核设置，配置中缺少的项使用默认值
+
+    返回的是配置管理器的只读视图，配置文件被修改后自动更新
+    """
+    try:
+        from config_manager import get_config
+        return get_config().view('hp_kernel', HP_KERNEL_SETTINGS)
+    except Exception as e:
+        print(f"加载血条测量内核设置失败: {str(e)}")
+        return dict(HP_KERNEL_SETTINGS)
+
+
+_kernel_settings = None
+
+
+def get_kernel_settings():
+    """血条测量内核设置（第一次使用时加载）"""
+    global _kernel_settings
+    if _kernel_settings is None:
+        _kernel_settings = load_kernel_settings()
+    return _kernel_settings
+
+
+def load_scanline_settings():
+    """读取扫描线模式设置，配置中缺少的项使用默认值
+
+    返回的是配置管理器的只读视图，配置文件被修改后自动更新
+    """
+    try:
+        from config_manager import get_config
+        return get_config().view('scanline', SCANLINE_SETTINGS)
+    except Exception as e:
+        print(f"加载扫描线设置失败: {str(e)}")
+        return dict(SCANLINE_SETTINGS)
+
+
+_scanline_settings = None
+
+
+def get_scanline_settings():
+    """扫描线模式设置（第一次使用时加载）"""
+    global _scanline_settings
+    if _scanline_settings is None:
+        _scanline_settings = load_scanline_settings()
+    return _scanline_settings
+
+
+def load_edge_settings():
+    """读取边缘估计设置，配置中缺少的项使用默认值
+
+    返回的是配置管理器的只读视图，配置文件被修改后自动更新
+    """
+    try:
+        from config_manager import get_config
+        return get_config().view('edge_estimate', EDGE_ESTIMATE_SETTINGS)
+    except Exception as e:
+        print(f"加载边缘估计设置失败: {str(e)}")
+        return dict(EDGE_ESTIMATE_SETTINGS)
+
+
+_edge_settings = None
+
+
+def get_edge_settings():
+    """边缘估计设置（第一次使用时加载）"""
+    global _edge_settings
+    if _edge_settings is None:
+        _edge_settings = load_edge_settings()
+    return _edge_settings
+
+
+def vote_fill_end(ends, tolerance):
+    """对各扫描行的填充位置做多数表决
+
+    参数:
+        ends (list): 每行填充到的列数
+        tolerance (int): 视为一致的最大列差
+
+    返回:
+        int: 超过半数的行彼此一致时返回这些行的中位数，否则返回None
+    """
+    ends = sorted(ends)
+    need = len(ends) // 2 + 1
+    for i in range(len(ends) - need + 1):
+        group = ends[i:i + need]
+        if group[-1] - group[0] <= tolerance:
+            return group[need // 2]
+    return None
+
+
+def measure_rows(frame_bgr, lower, upper, rows, tolerance):
+    """扫描线模式：只测量指定的几行
+
+    参数:
+        frame_bgr (np.ndarray): BGR格式的血条截图
+        lower, upper (np.ndarray): 血条颜色的BGR范围（uint8）
+        rows (sequence): 相对截图顶部的行号
+        tolerance (int): 各行填充位置视为一致的最大列差
+
+    返回:
+        tuple: (填充到的列数, 匹配像素数)；有效行不足或各行不一致时返回None
+    """
+    height = frame_bgr.shape[0]
+    ends = []
+    matched = 0
+    for row in rows:
+        if 0 <= row < height:
+            fill_end, row_matched = _active_kernel(frame_bgr[row:row + 1], lower, upper)
+            ends.append(fill_end)
+            matched += row_matched
+    if not ends:
+        return None
+    fill_end = vote_fill_end(ends, tolerance)
+    if fill_end is None:
+        return None
+    return fill_end, matched
+
+
+def _as_color(color):
+    """把颜色范围转换为 cv2.inRange 需要的 uint8 数组"""
+    if isinstance(color, np.ndarray) and color.dtype == np.uint8:
+        return color
+    return np.asarray(color, dtype=np.uint8)
+
+
+def subpixel_position(frame_bgr, fill_end, rows=None):
+    """按抗锯齿边缘列插值出亚像素填充位置
+
+    以边缘内侧的实心列为填充色、外侧一列为背景，最后一个匹配列和第一个未匹配列
+    各自按亮度+饱和度在两者之间的位置计算被覆盖的比例。
+
+    参数:
+        frame_bgr (np.ndarray): BGR格式的血条截图
+        fill_end (int): 按颜色掩码得到的填充列数
+        rows (sequence): 扫描行，为None时使用所有行
+
+    返回:
+        float: 填充位置（列）；边缘太靠近两端或填充与背景对比不足时返回 fill_end
+    """
+    width = frame_bgr.shape[1]
+    if fill_end < 2 or fill_end + 1 >= width:
+        return float(fill_end)
+    solid, partial_in, partial_out, background = edge_profile(frame_bgr[:, fill_end - 2:fill_end + 2], rows)
+    contrast = solid - background
+    if contrast < get_edge_settings()['min_contrast']:
+        return float(fill_end)
+    covered_in = min(1.0, max(0.0, (partial_in - background) / contrast))
+    covered_out = min(1.0, max(0.0, (partial_out - background) / contrast))
+    return fill_end - 1 + covered_in + covered_out
+
+
+def measure_reading(frame_bgr, lower, upper, rows=None, timestamp=None):
+    """测量一帧血条截图，返回完整的测量记录
+
+    血条从左向右填充，血量等于填充位置占截图宽度的比例。
+
+    参数:
+        frame_bgr (np.ndarray): BGR格式的血条截图，为None或空图时血量和置信度都为0
+        lower (array-like): 血条颜色的BGR下限
+        upper (array-like): 血条颜色的BGR上限
+        rows (sequence): 扫描线模式使用的行号，为None时测量整个区域
+        timestamp (float): 截图时间，默认为当前时间
+
+    返回:
+        HpReading: 测量记录
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    if frame_bgr is None or frame_bgr.size == 0:
+        return HpReading(0.0, 0.0, 0, 0.0, 0.0, timestamp, 0.0, 0.0, 0.0)
+    if not _configured:
+        configure_kernel()
+    lower = _as_color(lower)
+    upper = _as_color(upper)
+    height, width = frame_bgr.shape[:2]
+    confidence = 1.0
+    result = None
+    scanned_rows = height
+    if rows:
+        rows = [row for row in rows if 0 <= row < height]
+    if rows:
+        result = measure_rows(frame_bgr, lower, upper, rows, get_scanline_settings()['agree_tolerance'])
+        if result is None:
+            # 各扫描行不一致，说明有文字或特效遮挡了部分行
+            confidence *= get_scanline_settings()['disagreement_confidence']
+        else:
+            scanned_rows = len(rows)
+    if result is None:
+        # 未使用扫描线或各行不一致时测量整个区域
+        rows = None
+        result = _active_kernel(frame_bgr, lower, upper)
+    fill_end, matched = result
+    if matched < MIN_MATCHED_PIXELS:
+        print(f"警告: 几乎没有检测到血条颜色，请检查颜色范围设置: {lower} - {upper}")
+
+    fill_ratio = min(1.0, matched / (fill_end * scanned_rows)) if fill_end else 0.0
+    if fill_end:
+        # 填充部分只有零星像素匹配颜色时，多半是背景或特效中恰好有相近的颜色
+        confidence *= min(1.0, fill_ratio / get_kernel_settings()['solid_fill_ratio'])
+    position = subpixel_position(frame_bgr, fill_end, rows)
+    brightness, saturation, white_ratio = roi_statistics(frame_bgr, rows)
+    return HpReading(position / width * 100, position, width, fill_ratio, confidence, timestamp,
+                     brightness, saturation, white_ratio)
+
+
+def measure(frame_bgr, lower, upper, rows=None):
+    """测量一帧血条截图中的血量百分比
+
+    参数:
+        frame_bgr (np.ndarray): BGR格式的血条截图，为None或空图时返回0
+        lower (array-like): 血条颜色的BGR下限
+        upper (array-like): 血条颜色的BGR上限
+        rows (sequence): 扫描线模式使用的行号，为None时测量整个区域
+
+    返回:
+        float: 血量百分比（0-100）
+    """
+    return measure_reading(frame_bgr, lower, upper, rows).hp
+
+
+def _channel_extremes(frame_bgr, rows=None):
+    """每个像素BGR三个通道的最大值和最小值（int16），rows 不为None时只取这些行"""
+    if rows:
+        height = frame_bgr.shape[0]
+        rows = [row for row in rows if 0 <= row < height]
+        if rows:
+            frame_bgr = frame_bgr[rows]
+    return frame_bgr.max(axis=2).astype(np.int16), frame_bgr.min(axis=2).astype(np.int16)
+
+
+def roi_statistics(frame_bgr, rows=None):
+    """测量区域的平均亮度、平均饱和度和白色像素比例
+
+    参数:
+        frame_bgr (np.ndarray): BGR格式的血条截图
+        rows (sequence): 只使用这些行（扫描线），为None时使用所有行
+
+    返回:
+        tuple: (平均亮度, 平均饱和度, 白色像素比例)，亮度和饱和度为0-255的float
+    """
+    brightest, darkest = _channel_extremes(frame_bgr, rows)
+    return (float(brightest.mean()), float((brightest - darkest).mean()),
+            float((darkest >= WHITE_LEVEL).mean()))
+
+
+def edge_profile(frame_bgr, rows=None):
+    """把截图压缩为每列一个值的一维剖面
+
+    每个像素取 亮度(max) + 饱和度(max-min)，血条填充部分颜色鲜艳明亮，未填充部分暗淡发灰。
+
+    参数:
+        frame_bgr (np.ndarray): BGR格式的血条截图
+        rows (sequence): 只使用这些行，为None时使用所有行
+
+    返回:
+        np.ndarray: 每列的平均值（float）
+    """
+    brightest, darkest = _channel_extremes(frame_bgr, rows)
+    return (2 * brightest - darkest).mean(axis=0)
+
+
+def estimate_edge(frame_bgr, rows=None, min_contrast=None):
+    """不依赖颜色范围估计血量：取一维剖面上最强的阶跃边缘
+
+    对每个候选位置 x，阶跃强度 = 左侧均值 - 右侧均值（用前缀和一次算出所有位置），
+    强度最大的位置就是填充边缘。强度低于 min_contrast 时说明没有明显边缘（满血、空血或无法判断）。
+
+    参数:
+        frame_bgr (np.ndarray): BGR格式的血条截图
+        rows (sequence): 扫描行，为None时使用所有行
+        min_contrast (float): 最小阶跃强度，默认使用配置值
+
+    返回:
+        tuple: (血量百分比, 阶跃强度)，没有明显边缘时返回None
+    """
+    if frame_bgr is None or frame_bgr.size == 0 or frame_bgr.shape[1] < 2:
+        return None
+    if min_contrast is None:
+        min_contrast = get_edge_settings()['min_contrast']
+    profile = edge_profile(frame_bgr, rows)
+    width = profile.shape[0]
+    prefix = np.cumsum(profile)
+    left_count = np.arange(1, width)
+    left_mean = prefix[:-1] / left_count
+    right_mean = (prefix[-1] - prefix[:-1]) / (width - left_count)
+    steps = left_mean - right_mean
+    edge = int(np.argmax(steps))
+    contrast = float(steps[edge])
+    if contrast < min_contrast:
+        return None
+    return (edge + 1) / width * 100, contrast
+
+
+def measure_batch(frames, lowers, uppers, rows_list=None, timestamp=None):
+    """测量多帧血条截图
+
+    参数:
+        frames (list): BGR截图列表，元素可以为None（血量和置信度为0）
+        lowers (list): 每帧的BGR下限
+        uppers (list): 每帧的BGR上限
+        rows_list (list): 每帧的扫描行，为None或元素为None时测量整个区域
+        timestamp (float): 截图时间，默认为当前时间
+
+    返回:
+        list: 每帧的 HpReading
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    if rows_list is None:
+        rows_list = [None] * len(frames)
+    return [measure_reading(frame, lower, upper, rows, timestamp)
+            for frame, lower, upper, rows in zip(frames, lowers, uppers, rows_list)]
+
+
+def valid_region(x1, y1, x2, y2):
+    """区域是否有效（宽高都大于0）"""
+    return x2 > x1 and y2 > y1
+
+
+def capture_frame(x1, y1, x2, y2):
+    """截取屏幕指定区域
+
+    参数:
+        x1, y1 (int): 区域左上角坐标
+        x2, y2 (int): 区域右下角坐标
+
+    返回:
+        np.ndarray: BGR格式的截图
+    """
+    screenshot = pyautogui.screenshot(region=(x1, y1, x2 - x1, y2 - y1))
+    # 原始截图是RGB，转换为OpenCV使用的BGR
+    return cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+
+
+def capture_regions(regions):
+    """一次截图截取多个区域
+
+    截取所有有效区域的外接矩形，再从中切出每个区域。队员的血条在屏幕上相邻，
+    一次截图的开销远小于每个队员单独截图。
+
+    参数:
+        regions (list): [(x1, y1, x2, y2), ...]
+
+    返回:
+        list: 与 regions 顺序一致的BGR截图，无效区域为None
+    """
+    valid = [region for region in regions if valid_region(*region)]
+    if not valid:
+        return [None] * len(regions)
+    left = min(region[0] for region in valid)
+    top = min(region[1] for region in valid)
+    right = max(region[2] for region in valid)
+    bottom = max(region[3] for region in valid)
+    frame = capture_frame(left, top, right, bottom)
+
+    frames = []
+    for x1, y1, x2, y2 in regions:
+        if valid_region(x1, y1, x2, y2):
+            frames.append(frame[y1 - top:y2 - top, x1 - left:x2 - left])
+        else:
+            frames.append(None)
+    return frames
+
+
+def get_hp_percentage(x1, y1, x2, y2, hp_color_lower, hp_color_upper):
+    """截取指定区域并测量血量百分比
+
+    参数:
+        x1, y1 (int): 血条框左上角坐标
+        x2, y2 (int): 血条框右下角坐标
+        hp_color_lower (array-like): 血条颜色的BGR下限
+        hp_color_upper (array-like): 血条颜色的BGR上限
+
+    返回:
+        float: 血量百分比（0-100），区域无效或截图失败时返回0
+    """
+    if not valid_region(x1, y1, x2, y2):
+        print(f"错误：血条区域 ({x1},{y1}) - ({x2},{y2}) 无效，结束坐标必须大于起始坐标")
+        return 0
+    try:
+        return measure(capture_frame(x1, y1, x2, y2), hp_color_lower, hp_color_upper)
+    except Exception as e:
+        print(f"错误：处理图像时发生异常 - {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 0
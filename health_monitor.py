@@ -1,33 +1,50 @@
 import sys
-import os
 import cv2
 import numpy as np
 import time
 import threading
-import importlib.util
 import pyautogui
 import keyboard
 import win32api  # 导入win32api用于检测鼠标状态
 import win32con  # 导入win32con用于鼠标键值常量
 from PyQt5.QtWidgets import QApplication, QDialog, QVBoxLayout, QLabel, QComboBox, QPushButton, QLineEdit, QMainWindow
-from PyQt5.QtCore import QTimer, pyqtSignal, QObject, QRect, QEventLoop
+from PyQt5.QtCore import QTimer, pyqtSignal, QObject, QRect, QEventLoop, QThread
 from 选择框 import TransparentSelectionBox
+from triage import TriageEngine
+from occlusion import note_click
 import json
 
-# 动态导入带空格的模块
-module_name = "Zhu Xian World Health Bar Test(choice box)"
-module_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Zhu Xian World Health Bar Test(choice box).py")
-spec = importlib.util.spec_from_file_location(module_name, module_path)
-health_bar_module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(health_bar_module)
-
-# 从模块中获取需要的函数
-get_hp_percentage = health_bar_module.get_hp_percentage
-
 class MonitorSignals(QObject):
     """定义监控信号类，用于在线程间传递信号"""
     update_signal = pyqtSignal(object)  # 更新血量信号，传递队员血量列表
     status_signal = pyqtSignal(str)   # 状态信号，传递监控状态信息
+    team_changed_signal = pyqtSignal(str)  # 队伍布局切换信号，传递新的校准集名称
+
+class ColorCalibrationThread(QThread):
+    """血条颜色拟合线程
+    
+    每个队员采集多帧截图需要数百毫秒，在后台线程中采集并拟合，不修改队员设置；
+    全部完成后通过 result_signal 发出 [(队员, 颜色模型或None), ...]，由界面线程应用结果。
+    """
+    result_signal = pyqtSignal(list)  # 拟合结果信号
+    
+    def __init__(self, members, seed_bgr=None):
+        """初始化颜色拟合线程
+        
+        参数:
+            members: 要拟合颜色的队员列表
+            seed_bgr: 用户选取的血条像素BGR值，可以为None
+        """
+        super().__init__()
+        self.members = list(members)
+        self.seed_bgr = seed_bgr
+    
+    def run(self):
+        """线程主函数，依次为每个队员拟合颜色模型"""
+        results = []
+        for member in self.members:
+            results.append((member, member.fit_color(self.seed_bgr)))
+        self.result_signal.emit(results)
 
 class HealthMonitor:
     """血条监控类
@@ -53,10 +70,12 @@ class HealthMonitor:
         self.monitor_thread = None
         self.update_interval = 0.5  # 默认更新间隔0.5秒
         self.signals = MonitorSignals()
+        self.refine_failed = {}  # 队员名称 -> 细化失败时的血条框，血条框不变时开始监控不再重复细化
         
         # 快捷键设置（默认值）
         self.start_monitoring_hotkey = 'f9'
         self.stop_monitoring_hotkey = 'f10'
+        self.switch_calibration_hotkey = 'f11'  # 循环切换校准集
         self.hotkey_handlers = []  # 存储快捷键处理器的引用
         
         # 自动选择低血量队友相关设置
@@ -69,6 +88,13 @@ class HealthMonitor:
         # 新增：职业优先级
         self.priority_profession = None  # 默认无优先职业
         
+        # 血量估计置信度低于该值的队友不参与自动选择（预解析的配置视图，配置修改后自动更新）
+        from hp_filter import load_hp_filter_settings
+        self.hp_filter_settings = load_hp_filter_settings()
+        
+        # 分诊引擎：按预测紧急程度排序自动选择的目标
+        self.triage = TriageEngine()
+        
         # 加载快捷键设置
         self.load_hotkey_config()
         self.load_auto_select_config()  # 加载自动选择配置
@@ -76,6 +102,38 @@ class HealthMonitor:
         # 注册全局快捷键
         self.register_hotkeys()
         
+        # 配置文件被外部修改时重新应用自动选择和快捷键设置
+        try:
+            from config_manager import get_config
+            get_config().subscribe(self.on_config_changed, ['auto_select', 'hotkeys'], external_only=True)
+        except Exception as e:
+            print(f"订阅配置变化失败: {str(e)}")
+    
+    @property
+    def min_action_confidence(self):
+        """血量估计置信度低于该值的队友不参与自动选择"""
+        return self.hp_filter_settings['min_action_confidence']
+    
+    def on_config_changed(self, changed, snapshot):
+        """配置变化回调，只处理订阅的 auto_select 和 hotkeys 两节
+        
+        参数:
+            changed (set): 发生变化的键路径
+            snapshot (Mapping): 变化后的配置快照
+        """
+        if any(path.startswith('auto_select') for path in changed):
+            self.load_auto_select_config()
+            print("已重新加载自动选择配置")
+        
+        if any(path.startswith('hotkeys') for path in changed):
+            hotkeys = snapshot['json'].get('hotkeys', {})
+            keys = (hotkeys.get('start_monitoring', 'f9'),
+                    hotkeys.get('stop_monitoring', 'f10'),
+                    hotkeys.get('switch_calibration', 'f11'))
+            if keys != (self.start_monitoring_hotkey, self.stop_monitoring_hotkey, self.switch_calibration_hotkey):
+                self.start_monitoring_hotkey, self.stop_monitoring_hotkey, self.switch_calibration_hotkey = keys
+                self.register_hotkeys()
+        
     def load_hotkey_config(self):
         """加载快捷键配置"""
         try:
@@ -88,6 +146,7 @@ class HealthMonitor:
             if hotkeys:
                 self.start_monitoring_hotkey = hotkeys.get('start_monitoring', 'f9')
                 self.stop_monitoring_hotkey = hotkeys.get('stop_monitoring', 'f10')
+                self.switch_calibration_hotkey = hotkeys.get('switch_calibration', 'f11')
                 print(f"已加载快捷键配置: 开始监控={self.start_monitoring_hotkey}, 停止监控={self.stop_monitoring_hotkey}")
             else:
                 # 如果配置不存在，创建默认配置
@@ -107,7 +166,8 @@ class HealthMonitor:
             # 设置快捷键配置
             hotkeys = {
                 'start_monitoring': self.start_monitoring_hotkey,
-                'stop_monitoring': self.stop_monitoring_hotkey
+                'stop_monitoring': self.stop_monitoring_hotkey,
+                'switch_calibration': self.switch_calibration_hotkey
             }
             config_manager.set_json('hotkeys', hotkeys)
             
@@ -164,6 +224,19 @@ class HealthMonitor:
                         pass
                 return False
             
+            # 注册切换校准集快捷键（可选，失败不影响监控快捷键）
+            if self.switch_calibration_hotkey:
+                try:
+                    switch_handler = keyboard.add_hotkey(
+                        self.switch_calibration_hotkey,
+                        self.switch_calibration_set,
+                        suppress=False
+                    )
+                    self.hotkey_handlers.append(switch_handler)
+                    print(f"已注册切换校准集快捷键: {self.switch_calibration_hotkey}")
+                except Exception as e:
+                    print(f"注册切换校准集快捷键失败: {str(e)}")
+            
             self.signals.status_signal.emit(f"已注册快捷键: 开始监控={self.start_monitoring_hotkey}, 停止监控={self.stop_monitoring_hotkey}")
             print(f"已成功注册所有快捷键: 开始监控={self.start_monitoring_hotkey}, 停止监控={self.stop_monitoring_hotkey}")
             return True
@@ -409,26 +482,42 @@ class HealthMonitor:
                     hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
                     # 获取HSV值
                     h, s, v = hsv[0, 0]
-                    # 设置HSV范围（大幅降低范围值，使检测更精确）
-                    member.hp_color_lower = np.array([max(0, h-3), max(0, s-25), max(0, v-25)])
-                    member.hp_color_upper = np.array([min(180, h+3), min(255, s+25), min(255, v+25)])
                     
-                    # 更新状态和日志
-                    print(f"{member.name}的HSV颜色值: ({h}, {s}, {v})")
-                    print(f"设置{member.name}的HSV范围为: {member.hp_color_lower} - {member.hp_color_upper}")
-                    status_label.setText(f"状态：成功获取颜色！HSV值: ({h}, {s}, {v})")
-                    status_label.setStyleSheet("color: green; font-weight: bold;")
-                    QApplication.processEvents()  # 更新UI
+                    # 优先根据整个血条区域拟合颜色模型，取色像素用于区分血条和背景；
+                    # 多帧采集在后台线程中进行，拟合完成后再在界面线程中应用
+                    status_label.setText("状态：正在根据血条区域拟合颜色...")
                     
-                    # 保存配置
-                    member.save_config()  # 保存新的颜色设置
-                    self.signals.status_signal.emit(f"{member.name} 的血条颜色已设置")
+                    def on_fitted(results):
+                        model = results[0][1]
+                        if model is not None:
+                            member.apply_color_model(model)
+                            fp_rate = member.color_model['false_positive_rate']
+                            status_label.setText(f"状态：已根据血条区域拟合颜色！预计误检率 {fp_rate:.2%}")
+                        else:
+                            # 设置HSV范围（大幅降低范围值，使检测更精确）
+                            member.hp_color_lower = np.array([max(0, h-3), max(0, s-25), max(0, v-25)])
+                            member.hp_color_upper = np.array([min(180, h+3), min(255, s+25), min(255, v+25)])
+                            member.color_model = None
+                            print(f"设置{member.name}的HSV范围为: {member.hp_color_lower} - {member.hp_color_upper}")
+                            status_label.setText(f"状态：成功获取颜色！HSV值: ({h}, {s}, {v})")
+                            # 保存配置
+                            member.save_config()  # 保存新的颜色设置
+                        
+                        # 更新状态和日志
+                        print(f"{member.name}的HSV颜色值: ({h}, {s}, {v})")
+                        status_label.setStyleSheet("color: green; font-weight: bold;")
+                        self.signals.status_signal.emit(f"{member.name} 的血条颜色已设置")
+                        
+                        # 设置一个定时器，等待1.5秒后关闭对话框
+                        close_timer = QTimer(info_dialog)
+                        close_timer.setSingleShot(True)
+                        close_timer.timeout.connect(info_dialog.accept)
+                        close_timer.start(1500)  # 1.5秒
                     
-                    # 设置一个定时器，等待1.5秒后关闭对话框
-                    close_timer = QTimer(info_dialog)
-                    close_timer.setSingleShot(True)
-                    close_timer.timeout.connect(info_dialog.accept)
-                    close_timer.start(1500)  # 1.5秒
+                    # 线程对象保存在对话框上，避免运行中被回收
+                    info_dialog.color_thread = ColorCalibrationThread([member], frame[0, 0])
+                    info_dialog.color_thread.result_signal.connect(on_fitted)
+                    info_dialog.color_thread.start()
                 
                 elif keyboard.is_pressed('esc'):
                     if not color_captured[0]:  # 只有在未捕获颜色时才处理ESC键
@@ -516,25 +605,14 @@ class HealthMonitor:
         if member is None:
             return False
         
-        # 从队伍中移除队员
-        if member in self.team.members:
-            self.team.members.remove(member)
-            print(f"已移除队员: {member.name}")
-            
-            # 删除队员配置文件
-            try:
-                config_file = f"{member.name}_config.json"
-                config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), config_file)
-                if os.path.exists(config_path):
-                    os.remove(config_path)
-                    print(f"已删除队员配置文件: {config_file}")
-                    self.signals.status_signal.emit(f"已移除队员 {member.name} 并删除配置文件")
-                else:
-                    self.signals.status_signal.emit(f"已移除队员 {member.name}，未找到配置文件")
-            except Exception as e:
-                print(f"删除配置文件时出错: {str(e)}")
-                self.signals.status_signal.emit(f"已移除队员 {member.name}，但删除配置文件失败")
-            
+        # 从队伍中移除队员，并删除其在队员配置存储中的配置
+        try:
+            if self.team.remove_member(member):
+                self.signals.status_signal.emit(f"已移除队员 {member.name} 并删除配置")
+                return True
+        except Exception as e:
+            print(f"删除队员配置时出错: {str(e)}")
+            self.signals.status_signal.emit(f"已移除队员 {member.name}，但删除配置失败")
             return True
         return False
     
@@ -589,6 +667,79 @@ class HealthMonitor:
             
         return True
     
+    def switch_calibration_set(self, set_name=None):
+        """在监控运行时切换校准集
+        
+        直接使用校准集中保存的识别结果（名称、职业、血条位置），不重新识别、不重启监控。
+        同名队员复用已有的颜色模型和滤波状态，队伍发布新快照后监控线程在下一个tick使用新的布局。
+        
+        参数:
+            set_name (str): 目标校准集名称，默认切换到当前校准集的下一个
+            
+        返回:
+            bool: 是否切换成功
+        """
+        try:
+            from health_bar_calibration import HealthBarCalibration
+            calibration = HealthBarCalibration()
+            if set_name is None:
+                set_name = calibration.get_next_set_name()
+            if not set_name:
+                self.signals.status_signal.emit("没有可切换的校准集")
+                return False
+            
+            layout, unrecognized = calibration.get_set_layout(set_name)
+            if not layout:
+                self.signals.status_signal.emit(f"校准集 {set_name} 中没有已识别的队友，请先识别一次")
+                return False
+            
+            reused, created = self.team.apply_layout(layout)
+            calibration.set_last_used(set_name)
+            
+            message = f"已切换到校准集 {set_name}: {len(layout)} 名队员（复用 {reused}，新建 {created}）"
+            if unrecognized:
+                message += f"，{unrecognized} 个血条未识别已跳过"
+            self.signals.status_signal.emit(message)
+            self.signals.team_changed_signal.emit(set_name)
+            return True
+        except Exception as e:
+            print(f"切换校准集失败: {str(e)}")
+            self.signals.status_signal.emit(f"切换校准集失败: {str(e)}")
+            return False
+    
+    def refine_member_rois(self, force=False, should_stop=None):
+        """为尚未细化的队员找出血条填充所在的紧凑区域
+        
+        每个队员需要采集多帧截图，开始监控时在监控线程中执行。细化失败的队员（例如开始时已阵亡）
+        记录其血条框，血条框不变时之后开始监控不再重试。
+        
+        参数:
+            force (bool): 是否重新细化所有队员（包括之前细化失败的队员）
+            should_stop: 返回True时停止细化剩余的队员
+        """
+        try:
+            from config_manager import get_config
+            from config_defaults import ROI_SETTINGS
+            enabled = get_config().get_json('bar_roi', {}).get('refine_on_monitor_start', ROI_SETTINGS['refine_on_monitor_start'])
+        except Exception as e:
+            print(f"加载血条区域细化设置失败: {str(e)}")
+            enabled = True
+        if not enabled and not force:
+            return
+        
+        for member in list(self.team.members):
+            if should_stop and should_stop():
+                return
+            full_rect = (member.x1, member.y1, member.x2, member.y2)
+            if not force and (member.get_measure_region() != full_rect
+                              or self.refine_failed.get(member.name) == full_rect):
+                continue
+            if member.refine_bar_roi():
+                self.refine_failed.pop(member.name, None)
+                self.signals.status_signal.emit(f"已细化 {member.name} 的血条区域")
+            else:
+                self.refine_failed[member.name] = full_rect
+    
     def stop_monitoring(self):
         """停止监控"""
         # 如果没有在监控中，只显示消息不做其他操作
@@ -734,26 +885,44 @@ class HealthMonitor:
         """
         return win32api.GetKeyState(win32con.VK_RBUTTON) < 0  # 负值表示按键被按下
     
+    def update_triage(self, snapshot=None):
+        """用本次监控的血量更新分诊引擎
+        
+        参数:
+            snapshot (TeamSnapshot): 本次tick使用的队伍快照，默认使用最新快照
+        """
+        if snapshot is None:
+            snapshot = self.team.snapshot
+        self.triage.set_priorities(self.priority_roles, self.priority_profession)
+        self.triage.update_all(snapshot.members)
+    
     def get_priority_score(self, member):
         """计算队友的优先级分数
         
+        按预测的血量计算（正在快速掉血的队友更优先），priority_roles 中的职业权重更高，
+        单独设置的优先职业再给予分数加成。
+        
         参数:
             member (TeamMember): 队友对象
             
         返回:
             float: 优先级分数，值越小优先级越高
         """
-        # 基础分数：血量百分比
-        score = member.health_percentage
-        
-        # 如果该队员的职业是当前设置的单个优先职业，则给予分数加成（降低分数以提高优先级）
-        if self.priority_profession and member.profession == self.priority_profession:
-            score -= 10  # 优先职业的血量可以高10%也会被优先选择
-        
-        return score
+        if member.name in self.triage.scores:
+            return self.triage.scores[member.name]
+        trend = self.triage.trends.get(member.name)
+        if trend is None:
+            from triage import MemberTrend
+            trend = MemberTrend(self.triage.settings['history_seconds'])
+            trend.add(time.time(), member.health_percentage)
+        return self.triage.score(member, trend)
     
-    def auto_select_low_health(self):
-        """自动选择低血量队友"""
+    def auto_select_low_health(self, snapshot=None):
+        """自动选择低血量队友
+        
+        参数:
+            snapshot (TeamSnapshot): 本次tick使用的队伍快照，默认使用最新快照
+        """
         # 如果功能未启用或正在冷却中，直接返回
         if not self.auto_select_enabled:
             return
@@ -766,37 +935,42 @@ class HealthMonitor:
         if self.check_right_button():
             return
             
-        # 筛选血量低于阈值的存活队友（必须是存活状态且血量大于0）
-        low_health_members = [member for member in self.team.members 
-                             if member.is_alive and member.health_percentage > 0 and 
-                             member.health_percentage < self.health_threshold]
-                             
-        if not low_health_members:
+        # 向量化筛选血量低于阈值（或预测即将低于阈值）的存活队友，血量为滤波后的值，且估计需足够可信
+        if snapshot is None:
+            snapshot = self.team.snapshot
+        lookahead = self.triage.settings['lookahead_seconds'] if self.triage.settings['predictive_select'] else None
+        mask = snapshot.low_health_mask(self.health_threshold, self.min_action_confidence, lookahead)
+        if not mask.any():
             return  # 没有低血量队友
-            
-        # 根据优先级规则排序
-        low_health_members.sort(key=self.get_priority_score)
+        candidates = {member.name for member, is_candidate in zip(snapshot.members, mask) if is_candidate}
         
-        # 选择优先级最高的队友
-        target_member = low_health_members[0]
+        # 从分诊堆中取出最紧急的候选队友
+        target_member = self.triage.select(snapshot.members, lambda member: member.name in candidates)
+        if target_member is None:
+            return
         
         # 记录当前鼠标位置
         original_x, original_y = pyautogui.position()
         
         try:
-            # 计算血条中心点
-            target_x = (target_member.x1 + target_member.x2) // 2
-            target_y = (target_member.y1 + target_member.y2) // 2
+            # 计算血条中心点（使用快照中的血条框，界面线程正在修改的坐标下一个tick才生效）
+            x1, y1, x2, y2 = snapshot.config_of(target_member).rect
+            target_x = (x1 + x2) // 2
+            target_y = (y1 + y2) // 2
             
             # 移动鼠标并点击
             pyautogui.moveTo(target_x, target_y, duration=0.1)
             pyautogui.click()
+            # 记录点击位置：之后一小段时间内该血条的读数受选中高亮影响，会被丢弃
+            note_click(target_x, target_y)
             
             # 更新最后选择时间
             self.last_select_time = current_time
             
             # 记录日志
-            self.signals.status_signal.emit(f"自动选择了 {target_member.name} (血量: {target_member.health_percentage:.1f}%)")
+            trend_text = self.triage.describe(target_member)
+            self.signals.status_signal.emit(f"自动选择了 {target_member.name} (血量: {target_member.health_percentage:.1f}%"
+                                            + (f"，{trend_text}" if trend_text else "") + ")")
             
             # 返回原始鼠标位置
             pyautogui.moveTo(original_x, original_y, duration=0.1)
@@ -817,38 +991,54 @@ class HealthMonitor:
         # 添加调试输出
         print("监控线程已启动")
         
+        # 为尚未细化的队员细化血条区域（多帧截图，不阻塞界面线程和快捷键线程）
+        self.refine_member_rois(should_stop=lambda: not self.monitoring)
+        
         while self.monitoring:
+            # 每个tick只读取一次队伍快照；界面线程对队伍的修改会发布新快照，在下一个tick生效
+            team = self.team
+            snapshot = team.acquire_snapshot()
             try:
                 # 更新所有队员的血量
-                results = self.team.update_all_health()
+                results = team.update_all_health(snapshot)
                 
                 # 调试输出
                 print(f"监控线程获取到血量数据: {results}")
                 
+                # 更新血量趋势和目标排序
+                self.update_triage(snapshot)
+                
                 # 发送更新信号 - 确保在UI线程中使用正确格式的数据
                 # 确保数据是元组列表格式: [(名称, 血量百分比, 是否存活), ...]
                 self.signals.update_signal.emit(results)
                 
+                # 报告自适应颜色模型的漂移
+                for member in snapshot.members:
+                    if getattr(member, 'color_drift_message', None):
+                        self.signals.status_signal.emit(f"{member.name}: {member.color_drift_message}")
+                        member.color_drift_message = None
+                
                 # 检查是否有队员血量低于警戒值
-                low_health_members = []
-                for name, hp, is_alive in results:
-                    if is_alive and hp < 30:  # 血量低于30%发出警告
-                        low_health_members.append(f"{name}({hp:.1f}%)")
+                low_mask = snapshot.low_health_mask(30)  # 血量低于30%发出警告
+                low_health_members = [f"{member.name}({member.health_percentage:.1f}%)"
+                                      for member, is_low in zip(snapshot.members, low_mask) if is_low]
                 
                 if low_health_members:
                     warning_msg = f"警告: {', '.join(low_health_members)} 血量低于30%!"
                     self.signals.status_signal.emit(warning_msg)
                 
                 # 尝试执行自动选择
-                self.auto_select_low_health()
+                self.auto_select_low_health(snapshot)
                 
                 # 重置错误计数
                 error_count = 0
                 
-                # 等待指定的间隔时间
+                # 本tick不再使用该快照，等待指定的间隔时间
+                team.release_snapshot()
                 time.sleep(self.update_interval)
                 
             except Exception as e:
+                team.release_snapshot()
                 error_count += 1
                 error_msg = f"监控出错 ({error_count}/{max_errors}): {str(e)}"
                 print(error_msg)  # 同时输出到控制台便于调试
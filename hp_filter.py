@@ -0,0 +1,101 @@
+import time
+
+from config_defaults import HP_FILTER_SETTINGS
+
+
+def load_hp_filter_settings():
+    """读取血量滤波设置，配置中缺少的项使用默认值
+
+    返回的是配置管理器的只读视图，配置文件被修改后自动更新
+    """
+    try:
+        from config_manager import get_config
+        return get_config().view('hp_filter', HP_FILTER_SETTINGS)
+    except Exception as e:
+        print(f"加载血量滤波设置失败: {str(e)}")
+        return dict(HP_FILTER_SETTINGS)
+
+
+class HpFilter:
+    """单个队员的血量α-β滤波器
+
+    每次测量先按上一次的速度预测当前血量，再用测量值与预测值之差（残差）修正血量和速度。
+    alpha 越大越跟手、噪声越多；alpha 越小越平滑、延迟越大。beta 控制速度估计的灵敏度。
+    残差超过 outlier_gate 的测量视为离群值（例如单帧误识别），保持预测值不变；
+    连续 max_outlier_ticks 次离群后认为血量确实发生了突变（如复活、大额治疗），直接采用测量值。
+    启用 accept_drops 时大幅掉血不做离群判断，立即采用（爆发伤害正是需要马上治疗的时候）。
+
+    属性:
+        hp (float): 滤波后的血量百分比
+        velocity (float): 血量变化速度（百分比/秒），负值表示掉血
+        confidence (float): 当前估计的置信度（0-1）
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or HP_FILTER_SETTINGS
+        self.hp = None
+        self.velocity = 0.0
+        self.confidence = 0.0
+        self.last_time = None
+        self.outlier_ticks = 0
+
+    def reset(self):
+        """清空滤波状态，下一次测量将直接作为初始值"""
+        self.hp = None
+        self.velocity = 0.0
+        self.confidence = 0.0
+        self.last_time = None
+        self.outlier_ticks = 0
+
+    def update(self, measurement, timestamp=None):
+        """输入一次测量值
+
+        参数:
+            measurement (float): 原始血量百分比
+            timestamp (float): 测量时间（秒），默认为当前时间
+
+        返回:
+            tuple: (滤波后血量, 速度, 置信度)
+        """
+        settings = self.settings
+        if timestamp is None:
+            timestamp = time.time()
+
+        if not settings['enabled'] or self.hp is None:
+            self.hp = float(measurement)
+            self.velocity = 0.0
+            self.confidence = 1.0 if not settings['enabled'] else settings['initial_confidence']
+            self.last_time = timestamp
+            self.outlier_ticks = 0
+            return self.hp, self.velocity, self.confidence
+
+        dt = max(timestamp - self.last_time, 1e-3)
+        self.last_time = timestamp
+        predicted = min(100.0, max(0.0, self.hp + self.velocity * dt))
+        residual = measurement - predicted
+        gate = settings['outlier_gate']
+
+        jump = abs(residual) > gate
+        drop = residual < 0 and settings['accept_drops']
+        if jump and not drop and self.outlier_ticks < settings['max_outlier_ticks']:
+            # 离群测量：沿用预测值，并降低置信度
+            self.outlier_ticks += 1
+            self.hp = predicted
+            self.confidence *= settings['outlier_confidence_decay']
+            return self.hp, self.velocity, self.confidence
+
+        if jump:
+            # 大幅掉血或连续离群，认为血量确实突变：直接采用测量值并重新估计速度
+            self.hp = float(measurement)
+            self.velocity = 0.0
+            self.confidence = settings['initial_confidence']
+            self.outlier_ticks = 0
+            return self.hp, self.velocity, self.confidence
+
+        self.outlier_ticks = 0
+        self.hp = min(100.0, max(0.0, predicted + settings['alpha'] * residual))
+        self.velocity += settings['beta'] * residual / dt
+        # 残差越小，测量与模型越一致，置信度向1靠拢
+        agreement = 1.0 - abs(residual) / gate
+        self.confidence += settings['confidence_rate'] * (agreement - self.confidence)
+        return self.hp, self.velocity, self.confidence
@@ -0,0 +1,67 @@
+import importlib
+import sys
+import threading
+
+
+class LazyModule:
+    """延迟导入的模块代理
+
+    创建时不导入模块，第一次访问属性时才真正导入，之后所有属性访问都转发给真实模块。
+    用于 pygame、edge_tts 等只在语音播报时才需要的重量级模块，使主窗口启动时不必加载它们。
+    模块级代码可以像普通模块一样使用，例如 pygame.mixer.init()、except pygame.error。
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self):
+        """导入真实模块（线程安全，只导入一次）"""
+        module = self.__dict__['_module']
+        if module is None:
+            with self.__dict__['_lock']:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self.__dict__['_name'])
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = '已加载' if self.__dict__['_module'] is not None else '未加载'
+        return f"<LazyModule {self.__dict__['_name']} ({state})>"
+
+
+def lazy_import(name):
+    """返回模块的延迟导入代理；模块已被导入时直接返回真实模块
+
+    参数:
+        name (str): 模块名称
+
+    返回:
+        module 或 LazyModule: 模块对象或代理
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
+
+def is_loaded(module):
+    """判断延迟导入的模块是否已经真正导入
+
+    参数:
+        module: lazy_import() 的返回值
+
+    返回:
+        bool: 已导入时返回True；普通模块总是返回True
+    """
+    if isinstance(module, LazyModule):
+        return module.__dict__['_module'] is not None
+    return True
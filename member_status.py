@@ -0,0 +1,72 @@
+from config_defaults import MEMBER_STATUS_SETTINGS
+
+# 队员状态（保存在 TeamState.status 中）
+ALIVE = 0          # 存活，血量读数有效
+DEAD = 1           # 阵亡：血条区域发灰（饱和度很低）
+OUT_OF_RANGE = 2   # 超出范围或淡出：血条区域仍有颜色但整体变暗
+UNREADABLE = 3     # 无法识别：血条区域明亮有颜色却不匹配血条颜色（颜色范围不准、被遮挡或截图失败）
+
+STATUS_LABELS = {
+    ALIVE: '存活',
+    DEAD: '死亡',
+    OUT_OF_RANGE: '超出范围',
+    UNREADABLE: '无法识别',
+}
+
+# 没有有效血量读数的状态：沿用上一次的血量，不参与低血量判断和警告
+UNMEASURED = (OUT_OF_RANGE, UNREADABLE)
+
+
+def load_member_status_settings():
+    """读取队员状态判断设置，配置中缺少的项使用默认值
+
+    返回的是配置管理器的只读视图，配置文件被修改后自动更新
+    """
+    try:
+        from config_manager import get_config
+        return get_config().view('member_status', MEMBER_STATUS_SETTINGS)
+    except Exception as e:
+        print(f"加载队员状态设置失败: {str(e)}")
+        return dict(MEMBER_STATUS_SETTINGS)
+
+
+_settings = None
+
+
+def get_member_status_settings():
+    """队员状态判断设置（第一次使用时加载）"""
+    global _settings
+    if _settings is None:
+        _settings = load_member_status_settings()
+    return _settings
+
+
+def classify_reading(reading, hp=None, edge_hp=None):
+    """按一次测量的结果判断队员状态
+
+    只使用测量时顺带算出的区域统计（平均亮度、平均饱和度），不需要额外截图。
+    有填充时为存活；没有填充时按区域是否发灰、变暗区分阵亡和超出范围，
+    区域明亮有颜色却没有匹配的像素，或边缘估计找到了明显的填充边缘，说明颜色测量不可信。
+
+    参数:
+        reading (HpReading): 测量记录，为None表示没有截图
+        hp (float): 实际采用的血量，默认使用 reading.hp（边缘估计模式下可能不同）
+        edge_hp (float): 边缘估计的血量，没有明显边缘时为None
+
+    返回:
+        int: ALIVE / DEAD / OUT_OF_RANGE / UNREADABLE
+    """
+    if reading is None or reading.width == 0:
+        return UNREADABLE
+    if hp is None:
+        hp = reading.hp
+    if hp > 0:
+        return ALIVE
+    if edge_hp is not None and edge_hp > 0:
+        return UNREADABLE
+    settings = get_member_status_settings()
+    if reading.saturation <= settings['dead_max_saturation']:
+        return DEAD
+    if reading.brightness <= settings['faded_max_brightness']:
+        return OUT_OF_RANGE
+    return UNREADABLE
@@ -0,0 +1,219 @@
+import os
+import json
+import copy
+import threading
+from contextlib import contextmanager
+
+from persistence import schedule_write
+
+# 所有队员配置集中保存在一个JSON文档中，取代每个队员一个的 {name}_config.json
+MEMBER_STORE_FILE = 'members.json'
+DEFAULT_SET = 'default'
+STORE_VERSION = 1
+
+# 旧版配置目录中不属于队员的 *_config.json 文件前缀
+SYSTEM_CONFIG_PREFIXES = ('hotkeys', 'settings', 'config', 'system', 'main', 'auto_select', 'default_color')
+
+
+def is_member_config(config):
+    """判断配置内容是否是队员配置"""
+    return isinstance(config, dict) and 'profession' in config and 'health_bar' in config
+
+
+class MemberStore:
+    """队员配置存储
+
+    文档结构为 {'version': 1, 'sets': {校准集名称: {队员名称: 配置}}}，按校准集和队员名称索引。
+    整个文档常驻内存，读取不访问磁盘；保存时在内存中序列化后交给延迟写入器，
+    由后台线程先写临时文件再用 os.replace 原子替换，不会出现写了一半的配置文件，也不会阻塞界面。
+    在 transaction() 中的多次修改合并为一次序列化。
+
+    首次使用时（文档不存在）会扫描一次程序目录，把旧版的 {name}_config.json 迁移到默认校准集中，
+    之后加载队伍只读取这一个文件，与目录中其他文件的数量无关。旧文件保留在原处，不再被读取。
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls, path=None):
+        """获取指定路径的单例实例
+
+        参数:
+            path (str): 存储文件路径，默认为程序目录下的 members.json
+
+        返回:
+            MemberStore: 存储实例
+        """
+        if path is None:
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), MEMBER_STORE_FILE)
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
+
+    def __init__(self, path):
+        """初始化存储并加载文档
+
+        参数:
+            path (str): 存储文件路径
+        """
+        self.path = path
+        self.legacy_dir = os.path.dirname(os.path.abspath(path))
+        self.document = {'version': STORE_VERSION, 'sets': {}}
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """从文件加载文档，文件不存在时迁移旧版配置"""
+        with self._lock:
+            if not os.path.exists(self.path):
+                migrated = self.migrate_legacy()
+                print(f"队员配置存储不存在，已从旧版配置文件迁移 {migrated} 名队员")
+                self.save()
+                return
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    document = json.load(f)
+                if not isinstance(document.get('sets'), dict):
+                    raise ValueError("缺少 sets 字段")
+                self.document = document
+            except Exception as e:
+                print(f"加载队员配置存储 {self.path} 时出错: {str(e)}，使用空存储")
+                self.document = {'version': STORE_VERSION, 'sets': {}}
+
+    def migrate_legacy(self):
+        """把旧版 {name}_config.json 导入默认校准集
+
+        返回:
+            int: 迁移的队员数
+        """
+        members = self.document['sets'].setdefault(DEFAULT_SET, {})
+        try:
+            filenames = os.listdir(self.legacy_dir)
+        except OSError as e:
+            print(f"读取旧版队员配置目录失败: {str(e)}")
+            return 0
+
+        count = 0
+        for filename in filenames:
+            if not filename.endswith('_config.json') or filename.startswith(SYSTEM_CONFIG_PREFIXES):
+                continue
+            try:
+                with open(os.path.join(self.legacy_dir, filename), 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+                if not is_member_config(config):
+                    continue
+                members[filename[:-len('_config.json')]] = config
+                count += 1
+            except Exception as e:
+                print(f"迁移旧版队员配置 {filename} 时出错: {str(e)}")
+        return count
+
+    def save(self):
+        """序列化文档并交给延迟写入器；在 transaction() 中只标记为待保存
+
+        返回:
+            bool: 是否成功序列化（事务中总是返回True）
+        """
+        with self._lock:
+            if self._batch_depth > 0:
+                self._dirty = True
+                return True
+            self._dirty = False
+            try:
+                text = json.dumps(self.document, ensure_ascii=False, indent=4)
+            except Exception as e:
+                print(f"保存队员配置存储时出错: {str(e)}")
+                return False
+            # 在锁内交给写入器，保证较新的内容不会被较旧的内容覆盖
+            schedule_write(self.path, text)
+            return True
+
+    @contextmanager
+    def transaction(self):
+        """把多次修改合并为一次写入
+
+        用法:
+            with store.transaction():
+                for member in members:
+                    member.save_config()
+        """
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._dirty:
+                    self.save()
+
+    def _members(self, set_name, create=False):
+        """获取校准集的队员字典"""
+        sets = self.document['sets']
+        if create:
+            return sets.setdefault(set_name, {})
+        return sets.get(set_name, {})
+
+    def names(self, set_name=DEFAULT_SET):
+        """获取校准集中所有队员名称（按加入顺序）"""
+        with self._lock:
+            return list(self._members(set_name))
+
+    def items(self, set_name=DEFAULT_SET):
+        """获取校准集中所有 (队员名称, 配置副本)"""
+        with self._lock:
+            return [(name, copy.deepcopy(config)) for name, config in self._members(set_name).items()]
+
+    def get(self, name, set_name=DEFAULT_SET):
+        """读取队员配置
+
+        返回:
+            dict: 配置副本，不存在时返回None
+        """
+        with self._lock:
+            config = self._members(set_name).get(name)
+            return copy.deepcopy(config) if config is not None else None
+
+    def put(self, name, config, set_name=DEFAULT_SET):
+        """写入队员配置
+
+        返回:
+            bool: 是否成功保存
+        """
+        with self._lock:
+            self._members(set_name, create=True)[name] = copy.deepcopy(config)
+            return self.save()
+
+    def delete(self, name, set_name=DEFAULT_SET):
+        """删除队员配置
+
+        返回:
+            bool: 队员是否存在
+        """
+        with self._lock:
+            members = self._members(set_name)
+            if name not in members:
+                return False
+            del members[name]
+            self.save()
+            return True
+
+    def clear(self, set_name=DEFAULT_SET):
+        """删除校准集中的所有队员配置
+
+        返回:
+            int: 删除的队员数
+        """
+        with self._lock:
+            count = len(self._members(set_name))
+            self.document['sets'].pop(set_name, None)
+            self.save()
+            return count
+
+
+def get_member_store():
+    """获取默认的队员配置存储"""
+    return MemberStore.get_instance()
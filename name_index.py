@@ -0,0 +1,238 @@
+import os
+import json
+import threading
+
+from persistence import read_text, file_exists
+
+# 不参与名称索引的占位名称
+PLACEHOLDER_NAMES = ('未识别', '未知')
+
+
+def edit_distance(a, b):
+    """计算两个字符串之间的编辑距离（Levenshtein距离）
+
+    参数:
+        a (str): 字符串a
+        b (str): 字符串b
+
+    返回:
+        int: 将a变换为b所需的最少插入、删除、替换次数
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,                        # 删除
+                current[j - 1] + 1,                     # 插入
+                previous[j - 1] + (char_a != char_b)    # 替换
+            ))
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """基于编辑距离的BK树
+
+    按照与父节点的编辑距离组织子节点，查询时利用三角不等式剪枝，
+    只访问距离可能落在范围内的分支。
+    """
+
+    def __init__(self, distance=edit_distance):
+        self.distance = distance
+        self.root = None  # 节点结构: [单词, {距离: 子节点}]
+        self.size = 0
+
+    def add(self, word):
+        """添加单词，已存在时忽略
+
+        返回:
+            bool: 是否为新添加的单词
+        """
+        if self.root is None:
+            self.root = [word, {}]
+            self.size = 1
+            return True
+
+        node = self.root
+        while True:
+            d = self.distance(word, node[0])
+            if d == 0:
+                return False
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = [word, {}]
+                self.size += 1
+                return True
+            node = child
+
+    def search(self, word, max_distance):
+        """查询与word编辑距离不超过max_distance的所有单词
+
+        返回:
+            list: [(距离, 单词), ...]，按距离从小到大排序
+        """
+        results = []
+        if self.root is None:
+            return results
+
+        stack = [self.root]
+        while stack:
+            node_word, children = stack.pop()
+            d = self.distance(word, node_word)
+            if d <= max_distance:
+                results.append((d, node_word))
+            low, high = d - max_distance, d + max_distance
+            for child_distance, child in children.items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+
+        results.sort()
+        return results
+
+    def __len__(self):
+        return self.size
+
+
+class NameIndex:
+    """已知队友名称索引
+
+    将OCR识别出的名称吸附到编辑距离最近的已知队友名称上，
+    避免单个字符识别错误就产生一个新的队员及其配置文件。
+    识别线程池的工作线程会同时查询，添加和查询用锁互斥（BK树的子节点字典不能边遍历边修改）。
+
+    属性:
+        tree: 已知名称组成的BK树
+        max_distance: 允许吸附的最大编辑距离，None表示按名称长度自动计算
+    """
+
+    def __init__(self, names=(), max_distance=None):
+        self.tree = BKTree()
+        self.names = set()
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        """添加一个已知名称，占位名称会被忽略"""
+        if not is_valid_name(name):
+            return False
+        with self._lock:
+            self.names.add(name)
+            return self.tree.add(name)
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __len__(self):
+        return len(self.names)
+
+    def distance_bound(self, name):
+        """计算名称允许的最大编辑距离
+
+        名称越短，允许的误差越小：2-3字名称只允许1个字符错误，更长的名称最多允许2个。
+        """
+        if self.max_distance is not None:
+            return self.max_distance
+        return 1 if len(name) <= 3 else 2
+
+    def resolve(self, raw_name):
+        """将OCR结果吸附到最近的已知名称
+
+        参数:
+            raw_name (str): 清理后的OCR名称
+
+        返回:
+            tuple: (名称, 置信度)。命中已知名称时返回该名称和 1 - 距离/名称长度；
+                   范围内没有已知名称时原样返回，置信度为None
+        """
+        if not raw_name or not self.names:
+            return raw_name, None
+        if raw_name in self.names:
+            return raw_name, 1.0
+
+        bound = self.distance_bound(raw_name)
+        with self._lock:
+            candidates = self.tree.search(raw_name, bound)
+        if not candidates:
+            return raw_name, None
+
+        best_distance = candidates[0][0]
+        best = [word for d, word in candidates if d == best_distance]
+        if len(best) > 1:
+            # 多个已知名称距离相同时无法判断，不做吸附
+            print(f"名称 '{raw_name}' 与多个已知名称距离相同 {best}，不做吸附")
+            return raw_name, None
+
+        known_name = best[0]
+        confidence = 1.0 - best_distance / max(len(raw_name), len(known_name))
+        print(f"名称吸附: '{raw_name}' -> '{known_name}' (距离: {best_distance}, 置信度: {confidence:.2f})")
+        return known_name, confidence
+
+    @classmethod
+    def from_known_sources(cls, config_dir=None, calibration_file=None, max_distance=None):
+        """从队员配置文件和校准集中收集已知名称并构建索引
+
+        参数:
+            config_dir (str): 队员配置文件所在目录，默认为程序目录
+            calibration_file (str): 校准文件路径，默认为 config_dir 下的 health_bars_calibration.json
+            max_distance (int): 允许吸附的最大编辑距离
+        """
+        if config_dir is None:
+            config_dir = os.path.dirname(os.path.abspath(__file__))
+        if calibration_file is None:
+            calibration_file = os.path.join(config_dir, 'health_bars_calibration.json')
+
+        index = cls(max_distance=max_distance)
+        for name in load_member_config_names(config_dir):
+            index.add(name)
+        for name in load_calibration_names(calibration_file):
+            index.add(name)
+        print(f"已构建队友名称索引，共 {len(index)} 个已知名称")
+        return index
+
+
+def is_valid_name(name):
+    """判断名称是否可以作为已知队友名称（排除占位名称和自动生成的"队友N"）"""
+    if not name or name in PLACEHOLDER_NAMES:
+        return False
+    if name.startswith('队友') and name[2:].isdigit():
+        return False
+    return True
+
+
+def load_member_config_names(config_dir):
+    """读取队员配置存储（config_dir 下的 members.json）中所有校准集的队员名称"""
+    names = []
+    try:
+        from member_store import MemberStore, MEMBER_STORE_FILE
+        store = MemberStore.get_instance(os.path.join(config_dir, MEMBER_STORE_FILE))
+        for set_name in list(store.document['sets']):
+            names.extend(store.names(set_name))
+    except Exception as e:
+        print(f"读取队员配置存储失败: {str(e)}")
+    return names
+
+
+def load_calibration_names(calibration_file):
+    """读取校准文件中所有校准集记录的队友名称"""
+    names = []
+    if not file_exists(calibration_file):
+        return names
+    try:
+        data = json.loads(read_text(calibration_file))
+        for calibration_set in data.get('calibration_sets', {}).values():
+            for bar in calibration_set.get('health_bars', []):
+                if bar.get('name'):
+                    names.append(bar['name'])
+    except Exception as e:
+        print(f"读取校准文件中的队友名称时出错: {str(e)}")
+    return names
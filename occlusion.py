@@ -0,0 +1,94 @@
+import time
+
+import pyautogui
+
+from config_defaults import OCCLUSION_SETTINGS
+
+# 最近一次自动选择点击的位置和时间 (x, y, 时间)
+_last_click = None
+
+
+def load_occlusion_settings():
+    """读取遮挡检测设置，配置中缺少的项使用默认值
+
+    返回的是配置管理器的只读视图，配置文件被修改后自动更新
+    """
+    try:
+        from config_manager import get_config
+        return get_config().view('occlusion', OCCLUSION_SETTINGS)
+    except Exception as e:
+        print(f"加载遮挡检测设置失败: {str(e)}")
+        return dict(OCCLUSION_SETTINGS)
+
+
+_settings = None
+
+
+def get_occlusion_settings():
+    """遮挡检测设置（第一次使用时加载）"""
+    global _settings
+    if _settings is None:
+        _settings = load_occlusion_settings()
+    return _settings
+
+
+def note_click(x, y, timestamp=None):
+    """记录程序自己点击的位置（自动选择队友），点击后一段时间内该处血条的读数不可信
+
+    参数:
+        x, y (int): 点击的屏幕坐标
+        timestamp (float): 点击时间，默认为当前时间
+    """
+    global _last_click
+    _last_click = (x, y, time.time() if timestamp is None else timestamp)
+
+
+def get_cursor_position():
+    """当前鼠标位置，遮挡检测关闭或获取失败时返回None"""
+    if not get_occlusion_settings()['enabled']:
+        return None
+    try:
+        x, y = pyautogui.position()
+        return x, y
+    except Exception as e:
+        print(f"获取鼠标位置失败: {str(e)}")
+        return None
+
+
+def point_near_rect(point, rect, margin):
+    """判断点是否落在矩形向外扩展 margin 像素的范围内"""
+    x, y = point
+    x1, y1, x2, y2 = rect
+    return x1 - margin <= x <= x2 + margin and y1 - margin <= y <= y2 + margin
+
+
+def check_occlusion(rect, reading, cursor=None, white_baseline=None):
+    """判断一次读数是否可能被遮挡
+
+    依次检查：截图时鼠标在血条框附近（指针本身和悬停提示），刚刚自动点击过该血条
+    （游戏的选中高亮），测量行中白色像素明显多于平常（提示框、飘字）。
+    白色像素按该队员的基线比较：扫描行经过血条中部，很多游戏在那里常驻显示白色的血量数字。
+
+    参数:
+        rect (tuple): 血条框 (x1, y1, x2, y2)
+        reading (HpReading): 测量记录
+        cursor (tuple): 截图时的鼠标位置，为None时不检查鼠标
+        white_baseline (float): 该队员平常的白色像素比例，为None（尚未采集）时不检查白色像素
+
+    返回:
+        str: 遮挡原因；没有遮挡或检测已关闭时返回None
+    """
+    settings = get_occlusion_settings()
+    if not settings['enabled'] or reading is None:
+        return None
+    margin = settings['cursor_margin']
+    if cursor is not None and point_near_rect(cursor, rect, margin):
+        return "鼠标位于血条上"
+    click = _last_click
+    if click is not None and 0 <= reading.timestamp - click[2] <= settings['click_hold_seconds'] \
+            and point_near_rect(click[:2], rect, margin):
+        return "刚刚自动点击了该血条"
+    if reading.width and white_baseline is not None \
+            and reading.white_ratio - white_baseline >= settings['overlay_white_increase']:
+        return f"血条区域被文字或提示框遮挡（白色像素 {reading.white_ratio:.0%}，平常 {white_baseline:.0%}）"
+    return None
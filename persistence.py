@@ -0,0 +1,159 @@
+import os
+import time
+import atexit
+import threading
+
+# 写入合并窗口（秒）：窗口内对同一文件的多次保存只写最后一次
+WRITE_DELAY = 0.5
+
+
+def atomic_write(path, text):
+    """先写临时文件再用 os.replace 原子替换，写入过程中出错不会损坏原文件
+
+    参数:
+        path (str): 目标文件路径
+        text (str): 文件内容
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_file = path + '.tmp'
+    try:
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_file, path)
+    except Exception:
+        if os.path.exists(temp_file):
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+        raise
+
+
+class WriteBehindWriter:
+    """延迟批量写入配置文件
+
+    调用方在内存中序列化好文件内容后交给 schedule()，立即返回，不访问磁盘。
+    后台线程在第一次标记后等待 delay 秒，把这段时间内积累的所有文件一次写出；
+    同一文件在窗口内被多次保存时只写最后的内容。flush() 在调用线程中同步写出所有待写入的文件，
+    用于程序退出前确保配置落盘。文件按绝对路径区分；尚未落盘（包括正在写出）的内容可以用
+    pending_text() 读到，每次都从磁盘读取文件的调用方应使用 read_text()。
+
+    属性:
+        delay (float): 写入合并窗口（秒）
+        write_count (int): 实际写入文件的次数
+    """
+
+    def __init__(self, delay=WRITE_DELAY):
+        self.delay = delay
+        self.write_count = 0
+        self._pending = {}  # 文件绝对路径 -> 待写入的内容
+        self._writing = {}  # 正在写出的文件绝对路径 -> 内容
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()  # 后台线程和 flush() 不会同时写盘，保证写入顺序
+        self._thread = None
+
+    def schedule(self, path, text):
+        """标记文件待写入
+
+        参数:
+            path (str): 目标文件路径
+            text (str): 文件内容（覆盖之前尚未写出的内容）
+        """
+        with self._condition:
+            self._pending[os.path.abspath(path)] = text
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def pending_text(self, path):
+        """文件尚未落盘的内容，没有待写入或正在写出的内容时返回None"""
+        path = os.path.abspath(path)
+        with self._condition:
+            text = self._pending.get(path)
+            return text if text is not None else self._writing.get(path)
+
+    def pending_count(self):
+        """尚未写出的文件数"""
+        with self._condition:
+            return len(self._pending)
+
+    def _run(self):
+        """后台线程：有待写入的文件时等待合并窗口结束后统一写出"""
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+            time.sleep(self.delay)
+            self.flush()
+
+    def flush(self):
+        """同步写出所有待写入的文件
+
+        返回:
+            int: 写出的文件数
+        """
+        with self._write_lock:
+            with self._condition:
+                pending, self._pending = self._pending, {}
+                self._writing = pending
+            written = 0
+            try:
+                for path, text in pending.items():
+                    try:
+                        atomic_write(path, text)
+                        written += 1
+                    except Exception as e:
+                        print(f"写入配置文件 {path} 时出错: {str(e)}")
+            finally:
+                with self._condition:
+                    self._writing = {}
+            self.write_count += written
+            return written
+
+
+_writer = WriteBehindWriter()
+
+
+def get_writer():
+    """获取全局的延迟写入器"""
+    return _writer
+
+
+def schedule_write(path, text):
+    """把文件内容交给全局延迟写入器"""
+    _writer.schedule(path, text)
+
+
+def read_text(path):
+    """读取文件内容，有尚未落盘的内容时返回该内容
+
+    返回:
+        str: 文件内容
+
+    异常:
+        FileNotFoundError: 文件不存在且没有待写入的内容
+    """
+    text = _writer.pending_text(path)
+    if text is not None:
+        return text
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def file_exists(path):
+    """文件是否存在（包括已安排写入但尚未落盘的文件）"""
+    return _writer.pending_text(path) is not None or os.path.exists(path)
+
+
+def flush_all():
+    """同步写出所有待写入的配置文件
+
+    返回:
+        int: 写出的文件数
+    """
+    return _writer.flush()
+
+
+# 正常退出时兜底写出，窗口关闭时还会显式调用 flush_all()
+atexit.register(flush_all)
@@ -0,0 +1,230 @@
+"""启动耗时分析
+
+按模块导入和初始化阶段统计程序启动耗时，找出拖慢主窗口显示的部分。
+
+导入耗时来自 Python 自带的 -X importtime：脚本在子进程中以该选项启动程序，
+解析每个模块的自身耗时和累计耗时；初始化阶段耗时来自程序中的 PhaseTimer 计时点
+（例如主窗口 __init__ 中创建健康监控、构建各个页面、加载设置等）。
+子进程在主窗口第一次显示后退出，不进入事件循环。
+
+用法:
+    python startup_profiler.py
+    python startup_profiler.py --top 30 --budget 1500
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from config_defaults import STARTUP_SETTINGS
+
+# 子进程输出阶段耗时时使用的行前缀，便于从程序自身的打印输出中区分
+RESULT_PREFIX = 'STARTUP_PROFILE '
+
+_phases = []
+
+
+class PhaseTimer:
+    """初始化阶段计时器
+
+    每次调用 mark() 记录从上一个计时点（或创建计时器时）到现在的耗时，
+    记录保存在模块级列表中，由启动分析脚本读取。计时本身只有一次 perf_counter 调用，
+    正常运行时也可以保留。
+
+    参数:
+        scope (str): 阶段名称前缀，例如 'MainWindow'
+    """
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.start = time.perf_counter()
+        self.last = self.start
+
+    def mark(self, name):
+        """记录一个阶段
+
+        参数:
+            name (str): 阶段名称
+
+        返回:
+            float: 该阶段耗时（毫秒）
+        """
+        now = time.perf_counter()
+        elapsed_ms = (now - self.last) * 1000
+        self.last = now
+        _phases.append((f"{self.scope}.{name}", elapsed_ms))
+        return elapsed_ms
+
+    def total_ms(self):
+        """从创建计时器到最后一个计时点的总耗时（毫秒）"""
+        return (self.last - self.start) * 1000
+
+
+def get_phases():
+    """获取已记录的所有阶段 [(名称, 耗时毫秒), ...]"""
+    return list(_phases)
+
+
+def load_startup_settings():
+    """读取启动设置，配置中缺少的项使用默认值"""
+    settings = dict(STARTUP_SETTINGS)
+    try:
+        from config_manager import get_config
+        settings.update(get_config().get_json('startup', {}))
+    except Exception as e:
+        print(f"加载启动设置失败: {str(e)}")
+    return settings
+
+
+def parse_importtime(text):
+    """解析 -X importtime 的输出
+
+    每行格式为 "import time: 自身耗时(us) | 累计耗时(us) | 模块名"，模块名前的缩进表示嵌套深度。
+
+    返回:
+        list: [(模块名, 深度, 自身耗时毫秒, 累计耗时毫秒), ...]
+    """
+    imports = []
+    for line in text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0])
+            cumulative_us = int(parts[1])
+        except ValueError:
+            continue  # 表头行
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), depth, self_us / 1000, cumulative_us / 1000))
+    return imports
+
+
+def direct_imports(imports, parent):
+    """取出由指定模块直接导入的模块
+
+    importtime 在模块导入完成时输出一行，子模块总在父模块之前输出，
+    因此父模块那一行之前、上一个同级模块之后的深一层条目就是它的直接导入。
+
+    返回:
+        list: [(模块名, 深度, 自身耗时毫秒, 累计耗时毫秒), ...]
+    """
+    children = []
+    for item in imports:
+        name, depth = item[0], item[1]
+        if depth == 0:
+            if name == parent:
+                return children
+            children = []
+        elif depth == 1:
+            children.append(item)
+    return []
+
+
+def run_child():
+    """子进程：导入并创建主窗口，显示后输出阶段耗时并退出"""
+    # 本脚本以 __main__ 运行，注册为 startup_profiler 使程序中的计时点记录到同一个列表
+    sys.modules.setdefault('startup_profiler', sys.modules[__name__])
+    timer = PhaseTimer('启动')
+    import fluent_ui
+    timer.mark('导入 fluent_ui')
+    app = fluent_ui.create_application()
+    timer.mark('创建 QApplication')
+    window = fluent_ui.MainWindow()
+    timer.mark('创建主窗口')
+    window.show()
+    app.processEvents()
+    timer.mark('首次显示')
+
+    result = {'phases': get_phases(), 'total_ms': timer.total_ms()}
+    print(RESULT_PREFIX + json.dumps(result, ensure_ascii=False))
+    sys.stdout.flush()
+
+    # 不进入事件循环也不触发 closeEvent，直接退出前写出已延迟的配置
+    from persistence import flush_all
+    flush_all()
+    os._exit(0)
+
+
+def profile_startup():
+    """在子进程中启动程序并收集导入和阶段耗时
+
+    返回:
+        tuple: (导入列表, 阶段列表, 显示主窗口的总耗时毫秒)；失败时阶段列表为None
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONIOENCODING='utf-8')
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.abspath(__file__), '--child'],
+        cwd=script_dir, env=env, capture_output=True, text=True, encoding='utf-8', errors='replace'
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    imports = parse_importtime(process.stderr)
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            result = json.loads(line[len(RESULT_PREFIX):])
+            return imports, result['phases'], result['total_ms']
+
+    print(f"子进程没有输出启动结果 (退出码 {process.returncode}，总耗时 {wall_ms:.0f} ms)")
+    errors = [line for line in process.stderr.splitlines() if not line.startswith('import time:')]
+    if errors:
+        print('\n'.join(errors[-20:]))
+    return imports, None, wall_ms
+
+
+def print_report(imports, phases, total_ms, top, budget_ms):
+    """打印启动耗时报告"""
+    children = sorted(direct_imports(imports, 'fluent_ui'), key=lambda item: -item[3])
+    print(f"\n导入耗时（fluent_ui 直接导入的模块，按累计耗时排序，前 {top} 个）")
+    print(f"{'模块':<48}{'累计(ms)':>12}")
+    for name, _, _, cumulative_ms in children[:top]:
+        print(f"{name:<48}{cumulative_ms:>12.1f}")
+
+    by_self = sorted(imports, key=lambda item: -item[2])
+    print(f"\n导入耗时（所有模块，按自身耗时排序，前 {top} 个）")
+    print(f"{'模块':<48}{'自身(ms)':>12}")
+    for name, _, self_ms, _ in by_self[:top]:
+        print(f"{name:<48}{self_ms:>12.1f}")
+
+    if phases:
+        print("\n初始化阶段")
+        print(f"{'阶段':<48}{'耗时(ms)':>12}")
+        for name, elapsed_ms in phases:
+            print(f"{name:<48}{elapsed_ms:>12.1f}")
+
+    import_ms = sum(item[3] for item in imports if item[1] == 0)
+    print(f"\n导入总耗时: {import_ms:.0f} ms")
+    print(f"主窗口显示总耗时: {total_ms:.0f} ms (预算 {budget_ms:.0f} ms)")
+    if total_ms > budget_ms:
+        print(f"超出启动预算 {total_ms - budget_ms:.0f} ms")
+        return False
+    return True
+
+
+def main():
+    if '--child' in sys.argv:
+        run_child()
+        return 0
+
+    settings = load_startup_settings()
+    parser = argparse.ArgumentParser(description='按模块导入和初始化阶段统计程序启动耗时')
+    parser.add_argument('--top', type=int, default=settings['report_top'], help='每张表显示的模块数')
+    parser.add_argument('--budget', type=float, default=settings['time_budget_ms'],
+                        help='主窗口显示的时间预算（毫秒），超出时返回非零退出码')
+    args = parser.parse_args()
+
+    imports, phases, total_ms = profile_startup()
+    if phases is None:
+        return 1
+    within_budget = print_report(imports, phases, total_ms, max(1, args.top), args.budget)
+    return 0 if within_budget else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
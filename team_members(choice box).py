@@ -4,24 +4,27 @@ import numpy as np
 import pyautogui
 import keyboard
 import time
-import json
 import os
 import sys
-import importlib.util
+import threading
+from collections import namedtuple
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import QRect
 from 选择框 import FluentSelectionBox, show_selection_box, TransparentSelectionBox
 from prettytable import PrettyTable  # 导入PrettyTable库用于美化输出
+from bar_roi import refine_bar_roi, pick_scanlines, spread_rows
+from hp_filter import HpFilter, load_hp_filter_settings
+from team_state import TeamState, MemberView
+from color_model import fit_color_model, model_summary, load_color_model_settings, AdaptiveColorModel
+from config_defaults import ROI_SETTINGS
+from member_store import get_member_store, DEFAULT_SET
+from member_status import ALIVE, DEAD, UNMEASURED, STATUS_LABELS, classify_reading
+from occlusion import check_occlusion, get_cursor_position, get_occlusion_settings
+from health_bar_kernel import (capture_frame, capture_regions, measure_reading, measure_batch, valid_region,
+                               get_scanline_settings, estimate_edge, get_edge_settings, roi_statistics)
 
-# 动态导入带空格的模块
-module_name = "Zhu Xian World Health Bar Test(choice box)"
-module_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Zhu Xian World Health Bar Test(choice box).py")
-spec = importlib.util.spec_from_file_location(module_name, module_path)
-health_bar_module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(health_bar_module)
-
-# 从模块中获取需要的函数
-get_hp_percentage = health_bar_module.get_hp_percentage
+# 发布快照时冻结的测量配置：血条框、实际测量区域、颜色范围（只读副本）和扫描行（未启用扫描线时为None）
+MemberConfig = namedtuple('MemberConfig', ['rect', 'region', 'lower', 'upper', 'rows'])
 
 class TeamMember:
     """小队成员类
@@ -32,25 +35,65 @@ class TeamMember:
     属性:
         name (str): 成员名称
         profession (str): 职业名称
-        health_percentage (float): 当前血量百分比
-        is_alive (bool): 存活状态
+        health_percentage (float): 当前血量百分比（滤波后）
+        raw_health_percentage (float): 最近一次测量的原始血量百分比
+        previous_health_percentage (float): 上一次测量后滤波的血量百分比，用于确认低置信度的低血量读数
+        last_reading (HpReading): 最近一次的测量记录（亚像素填充位置、填充像素比例、置信度、截图时间）
+        edge_health_percentage (float): 最近一次边缘估计的血量百分比，没有明显边缘或未启用时为None
+        edge_disagrees (bool): 最近一次颜色测量与边缘估计是否不一致（用于只在状态变化时记录日志）
+        hp_velocity (float): 血量变化速度（百分比/秒），负值表示掉血
+        hp_confidence (float): 当前血量估计的置信度（0-1），为滤波器置信度与测量置信度之积
+        is_alive (bool): 存活状态（未阵亡；超出范围和无法识别的队员仍视为存活）
+        status (int): 队员状态，ALIVE / DEAD / OUT_OF_RANGE / UNREADABLE，见 member_status
+        occluded_ticks (int): 连续被判断为遮挡（鼠标、点击高亮、提示框）的测量次数
+        white_baseline (float): 测量行中平常的白色像素比例（常驻的血量数字等），细化血条区域时采集，
+            监控中随采用的读数缓慢更新；尚未采集时为None
         x1, y1 (int): 血条左上角坐标
         x2, y2 (int): 血条右下角坐标
         hp_color_lower (np.array): 血条颜色HSV下限
         hp_color_upper (np.array): 血条颜色HSV上限
+        bar_roi (dict): 血条填充所在的紧凑区域 {'x1', 'y1', 'x2', 'y2'}，未细化时为None
+        color_model (dict): 拟合血条颜色时的统计信息（均值、标准差、命中率、误检率），未拟合时为None
+        scanlines (list): 细化血条区域时选取的扫描行（相对紧凑区域顶部），未选取时为None
+        adaptive_color (AdaptiveColorModel): 监控过程中自适应调整的颜色范围，只在本次运行中有效
+        color_drift_message (str): 最近一次颜色漂移提示，由监控线程取走后清空
+        damage_rate (float): 分诊引擎估计的掉血速度（百分比/秒）
+        last_update_time (float): 最近一次测量血量的时间
+        view (MemberView): 数值状态所在的结构数组行；加入队伍后迁移到队伍共享的 TeamState
+        on_changed (callable): 配置保存成功后的回调，队伍用它发布新的快照
     """
     
-    def __init__(self, name, profession):
+    def __init__(self, name, profession, set_name=DEFAULT_SET):
         """初始化小队成员
         
         参数:
             name (str): 成员名称
             profession (str): 职业名称
+            set_name (str): 配置所在的校准集，默认为 DEFAULT_SET
         """
         self.name = name
         self.profession = profession
+        self.set_name = set_name
+        
+        # 血量、位置、颜色等数值状态存放在结构数组中，单独创建的队员先使用自己的单行存储
+        state = TeamState(capacity=1)
+        self.view = MemberView(state, state.allocate())
+        
         self.health_percentage = 100.0
+        self.raw_health_percentage = 100.0
+        self.previous_health_percentage = 100.0
+        self.last_reading = None
+        self.hp_velocity = 0.0
+        self.hp_confidence = 0.0
+        self.damage_rate = 0.0
+        self.last_update_time = 0.0
+        self.hp_filter = HpFilter(load_hp_filter_settings())
+        self.edge_health_percentage = None
+        self.edge_disagrees = False
         self.is_alive = True
+        self.status = ALIVE
+        self.occluded_ticks = 0
+        self.white_baseline = None
         
         # 血条位置和颜色默认值
         self.x1 = 100
@@ -59,55 +102,121 @@ class TeamMember:
         self.y2 = 120
         self.hp_color_lower = np.array([43, 71, 121])
         self.hp_color_upper = np.array([63, 171, 221])
+        self.bar_roi = None
+        self.color_model = None
+        self.scanlines = None
+        self.adaptive_color = None
+        self.adaptive_enabled = None
+        self.color_drift_message = None
+        self.on_changed = None
         
-        # 配置文件路径
-        self.config_dir = os.path.dirname(os.path.abspath(__file__))
-        self.config_file = os.path.join(self.config_dir, f"{name}_config.json")
-        
-        # 确保配置文件目录存在
-        os.makedirs(self.config_dir, exist_ok=True)
+        # 所有队员的配置集中保存在队员配置存储中
+        self.store = get_member_store()
         
         # 尝试加载配置
         self.load_config()
     
+    # --- 以下属性直接读写 TeamState 中该队员所在的行 ---
+    
+    health_percentage = property(lambda self: self.view.hp, lambda self, value: setattr(self.view, 'hp', value))
+    raw_health_percentage = property(lambda self: self.view.raw_hp, lambda self, value: setattr(self.view, 'raw_hp', value))
+    previous_health_percentage = property(lambda self: self.view.prev_hp, lambda self, value: setattr(self.view, 'prev_hp', value))
+    hp_velocity = property(lambda self: self.view.velocity, lambda self, value: setattr(self.view, 'velocity', value))
+    hp_confidence = property(lambda self: self.view.confidence, lambda self, value: setattr(self.view, 'confidence', value))
+    damage_rate = property(lambda self: self.view.damage_rate, lambda self, value: setattr(self.view, 'damage_rate', value))
+    is_alive = property(lambda self: self.view.alive, lambda self, value: setattr(self.view, 'alive', value))
+    status = property(lambda self: int(self.view.status), lambda self, value: setattr(self.view, 'status', value))
+    last_update_time = property(lambda self: self.view.timestamp, lambda self, value: setattr(self.view, 'timestamp', value))
+    
+    def _rect_property(k):
+        def getter(self):
+            return int(self.view.rect[k])
+        
+        def setter(self, value):
+            self.view.rect[k] = value
+        return property(getter, setter)
+    
+    x1 = _rect_property(0)
+    y1 = _rect_property(1)
+    x2 = _rect_property(2)
+    y2 = _rect_property(3)
+    del _rect_property
+    
+    @property
+    def hp_color_lower(self):
+        return self.view.color_lower
+    
+    @hp_color_lower.setter
+    def hp_color_lower(self, value):
+        self.view.color_lower[:] = value
+    
+    @property
+    def hp_color_upper(self):
+        return self.view.color_upper
+    
+    @hp_color_upper.setter
+    def hp_color_upper(self, value):
+        self.view.color_upper[:] = value
+    
+    @property
+    def bar_roi(self):
+        roi = self.view.bar_roi
+        if roi[0] < 0:
+            return None
+        return {'x1': int(roi[0]), 'y1': int(roi[1]), 'x2': int(roi[2]), 'y2': int(roi[3])}
+    
+    @bar_roi.setter
+    def bar_roi(self, value):
+        if value != self.bar_roi:
+            # 扫描行和白色像素基线相对紧凑区域测得，区域变化后不再适用
+            self.scanlines = None
+            self.white_baseline = None
+        if value:
+            self.view.bar_roi[:] = (value['x1'], value['y1'], value['x2'], value['y2'])
+        else:
+            self.view.bar_roi[0] = -1
+    
     def load_config(self):
-        """从配置文件加载设置
+        """从队员配置存储加载设置
         
-        从成员专属的配置文件中读取血条位置坐标和颜色范围的配置信息。
-        如果配置文件不存在或读取出错，将使用默认设置。
+        读取该成员的血条位置坐标和颜色范围的配置信息。
+        如果存储中没有该成员或配置不完整，将使用默认设置。
         """
         try:
-            if not os.path.exists(self.config_file):
-                print(f"未找到{self.name}的配置文件，将使用默认设置并创建新的配置文件")
+            config = self.store.get(self.name, self.set_name)
+            if config is None:
+                print(f"未找到{self.name}的配置，将使用默认设置并保存")
                 self.save_config()
                 return
+            
+            # 验证配置的完整性
+            if not all(key in config.get('health_bar', {}) for key in ['coordinates', 'color']):
+                raise ValueError("配置格式不正确")
                 
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                
-                # 验证配置文件的完整性
-                if not all(key in config.get('health_bar', {}) for key in ['coordinates', 'color']):
-                    raise ValueError("配置文件格式不正确")
-                    
-                coords = config['health_bar']['coordinates']
-                if not all(key in coords for key in ['x1', 'y1', 'x2', 'y2']):
-                    raise ValueError("坐标配置不完整")
-                    
-                color = config['health_bar']['color']
-                if not all(key in color for key in ['lower', 'upper']):
-                    raise ValueError("颜色配置不完整")
+            coords = config['health_bar']['coordinates']
+            if not all(key in coords for key in ['x1', 'y1', 'x2', 'y2']):
+                raise ValueError("坐标配置不完整")
                 
-                # 更新配置
-                self.x1 = coords['x1']
-                self.y1 = coords['y1']
-                self.x2 = coords['x2']
-                self.y2 = coords['y2']
-                self.hp_color_lower = np.array(color['lower'])
-                self.hp_color_upper = np.array(color['upper'])
+            color = config['health_bar']['color']
+            if not all(key in color for key in ['lower', 'upper']):
+                raise ValueError("颜色配置不完整")
+            
+            # 更新配置
+            self.x1 = coords['x1']
+            self.y1 = coords['y1']
+            self.x2 = coords['x2']
+            self.y2 = coords['y2']
+            self.hp_color_lower = np.array(color['lower'])
+            self.hp_color_upper = np.array(color['upper'])
+            roi = config['health_bar'].get('bar_roi')
+            if roi and roi['y1'] >= self.y1 and roi['y2'] <= self.y2 and roi['x1'] < roi['x2'] < self.x2:
+                # 旧版本细化时以当时的填充右端作为右边缘，队友未满血时区域被截短，恢复到血条框的右边缘
+                print(f"{self.name}的紧凑区域右边缘 {roi['x2']} 短于血条框 {self.x2}，已恢复")
+                roi = dict(roi, x2=self.x2)
+            self.bar_roi = roi
+            self.scanlines = config['health_bar'].get('scanlines')
+            self.color_model = color.get('model')
                 
-        except json.JSONDecodeError:
-            print(f"解析{self.name}的配置文件时出错，文件格式不正确。使用默认设置")
-            self.save_config()
         except ValueError as e:
             print(f"加载{self.name}的配置文件时出错: {str(e)}。使用默认设置")
             self.save_config()
@@ -116,11 +225,11 @@ class TeamMember:
             self.save_config()
     
     def save_config(self):
-        """保存设置到配置文件
+        """保存设置到队员配置存储
         
-        将当前的血条位置坐标和颜色范围保存到成员专属的配置文件中。
+        将当前的血条位置坐标和颜色范围保存到队员配置存储中。
         配置信息包括血条的坐标范围和HSV颜色范围。
-        如果配置文件目录不存在，会自动创建。
+        存储以原子替换的方式写入；在 store.transaction() 中多个队员的保存合并为一次写入。
         """
         config = {
             'profession': self.profession,  # 添加职业信息
@@ -137,33 +246,24 @@ class TeamMember:
                 }
             }
         }
+        if self.bar_roi:
+            config['health_bar']['bar_roi'] = self.bar_roi
+        if self.scanlines:
+            config['health_bar']['scanlines'] = list(self.scanlines)
+        if self.color_model:
+            config['health_bar']['color']['model'] = self.color_model
         try:
-            # 确保配置文件目录存在
-            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            
-            # 使用临时文件来保存配置，以防写入过程中出错导致配置文件损坏
-            temp_file = self.config_file + '.tmp'
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=4)
+            if not self.store.put(self.name, config, self.set_name):
+                print(f"保存{self.name}的配置失败")
+                return
             
-            # 如果写入成功，则替换原配置文件
-            if os.path.exists(self.config_file):
-                os.remove(self.config_file)
-            os.rename(temp_file, self.config_file)
+            print(f"{self.name}的设置已成功保存")
             
-            print(f"{self.name}的设置已成功保存到配置文件")
-        except PermissionError:
-            print(f"保存{self.name}配置文件时出错: 没有写入权限")
-        except OSError as e:
-            print(f"保存{self.name}配置文件时出错: 文件系统错误 - {str(e)}")
+            # 通知所属队伍发布新的快照，监控线程下一个tick即使用新配置
+            if self.on_changed is not None:
+                self.on_changed(self)
         except Exception as e:
-            print(f"保存{self.name}配置文件时出错: {str(e)}")
-            # 如果临时文件存在，清理它
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
+            print(f"保存{self.name}配置时出错: {str(e)}")
     
     def set_health_bar_position(self):
         """设置血条位置
@@ -208,53 +308,392 @@ class TeamMember:
                 frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
                 # 转换到HSV色彩空间
                 hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-                # 获取HSV值
-                h, s, v = hsv[0, 0]
-                # 设置HSV范围（允许一定的颜色变化）
-                self.hp_color_lower = np.array([max(0, h-10), max(0, s-50), max(0, v-50)])
-                self.hp_color_upper = np.array([min(180, h+10), min(255, s+50), min(255, v+50)])
-                print(f"{self.name}的HSV颜色值: ({h}, {s}, {v})")
-                print(f"设置{self.name}的HSV范围为: {self.hp_color_lower} - {self.hp_color_upper}")
-                self.save_config()  # 保存新的颜色设置
+                # 优先根据整个血条区域拟合颜色模型，取色像素用于区分血条和背景
+                if not self.calibrate_color(seed_bgr=frame[0, 0]):
+                    # 获取HSV值
+                    h, s, v = hsv[0, 0]
+                    # 设置HSV范围（允许一定的颜色变化）
+                    self.hp_color_lower = np.array([max(0, h-10), max(0, s-50), max(0, v-50)])
+                    self.hp_color_upper = np.array([min(180, h+10), min(255, s+50), min(255, v+50)])
+                    self.color_model = None
+                    print(f"{self.name}的HSV颜色值: ({h}, {s}, {v})")
+                    print(f"设置{self.name}的HSV范围为: {self.hp_color_lower} - {self.hp_color_upper}")
+                    self.save_config()  # 保存新的颜色设置
                 time.sleep(0.2)  # 防止重复触发
                 break
             elif keyboard.is_pressed('esc'):
                 print(f"退出{self.name}颜色获取模式")
                 break
     
-    def update_health(self):
+    def freeze_config(self):
+        """生成当前测量配置的只读副本
+        
+        返回:
+            MemberConfig: 血条框、测量区域和颜色范围
+        """
+        lower = np.array(self.hp_color_lower, dtype=np.uint8)
+        upper = np.array(self.hp_color_upper, dtype=np.uint8)
+        lower.flags.writeable = False
+        upper.flags.writeable = False
+        region = self.get_measure_region()
+        return MemberConfig((self.x1, self.y1, self.x2, self.y2), region, lower, upper,
+                            self.get_scanlines(region))
+    
+    def get_scanlines(self, region):
+        """获取扫描线模式使用的行
+        
+        细化时选取的行只适用于紧凑区域；血条框被重新设置、退回整个血条框时按区域高度取中部的行。
+        
+        参数:
+            region (tuple): 测量区域 (x1, y1, x2, y2)
+            
+        返回:
+            tuple: 相对区域顶部的行号，未启用扫描线时返回None
+        """
+        settings = get_scanline_settings()
+        if not settings['enabled']:
+            return None
+        height = region[3] - region[1]
+        if height <= 0:
+            return None
+        roi = self.bar_roi
+        if (self.scanlines and roi and region == (roi['x1'], roi['y1'], roi['x2'], roi['y2'])
+                and all(0 <= row < height for row in self.scanlines)):
+            return tuple(self.scanlines)
+        return tuple(spread_rows(0, height - 1, max(1, min(3, settings['rows']))))
+    
+    def get_measure_region(self):
+        """获取测量血量时使用的区域
+        
+        已细化且位于血条框内的紧凑区域优先；血条框被重新设置后旧的紧凑区域不再适用，回退到整个血条框。
+        
+        返回:
+            tuple: (x1, y1, x2, y2)
+        """
+        roi = self.bar_roi
+        if roi and self.x1 <= roi['x1'] < roi['x2'] <= self.x2 and self.y1 <= roi['y1'] < roi['y2'] <= self.y2:
+            return roi['x1'], roi['y1'], roi['x2'], roi['y2']
+        return self.x1, self.y1, self.x2, self.y2
+    
+    def refine_bar_roi(self, num_frames=None, interval=None):
+        """采集多帧血条框截图，找出血条填充所在的紧凑区域并保存
+        
+        参数:
+            num_frames (int): 采集的帧数，默认使用配置值
+            interval (float): 采集帧之间的间隔（秒），默认使用配置值
+            
+        返回:
+            bool: 是否成功细化
+        """
+        settings = dict(ROI_SETTINGS)
+        try:
+            from config_manager import get_config
+            settings.update(get_config().get_json('bar_roi', {}))
+        except Exception as e:
+            print(f"加载血条区域细化设置失败: {str(e)}")
+        if num_frames is None:
+            num_frames = settings['refine_frames']
+        if interval is None:
+            interval = settings['refine_interval']
+        
+        if self.x2 <= self.x1 or self.y2 <= self.y1:
+            print(f"{self.name}的血条框无效，无法细化")
+            return False
+        
+        try:
+            frames = self.capture_frames((self.x1, self.y1, self.x2, self.y2), num_frames, interval)
+            refined = refine_bar_roi(frames, self.hp_color_lower, self.hp_color_upper, settings)
+            if refined is None:
+                print(f"未能在{self.name}的血条框中找到血条颜色，保留原区域")
+                return False
+            
+            rx1, ry1, rx2, ry2 = refined
+            self.bar_roi = {'x1': self.x1 + rx1, 'y1': self.y1 + ry1, 'x2': self.x1 + rx2, 'y2': self.y1 + ry2}
+            
+            # 在紧凑区域中选取扫描线模式使用的行
+            roi = self.bar_roi
+            roi_frames = [frame[roi['y1'] - self.y1:roi['y2'] - self.y1, roi['x1'] - self.x1:roi['x2'] - self.x1]
+                          for frame in frames]
+            self.scanlines = pick_scanlines(roi_frames, self.hp_color_lower, self.hp_color_upper,
+                                            get_scanline_settings()['rows'], settings)
+            if self.scanlines:
+                print(f"{self.name}的扫描行: {self.scanlines}")
+            
+            # 血条上常驻的白色内容（血量数字、边框高光）作为遮挡检测的基线
+            rows = self.get_scanlines((roi['x1'], roi['y1'], roi['x2'], roi['y2']))
+            self.white_baseline = sum(roi_statistics(frame, rows)[2] for frame in roi_frames) / len(roi_frames)
+            print(f"{self.name}的白色像素基线: {self.white_baseline:.0%}")
+            
+            area = (self.x2 - self.x1) * (self.y2 - self.y1)
+            roi_area = (self.bar_roi['x2'] - self.bar_roi['x1']) * (self.bar_roi['y2'] - self.bar_roi['y1'])
+            print(f"{self.name}的血条区域已细化为 ({self.bar_roi['x1']}, {self.bar_roi['y1']}) - "
+                  f"({self.bar_roi['x2']}, {self.bar_roi['y2']})，像素数 {area} -> {roi_area}")
+            self.save_config()
+            return True
+        except Exception as e:
+            print(f"细化{self.name}的血条区域时出错: {str(e)}")
+            return False
+    
+    def capture_frames(self, region, num_frames, interval):
+        """连续截取多帧指定区域
+        
+        参数:
+            region (tuple): (x1, y1, x2, y2)
+            num_frames (int): 帧数
+            interval (float): 帧之间的间隔（秒）
+            
+        返回:
+            list: BGR截图列表
+        """
+        frames = []
+        for i in range(max(1, num_frames)):
+            if i > 0:
+                time.sleep(interval)
+            frames.append(capture_frame(*region))
+        return frames
+    
+    def calibrate_color(self, seed_bgr=None):
+        """采集血条区域的多帧截图，拟合血条颜色模型并保存
+        
+        与只取一个像素再加固定偏移相比，颜色范围由整个区域的像素统计得出，并附带预计误检率。
+        
+        参数:
+            seed_bgr (tuple): 用户选取的血条像素BGR值，用于区分血条填充和背景，可以为None
+            
+        返回:
+            bool: 是否成功拟合，失败时保持原颜色设置
+        """
+        model = self.fit_color(seed_bgr)
+        if model is None:
+            return False
+        self.apply_color_model(model)
+        return True
+    
+    def fit_color(self, seed_bgr=None):
+        """采集血条区域的多帧截图并拟合颜色模型，不修改成员的设置
+        
+        采集需要数帧间隔，界面中应在后台线程调用，再在界面线程中用 apply_color_model 应用结果。
+        
+        参数:
+            seed_bgr (tuple): 用户选取的血条像素BGR值，用于区分血条填充和背景，可以为None
+            
+        返回:
+            dict: fit_color_model 的结果，拟合失败时返回None
+        """
+        settings = load_color_model_settings()
+        try:
+            frames = self.capture_frames(self.get_measure_region(), settings['frames'], settings['interval'])
+            return fit_color_model(frames, seed_bgr, settings)
+        except Exception as e:
+            print(f"拟合{self.name}的血条颜色模型时出错: {str(e)}")
+            return None
+    
+    def apply_color_model(self, model):
+        """应用拟合得到的颜色模型并保存配置
+        
+        参数:
+            model (dict): fit_color 的结果
+        """
+        self.hp_color_lower = model['lower']
+        self.hp_color_upper = model['upper']
+        self.color_model = model_summary(model)
+        print(f"{self.name}的血条颜色范围已设置为: {self.hp_color_lower} - {self.hp_color_upper}")
+        self.save_config()
+    
+    def get_adaptive_color_model(self, lower=None, upper=None):
+        """获取自适应颜色模型
+        
+        颜色范围被重新设置（重新取色或拟合）后，以新的范围为基准重建模型。
+        
+        参数:
+            lower, upper (np.ndarray): 作为基准的颜色范围，默认使用当前设置
+            
+        返回:
+            AdaptiveColorModel: 未启用自适应时返回None
+        """
+        if lower is None or upper is None:
+            lower, upper = self.hp_color_lower, self.hp_color_upper
+        if self.adaptive_enabled is None:
+            self.color_model_settings = load_color_model_settings()
+            self.adaptive_enabled = bool(self.color_model_settings['adaptive'])
+        if not self.adaptive_enabled:
+            return None
+        adaptive = self.adaptive_color
+        if adaptive is None or not adaptive.matches(lower, upper):
+            adaptive = self.adaptive_color = AdaptiveColorModel(lower, upper, self.color_model_settings)
+        return adaptive
+    
+    def measure_colors(self, config):
+        """本次测量使用的颜色范围，启用自适应颜色时使用调整后的范围
+        
+        返回:
+            tuple: (BGR下限, BGR上限)
+        """
+        adaptive = self.get_adaptive_color_model(config.lower, config.upper)
+        if adaptive is not None:
+            return adaptive.lower, adaptive.upper
+        return config.lower, config.upper
+    
+    def is_low_health_confirmed(self, threshold, min_confidence):
+        """低于阈值的血量是否可以据此行动
+        
+        置信度足够时立即行动；置信度不足的读数要等下一个tick，上一次测量后的血量也低于阈值才确认。
+        
+        参数:
+            threshold (float): 血量阈值（百分比）
+            min_confidence (float): 立即行动所需的最低置信度
+            
+        返回:
+            bool: 是否确认
+        """
+        return self.hp_confidence >= min_confidence or self.previous_health_percentage < threshold
+    
+    def update_white_baseline(self, reading):
+        """用采用的读数更新测量行中平常的白色像素比例
+        
+        参数:
+            reading (HpReading): 本次采用的测量记录
+        """
+        if reading is None or not reading.width:
+            return
+        if self.white_baseline is None:
+            self.white_baseline = reading.white_ratio
+        else:
+            rate = get_occlusion_settings()['white_baseline_rate']
+            self.white_baseline += rate * (reading.white_ratio - self.white_baseline)
+    
+    def update_health(self, config=None, frame=None, reading=None, cursor=None):
         """更新血量信息
         
-        检测当前血条状态，更新血量百分比和存活状态。
-        如果检测不到血条，则认为成员已死亡。
+        检测当前血条状态，更新血量百分比和队员状态。
+        检测不到血条填充时按测量区域的亮度和饱和度区分阵亡、超出范围和无法识别；
+        后两种情况没有有效读数，保持上一次的血量不变。
+        血条被鼠标、自动选择的点击高亮或提示框遮挡时丢弃本次读数，同样保持上一次的血量。
         
+        参数:
+            config (MemberConfig): 快照中冻结的测量配置，默认使用当前设置
+            frame (np.ndarray): 已截取的测量区域截图，默认由本方法截图
+            reading (HpReading): 已用 frame 得到的测量记录，默认由本方法测量
+            cursor (tuple): 截图时的鼠标位置，默认由本方法获取
+            
         返回:
             float: 当前血量百分比
         """
         try:
+            if config is None:
+                config = self.freeze_config()
+            
             # 添加调试输出
             print(f"正在更新 {self.name} 的血量信息")
-            print(f"血条位置: ({self.x1}, {self.y1}) - ({self.x2}, {self.y2})")
-            print(f"血条颜色范围: {self.hp_color_lower} - {self.hp_color_upper}")
+            print(f"血条位置: ({config.rect[0]}, {config.rect[1]}) - ({config.rect[2]}, {config.rect[3]})")
+            print(f"血条颜色范围: {config.lower} - {config.upper}")
             
-            # 使用导入的get_hp_percentage函数获取血量百分比
-            hp = get_hp_percentage(self.x1, self.y1, self.x2, self.y2, 
-                                  self.hp_color_lower, self.hp_color_upper)
+            # 使用血条测量内核获取血量百分比，优先只测量紧凑区域
+            x1, y1, x2, y2 = config.region
+            if reading is None:
+                timestamp = time.time()
+                cursor = get_cursor_position()
+                if frame is None:
+                    if not valid_region(x1, y1, x2, y2):
+                        print(f"错误：{self.name}的血条区域 ({x1},{y1}) - ({x2},{y2}) 无效")
+                    else:
+                        frame = capture_frame(x1, y1, x2, y2)
+                lower, upper = self.measure_colors(config)
+                reading = measure_reading(frame, lower, upper, config.rows, timestamp)
+            self.last_reading = reading
+            if cursor is None:
+                cursor = get_cursor_position()
+            occlusion_confidence = 1.0
+            reason = check_occlusion(config.rect, reading, cursor, self.white_baseline)
+            # 遮挡状态只在开始、改为采用读数和结束时记录日志，鼠标停在血条上时不会每个tick都输出
+            if reason is None:
+                if self.occluded_ticks:
+                    print(f"{self.name}: 遮挡结束（持续 {self.occluded_ticks} 次测量），恢复采用读数")
+                self.occluded_ticks = 0
+            else:
+                self.occluded_ticks += 1
+                occlusion_settings = get_occlusion_settings()
+                if self.occluded_ticks <= occlusion_settings['max_rejected_ticks']:
+                    # 丢弃本次读数（也不用它更新自适应颜色范围），沿用上一次的滤波结果
+                    self.previous_health_percentage = self.health_percentage
+                    if self.occluded_ticks == 1:
+                        print(f"{self.name}: {reason}，丢弃读数 {reading.hp:.1f}%，保持血量 {self.health_percentage:.1f}%")
+                    return self.health_percentage
+                # 长时间遮挡（例如鼠标一直停在血条上）：采用读数但降低置信度
+                occlusion_confidence = occlusion_settings['occluded_confidence']
+                if self.occluded_ticks == occlusion_settings['max_rejected_ticks'] + 1:
+                    print(f"{self.name}: 持续遮挡，改为以置信度系数 {occlusion_confidence:.2f} 采用读数")
+            # 采用的读数更新白色像素基线：持续存在的白色内容最终不再被当作遮挡
+            self.update_white_baseline(reading)
+            hp = reading.hp
+            adaptive = self.get_adaptive_color_model(config.lower, config.upper)
+            if adaptive is not None and frame is not None:
+                # 自适应模式：用当前调整后的范围测量，再用这一帧的填充像素更新范围
+                message = adaptive.update(frame, hp)
+                if message:
+                    print(f"{self.name}: {message}")
+                    self.color_drift_message = message
+            
+            # 不依赖颜色范围的边缘估计：检验颜色测量结果，或在 edge 模式下直接作为测量值
+            edge_settings = get_edge_settings()
+            self.edge_health_percentage = None
+            if edge_settings['mode'] != 'off' and frame is not None:
+                edge = estimate_edge(frame, config.rows, edge_settings['min_contrast'])
+                if edge is not None:
+                    self.edge_health_percentage = edge[0]
+                    if edge_settings['mode'] == 'edge':
+                        hp = edge[0]
+            
+            status = classify_reading(reading, hp, self.edge_health_percentage)
+            if status in UNMEASURED:
+                # 超出范围或无法识别：读数不代表血量，沿用上一次的滤波结果，不计为阵亡
+                self.raw_health_percentage = hp
+                self.previous_health_percentage = self.health_percentage
+                if self.status != status:
+                    print(f"[重要] {self.name} 状态变为: {STATUS_LABELS[status]}，保持血量 {self.health_percentage:.1f}%")
+                self.status = status
+                self.is_alive = True
+                return self.health_percentage
             
             # 检查返回结果
             if isinstance(hp, (int, float)):
                 # 只有在结果是合理的数字时才更新
                 old_hp = self.health_percentage
+                self.previous_health_percentage = old_hp
+                self.raw_health_percentage = hp
+                # 滤波：单帧误识别不会直接改变血量；按截图时间计算速度
+                hp, self.hp_velocity, filter_confidence = self.hp_filter.update(hp, reading.timestamp)
+                edge_confidence = 1.0
+                edge_hp = self.edge_health_percentage
+                disagrees = (edge_hp is not None
+                             and abs(edge_hp - self.raw_health_percentage) > edge_settings['agree_tolerance'])
+                if disagrees:
+                    # 两种方法结果不一致：颜色范围可能不准或截图受到干扰，降低这一次读数的置信度
+                    # （不改变滤波器的状态：边缘估计在某些血条上可能一直有偏差，置信度不能因此逐次累积降到0）
+                    edge_confidence = edge_settings['disagreement_penalty']
+                if disagrees != self.edge_disagrees:
+                    # 只在开始或不再不一致时记录，持续偏差的血条不会每个tick都输出
+                    if disagrees:
+                        print(f"{self.name}: 颜色测量 {self.raw_health_percentage:.1f}% 与边缘估计 {edge_hp:.1f}% 不一致，"
+                              f"置信度乘以 {edge_confidence:.2f}")
+                    else:
+                        print(f"{self.name}: 颜色测量与边缘估计恢复一致")
+                    self.edge_disagrees = disagrees
+                # 测量本身的置信度（填充是否致密、扫描行是否一致、与边缘估计是否一致、是否被遮挡）只影响这一次读数
+                self.hp_confidence = filter_confidence * reading.confidence * edge_confidence * occlusion_confidence
+                self.last_update_time = self.hp_filter.last_time
                 self.health_percentage = hp
-                # 如果血量为0，则认为成员已死亡
-                old_alive = self.is_alive
-                self.is_alive = hp > 0
+                # 血条发灰且滤波后的血量降到0才认为成员已死亡（单帧误识别不会直接判为阵亡）
+                old_status = self.status
+                self.status = DEAD if status == DEAD and hp <= 0 else ALIVE
+                self.is_alive = self.status != DEAD
                 
                 # 添加血量变化日志
-                print(f"{self.name} 血量变化: {old_hp:.1f}% -> {hp:.1f}% | 状态: {'存活' if self.is_alive else '死亡'}")
+                print(f"{self.name} 血量变化: {old_hp:.1f}% -> {hp:.1f}% (原始: {self.raw_health_percentage:.1f}%, "
+                      f"速度: {self.hp_velocity:+.1f}%/s, 置信度: {self.hp_confidence:.2f}) | 状态: {STATUS_LABELS[self.status]}")
                 
                 # 如果有明显变化，记录日志
-                if abs(old_hp - hp) > 1 or old_alive != self.is_alive:
+                if abs(old_hp - hp) > 1 or old_status != self.status:
                     print(f"[重要] {self.name} 血量或状态发生明显变化!")
                 
                 return hp
@@ -270,64 +709,263 @@ class TeamMember:
     
     def __str__(self):
         """返回成员信息的字符串表示"""
-        status = "存活" if self.is_alive else "死亡"
+        status = STATUS_LABELS.get(self.status, "未知")
         # 使用简单字符串格式，方便在表格中显示
         return f"{self.name} ({self.profession}): 血量 {self.health_percentage:.1f}%, 状态: {status}"
 
 
+def _publishing(name):
+    """包装 list 的修改方法：修改后由队伍发布新的快照"""
+    method = getattr(list, name)
+    
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.team.publish()
+        return result
+    
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+class MemberList(list):
+    """队伍的成员列表
+    
+    界面代码会直接对成员列表执行 append、pop、remove 或整体替换，
+    这里在每次修改后发布新的队伍快照，监控线程不需要停止也不需要加锁。
+    """
+    
+    def __init__(self, team, members=()):
+        super().__init__(members)
+        self.team = team
+    
+    append = _publishing('append')
+    extend = _publishing('extend')
+    insert = _publishing('insert')
+    pop = _publishing('pop')
+    remove = _publishing('remove')
+    clear = _publishing('clear')
+    sort = _publishing('sort')
+    reverse = _publishing('reverse')
+    __setitem__ = _publishing('__setitem__')
+    __delitem__ = _publishing('__delitem__')
+    __iadd__ = _publishing('__iadd__')
+
+
+class TeamSnapshot:
+    """队伍的不可变快照
+    
+    包含某一版本的成员元组、冻结的测量配置以及各成员在 TeamState 中的行号。
+    监控线程每个tick只读取一次 Team.snapshot，整个tick内使用同一份快照；
+    界面线程修改队伍时发布新的快照并整体替换引用，不会影响正在进行的tick。
+    
+    属性:
+        version (int): 快照版本号，每次发布加1
+        state (TeamState): 队伍共享的结构数组状态
+        members (tuple): 成员元组
+        configs (tuple): 与成员顺序一致的 MemberConfig
+        indices (np.ndarray): 与成员顺序一致的状态行号
+    """
+    
+    __slots__ = ('version', 'state', 'members', 'configs', 'indices')
+    
+    def __init__(self, version, state, members):
+        self.version = version
+        self.state = state
+        self.members = tuple(members)
+        self.configs = tuple(member.freeze_config() for member in self.members)
+        self.indices = np.fromiter((member.view.index for member in self.members), dtype=np.intp,
+                                   count=len(self.members))
+    
+    def config_of(self, member):
+        """获取成员在该快照中的测量配置，成员不在快照中时返回None"""
+        for snapshot_member, config in zip(self.members, self.configs):
+            if snapshot_member is member:
+                return config
+        return None
+    
+    def alive_mask(self):
+        """与成员顺序一致的存活标记数组"""
+        return self.state.alive[self.indices]
+    
+    def low_health_mask(self, threshold, min_confidence=0.0, lookahead=None):
+        """向量化计算低血量的存活成员
+        
+        参数:
+            threshold (float): 血量阈值（百分比）
+            min_confidence (float): 立即计入所需的最低置信度；置信度不足的成员在上一次测量后
+                的血量也低于阈值时才计入（低置信度的读数多等一个tick确认）
+            lookahead (float): 不为None时，预测该时长（秒）后血量低于阈值的成员也计入
+            
+        返回:
+            np.ndarray: 与成员顺序一致的布尔数组
+        """
+        idx = self.indices
+        state = self.state
+        hp = state.hp[idx]
+        confirmed = (state.confidence[idx] >= min_confidence) | (state.prev_hp[idx] < threshold)
+        # 只有读数有效的存活成员参与判断；超出范围、无法识别的成员血量是沿用的旧值
+        mask = (state.status[idx] == ALIVE) & (hp > 0) & confirmed
+        below = hp < threshold
+        if lookahead is not None:
+            below |= self.projected_health(lookahead) < threshold
+        return mask & below
+    
+    def projected_health(self, lookahead):
+        """按掉血速度预测 lookahead 秒后所有成员的血量（只考虑掉血）"""
+        idx = self.indices
+        projected = self.state.hp[idx] + np.minimum(self.state.damage_rate[idx], 0) * lookahead
+        return np.maximum(projected, 0)
+    
+    def count_low_health(self, threshold):
+        """统计低血量（不高于阈值）的存活成员数和存活成员总数
+        
+        低血量只统计读数有效的成员；存活人数包括超出范围和无法识别的成员（它们并未阵亡）。
+        
+        返回:
+            tuple: (低血量人数, 存活人数)
+        """
+        idx = self.indices
+        alive = self.state.alive[idx]
+        low = (self.state.status[idx] == ALIVE) & (self.state.hp[idx] <= threshold)
+        return int(low.sum()), int(alive.sum())
+
+
 class Team:
     """小队类
     
     管理多个小队成员，提供批量操作和状态监控功能。
+    成员列表或成员配置每次变化都会发布新的 TeamSnapshot（写时复制），
+    监控线程读取快照而不直接遍历成员列表，因此修改队伍时无需停止监控。
     
     属性:
-        members (list): 小队成员列表
+        members (MemberList): 小队成员列表，修改后自动发布新快照
+        state (TeamState): 所有成员共享的结构数组状态，用于向量化的阈值判断和计数
+        snapshot (TeamSnapshot): 最新发布的快照
     """
     
-    def __init__(self):
+    def __init__(self, set_name=DEFAULT_SET):
         """初始化小队
         
-        在创建小队实例时，自动扫描当前目录下的所有配置文件，
-        根据文件名解析队员信息并添加到小队列表中。
+        在创建小队实例时，从队员配置存储中读取该校准集的所有队员并添加到小队列表中。
+        只读取一个存储文件，不扫描程序目录。
+        
+        参数:
+            set_name (str): 队员配置所在的校准集，默认为 DEFAULT_SET
         """
+        store = get_member_store()
+        configs = store.items(set_name)
+        # 按队员数预留行（切换布局时新旧队员的行会短暂共存），监控运行时通常不需要扩容
+        self.state = TeamState(capacity=max(8, 2 * len(configs)))
+        self.snapshot = TeamSnapshot(0, self.state, ())
+        self.reading = None      # 监控线程正在使用的快照版本，没有在读时为None
+        self.retired_rows = []   # [(退役时的快照版本, 行号), ...]，旧快照不再使用后才释放
+        self._publish_lock = threading.RLock()  # 发布快照的写线程之间互斥，acquire_snapshot 也短暂持有
+        self._idle = threading.Condition(self._publish_lock)  # 监控线程结束一个tick时通知（扩容前等待）
+        self.member_cache = {}   # 名称 -> 队员对象，切换校准集时复用颜色模型、滤波器等状态
+        self.set_name = set_name
         self.members = []
         
-        # 获取当前目录路径
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        # 扫描当前目录下的所有文件
-        for filename in os.listdir(current_dir):
-            # 检查是否是队员配置文件，排除系统配置文件
-            if filename.endswith('_config.json') and filename != 'hotkeys_config.json':
+        # 加载过程中如果有配置需要修复，合并为一次写入；
+        # 队员先收集到列表中最后一次发布（逐个 add_member 每次都会为所有队员重新发布快照）
+        members = []
+        with store.transaction():
+            for member_name, config in configs:
                 try:
-                    # 排除一些常见的系统配置文件名
-                    if filename.startswith(('hotkeys', 'settings', 'config', 'system')):
-                        print(f'跳过系统配置文件: {filename}')
-                        continue
-                        
-                    # 从文件名中提取队员名称
-                    member_name = filename[:-12]  # 移除'_config.json'
-                    
-                    # 读取配置文件获取职业信息
-                    config_path = os.path.join(current_dir, filename)
-                    with open(config_path, 'r', encoding='utf-8') as f:
-                        config = json.load(f)
-                        
-                        # 检查配置文件是否包含必要字段（确认是队友配置）
-                        if 'profession' not in config or 'health_bar' not in config:
-                            print(f'文件 {filename} 不是有效的队友配置文件，跳过加载')
-                            continue
-                        
-                        # 获取职业信息
-                        profession = config.get('profession', '未知')
-                        
-                        # 添加队员到小队列表
-                        self.add_member(member_name, profession)
-                        print(f'已从配置文件加载队员: {member_name} ({profession})')
-                        
+                    profession = config.get('profession', '未知')
+                    member = TeamMember(member_name, profession, self.set_name)
+                    self.member_cache[member_name] = member
+                    members.append(member)
+                    print(f'已从配置存储加载队员: {member_name} ({profession})')
                 except Exception as e:
-                    print(f'加载配置文件 {filename} 时出错: {str(e)}')
-                    continue
+                    print(f'加载队员 {member_name} 时出错: {str(e)}')
+        self.members = members
+    
+    @property
+    def members(self):
+        return self._members
+    
+    @members.setter
+    def members(self, members):
+        self._members = MemberList(self, members)
+        self.publish()
+    
+    def publish(self):
+        """根据当前成员列表发布新的快照
+        
+        新加入的成员迁移到队伍状态中；离开的成员迁移回各自的单行存储，
+        其原来的行先退役，等监控线程不再使用旧快照后再释放复用。
+        新快照构建完成后一次赋值替换 self.snapshot，直接读取 self.snapshot 无需加锁；
+        需要保证行不被释放的读取方（监控线程）通过 acquire_snapshot 获取快照。
+        
+        返回:
+            TeamSnapshot: 新发布的快照
+        """
+        with self._publish_lock:
+            previous = self.snapshot
+            version = previous.version + 1
+            members = tuple(self._members)
+            incoming = sum(1 for member in members if member.view.state is not self.state)
+            if incoming > len(self.state.free):
+                # 需要扩容：扩容替换结构数组，监控线程在tick中写入旧数组的结果会丢失，先等它结束当前tick
+                self._wait_until_idle()
+            for member in members:
+                if member.view.state is not self.state:
+                    member.view.move_to(self.state)
+                member.on_changed = self._member_changed
+            
+            current = {id(member) for member in members}
+            for member in previous.members:
+                if id(member) not in current and member.view.state is self.state:
+                    index = member.view.index
+                    member.view.move_to(TeamState(capacity=1), release=False)
+                    member.on_changed = None
+                    self.retired_rows.append((version, index))
+            self._reclaim_rows()
+            
+            self.snapshot = TeamSnapshot(version, self.state, members)
+            return self.snapshot
+    
+    def _wait_until_idle(self):
+        """等待监控线程结束当前tick，调用方需持有发布锁
+        
+        持有发布锁期间监控线程无法获取新的快照，等待结束后到释放锁之前不会有tick在写队伍状态。
+        """
+        if not self._idle.wait_for(lambda: self.reading is None, timeout=2.0):
+            print("等待监控线程结束当前测量超时，仍然扩容队伍状态")
+    
+    def _member_changed(self, member):
+        """成员配置保存后的回调"""
+        if member in self._members:
+            self.publish()
+    
+    def _reclaim_rows(self):
+        """释放已没有快照在使用的退役行"""
+        reading = self.reading
+        pending = []
+        for version, index in self.retired_rows:
+            if reading is None or reading >= version:
+                self.state.release(index)
+            else:
+                pending.append((version, index))
+        self.retired_rows = pending
+    
+    def acquire_snapshot(self):
+        """监控线程在每个tick开始时获取快照，tick结束后调用 release_snapshot
+        
+        读取快照和标记正在使用的版本在发布锁内一起完成：否则两步之间发布的新快照
+        会认为没有快照在使用，释放监控线程即将读取的行。发布只持有锁很短的时间。
+        """
+        with self._publish_lock:
+            snapshot = self.snapshot
+            self.reading = snapshot.version
+        return snapshot
+    
+    def release_snapshot(self):
+        """标记监控线程已不再使用之前获取的快照"""
+        with self._publish_lock:
+            self.reading = None
+            self._idle.notify_all()
     
     def add_member(self, name, profession):
         """添加小队成员
@@ -339,30 +977,143 @@ class Team:
         返回:
             TeamMember: 新创建的成员对象
         """
-        member = TeamMember(name, profession)
+        member = TeamMember(name, profession, self.set_name)
+        self.member_cache[name] = member
         self.members.append(member)
         print(f"已添加队员: {name} ({profession})")
         return member
     
-    def update_all_health(self):
+    def remove_member(self, member):
+        """移除队员并从队员配置存储中删除其配置
+        
+        参数:
+            member (TeamMember): 要移除的队员
+            
+        返回:
+            bool: 队员是否在队伍中
+        """
+        if member not in self.members:
+            return False
+        self.members.remove(member)
+        self.member_cache.pop(member.name, None)
+        member.store.delete(member.name, member.set_name)
+        print(f"已移除队员: {member.name}")
+        return True
+    
+    def clear_members(self):
+        """移除所有队员并删除其配置，只写入一次存储
+        
+        返回:
+            int: 删除配置的队员数
+        """
+        store = get_member_store()
+        deleted = 0
+        with store.transaction():
+            for member in self.members:
+                if store.delete(member.name, member.set_name):
+                    deleted += 1
+        self.member_cache.clear()
+        self.members = []
+        return deleted
+    
+    def apply_layout(self, layout):
+        """按校准集的血条布局切换队伍，一次发布新的快照
+        
+        同名的队员（包括之前切换掉的队员）直接复用，保留已拟合的颜色范围、自适应颜色模型和血量滤波状态，
+        只更新血条框和紧凑区域；新出现的队员从其配置文件加载颜色设置。
+        监控不需要停止，下一个tick即按新的布局测量。新坐标不写回队员配置文件，校准集本身保存了布局。
+        
+        参数:
+            layout (list): HealthBarCalibration.get_set_layout 返回的布局列表
+            
+        返回:
+            tuple: (复用的队员数, 新建的队员数)
+        """
+        members = []
+        reused = created = 0
+        with self._publish_lock:
+            for entry in layout:
+                member = self.member_cache.get(entry['name'])
+                if member is None:
+                    member = TeamMember(entry['name'], entry.get('profession', '未知'), self.set_name)
+                    self.member_cache[member.name] = member
+                    created += 1
+                else:
+                    reused += 1
+                if member in members:
+                    continue
+                member.x1 = entry['x1']
+                member.y1 = entry['y1']
+                member.x2 = entry['x2']
+                member.y2 = entry['y2']
+                if entry.get('bar'):
+                    member.bar_roi = dict(entry['bar'])
+                members.append(member)
+            # 整体替换成员列表，只发布一次快照
+            self.members = members
+        print(f"已切换队伍布局: {len(members)} 名队员（复用 {reused}，新建 {created}）")
+        return reused, created
+    
+    def update_all_health(self, snapshot=None):
         """更新所有成员的血量信息
         
+        所有成员的测量区域用一次截图取得，再交给测量内核批量计算血量。
+        
+        参数:
+            snapshot (TeamSnapshot): 本次使用的快照，默认使用最新快照
+            
         返回:
             list: 所有成员的血量信息列表
         """
+        if snapshot is None:
+            snapshot = self.snapshot
+        members, configs = snapshot.members, snapshot.configs
+        try:
+            timestamp = time.time()
+            cursor = get_cursor_position()
+            frames = capture_regions([config.region for config in configs])
+            colors = [member.measure_colors(config) for member, config in zip(members, configs)]
+            readings = measure_batch(frames, [lower for lower, _ in colors], [upper for _, upper in colors],
+                                     [config.rows for config in configs], timestamp)
+        except Exception as e:
+            # 批量截图失败时退回到每个成员单独截图测量
+            print(f"批量测量血量时出错: {str(e)}")
+            frames = readings = [None] * len(members)
+            cursor = None
         results = []
-        for member in self.members:
-            hp = member.update_health()
+        for member, config, frame, reading in zip(members, configs, frames, readings):
+            hp = member.update_health(config, frame, reading, cursor)
             results.append((member.name, hp, member.is_alive))
         return results
     
+    def alive_mask(self):
+        """与成员列表顺序一致的存活标记数组"""
+        return self.snapshot.alive_mask()
+    
+    def low_health_mask(self, threshold, min_confidence=0.0, lookahead=None):
+        """向量化计算低血量的存活成员，参见 TeamSnapshot.low_health_mask"""
+        return self.snapshot.low_health_mask(threshold, min_confidence, lookahead)
+    
+    def projected_health(self, lookahead):
+        """按掉血速度预测 lookahead 秒后所有成员的血量（只考虑掉血）"""
+        return self.snapshot.projected_health(lookahead)
+    
+    def count_low_health(self, threshold):
+        """统计低血量（不高于阈值）的存活成员数和存活成员总数
+        
+        返回:
+            tuple: (低血量人数, 存活人数)
+        """
+        return self.snapshot.count_low_health(threshold)
+    
     def get_alive_members(self):
         """获取所有存活的成员
         
         返回:
             list: 存活成员列表
         """
-        return [member for member in self.members if member.is_alive]
+        snapshot = self.snapshot
+        return [member for member, is_alive in zip(snapshot.members, snapshot.alive_mask()) if is_alive]
     
     def get_dead_members(self):
         """获取所有死亡的成员
@@ -370,7 +1121,8 @@ class Team:
         返回:
             list: 死亡成员列表
         """
-        return [member for member in self.members if not member.is_alive]
+        snapshot = self.snapshot
+        return [member for member, is_alive in zip(snapshot.members, snapshot.alive_mask()) if not is_alive]
     
     def show_config(self):
         """显示所有队友的配置信息
@@ -422,7 +1174,7 @@ class Team:
         
         # 添加队员信息到表格
         for member in self.members:
-            status = "存活" if member.is_alive else "死亡"
+            status = STATUS_LABELS.get(member.status, "未知")
             table.add_row([
                 member.name,
                 member.profession,
@@ -0,0 +1,156 @@
+import numpy as np
+
+# 每个队员一行的字段: 名称 -> (数据类型, 每行的形状)
+FIELDS = {
+    'hp': (np.float32, ()),            # 滤波后的血量百分比
+    'raw_hp': (np.float32, ()),        # 原始测量的血量百分比
+    'prev_hp': (np.float32, ()),       # 上一次测量后滤波的血量百分比
+    'velocity': (np.float32, ()),      # 滤波器估计的血量变化速度（百分比/秒）
+    'confidence': (np.float32, ()),    # 血量估计的置信度
+    'damage_rate': (np.float32, ()),   # 分诊引擎估计的掉血速度（百分比/秒）
+    'alive': (np.bool_, ()),           # 存活状态（未阵亡）
+    'status': (np.int8, ()),           # 队员状态，见 member_status（0为存活）
+    'timestamp': (np.float64, ()),     # 最近一次测量的时间
+    'rect': (np.int32, (4,)),          # 血条框 x1, y1, x2, y2
+    'bar_roi': (np.int32, (4,)),       # 紧凑血条区域 x1, y1, x2, y2，未细化时 x1 为 -1
+    'color_lower': (np.uint8, (3,)),   # 血条颜色BGR下限
+    'color_upper': (np.uint8, (3,)),   # 血条颜色BGR上限
+}
+
+
+class TeamState:
+    """队伍状态的结构数组（struct-of-arrays）存储
+
+    每个字段是一块连续的NumPy数组，每个队员占一行。阈值判断、计数和优先级打分
+    可以直接对整个队伍做向量化运算，而不用逐个遍历队员对象。
+    容量不足时按倍数扩容；被释放的行会被复用。
+
+    属性:
+        capacity (int): 当前容量（行数）
+        active (np.ndarray): 行是否正在使用
+    """
+
+    def __init__(self, capacity=8):
+        self.capacity = max(1, capacity)
+        self.active = np.zeros(self.capacity, dtype=np.bool_)
+        self.free = list(range(self.capacity - 1, -1, -1))
+        for name, (dtype, shape) in FIELDS.items():
+            setattr(self, name, np.zeros((self.capacity,) + shape, dtype=dtype))
+        self.bar_roi[:, 0] = -1
+
+    def _grow(self):
+        """容量翻倍"""
+        old = self.capacity
+        self.capacity = old * 2
+        for name, (dtype, shape) in FIELDS.items():
+            array = np.zeros((self.capacity,) + shape, dtype=dtype)
+            array[:old] = getattr(self, name)
+            setattr(self, name, array)
+        self.bar_roi[old:, 0] = -1
+        active = np.zeros(self.capacity, dtype=np.bool_)
+        active[:old] = self.active
+        self.active = active
+        self.free.extend(range(self.capacity - 1, old - 1, -1))
+
+    def allocate(self):
+        """分配一行并返回行号"""
+        if not self.free:
+            self._grow()
+        index = self.free.pop()
+        self.active[index] = True
+        return index
+
+    def release(self, index):
+        """释放一行"""
+        if self.active[index]:
+            self.active[index] = False
+            for name in FIELDS:
+                getattr(self, name)[index] = 0
+            self.bar_roi[index, 0] = -1
+            self.free.append(index)
+
+    def copy_row(self, source, source_index, index):
+        """从另一个状态存储复制一行"""
+        for name in FIELDS:
+            getattr(self, name)[index] = getattr(source, name)[source_index]
+
+
+def _column(name):
+    """生成读写 TeamState 某一标量字段的属性"""
+    def getter(self):
+        state, index = self.location
+        return getattr(state, name)[index].item()
+
+    def setter(self, value):
+        state, index = self.location
+        getattr(state, name)[index] = value
+
+    return property(getter, setter)
+
+
+class MemberView:
+    """TeamState 中单个队员的一行视图
+
+    只保存状态存储和行号，读写属性直接落到结构数组中，不持有任何数据副本。
+    状态存储和行号放在同一个元组里，迁移时一次赋值完成切换，
+    其他线程读写时不会拿到新存储和旧行号的组合。
+    """
+
+    __slots__ = ('location',)
+
+    def __init__(self, state, index):
+        self.location = (state, index)
+
+    @property
+    def state(self):
+        return self.location[0]
+
+    @property
+    def index(self):
+        return self.location[1]
+
+    hp = _column('hp')
+    raw_hp = _column('raw_hp')
+    prev_hp = _column('prev_hp')
+    velocity = _column('velocity')
+    confidence = _column('confidence')
+    damage_rate = _column('damage_rate')
+    alive = _column('alive')
+    status = _column('status')
+    timestamp = _column('timestamp')
+
+    @property
+    def rect(self):
+        state, index = self.location
+        return state.rect[index]
+
+    @property
+    def bar_roi(self):
+        state, index = self.location
+        return state.bar_roi[index]
+
+    @property
+    def color_lower(self):
+        state, index = self.location
+        return state.color_lower[index]
+
+    @property
+    def color_upper(self):
+        state, index = self.location
+        return state.color_upper[index]
+
+    def move_to(self, state, release=True):
+        """将该行迁移到另一个状态存储（例如队员加入或离开队伍时）
+
+        参数:
+            state (TeamState): 目标状态存储
+            release (bool): 是否立即释放原来的行；其他线程可能仍在读取原行时应为False，由调用方稍后释放
+        """
+        old_state, old_index = self.location
+        if state is old_state:
+            return
+        index = state.allocate()
+        state.copy_row(old_state, old_index, index)
+        self.location = (state, index)
+        if release:
+            old_state.release(old_index)
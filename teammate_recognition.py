@@ -2,45 +2,168 @@ import sys
 import os
 import cv2
 import numpy as np
-import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Tuple, Optional
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QFileDialog, QInputDialog, QHBoxLayout, QScrollArea
 from PyQt5.QtCore import Qt, QEventLoop, QRect
 from PyQt5.QtGui import QImage, QPixmap
 from 选择框 import TransparentSelectionBox
-from paddleocr import PaddleOCR
+from lazy_import import lazy_import
 import pyautogui
+from name_index import NameIndex
+from config_defaults import RECOGNITION_SETTINGS
+
+# PaddleOCR（及其依赖的paddle）导入很慢，只在第一次创建OCR实例时才导入；
+# 只做图标匹配和预处理（如 benchmark_preprocess.py）时不会加载
+paddleocr = lazy_import('paddleocr')
+
+# 可选的图像预处理档位，从快到慢
+PREPROCESS_PROFILES = ('fast', 'balanced', 'quality')
+
+# max_workers 为0（自动）时的线程数上限：每个工作线程持有一个OCR实例，线程数不随核心数无限增长
+MAX_AUTO_WORKERS = 4
 
 class TeammateRecognition:
     def __init__(self):
         self.profession_icons_dir = 'profession_icons'
         self.ensure_profession_icons_dir()
-        self.init_ocr()
+        # 调用线程共享的OCR实例，第一次在线程池外识别时才创建
+        self._ocr = None
         # 待识别队友列表，每个元素包含区域坐标和截图
         self.pending_teammates = []
         
+        # 已知队友名称索引，用于将OCR结果吸附到已有队友名称
+        self.name_index = NameIndex.from_known_sources()
+        
         # 图像处理参数
         self.contrast = 1.2    # 默认对比度增强因子
         self.brightness = 10   # 默认亮度增强因子
         self.num_samples = 3   # 默认采样次数
+        self.preprocess_profile = RECOGNITION_SETTINGS['preprocess_profile']  # 预处理档位
+        
+        # 顺序投票设置：达到置信度或领先票数后提前停止采样
+        self.name_confidence_threshold = RECOGNITION_SETTINGS['name_confidence_threshold']
+        self.profession_confidence_threshold = RECOGNITION_SETTINGS['profession_confidence_threshold']
+        self.unknown_name_confidence_factor = RECOGNITION_SETTINGS['unknown_name_confidence_factor']
+        self.unknown_name_min_votes = RECOGNITION_SETTINGS['unknown_name_min_votes']
+        self.vote_margin = RECOGNITION_SETTINGS['vote_margin']
+        
+        # 并行识别设置
+        self.max_workers = RECOGNITION_SETTINGS['max_workers']
+        # PaddleOCR的预测器不是线程安全的：每个工作线程使用自己的OCR实例（随线程池常驻，只创建一次），
+        # OCR调用可以在多个核心上并行。只有工作线程创建实例失败（例如内存不足）或在线程池外识别时
+        # 才使用共享的 self.ocr，此时用锁串行化
+        self._ocr_lock = threading.Lock()
+        self._thread_ocr = threading.local()
+        self._executor = None
+        self._executor_workers = 0
+        
+        # 从配置中加载识别设置
+        self.load_recognition_settings()
+
+    def load_recognition_settings(self):
+        """从配置中读取并行识别和顺序投票的设置"""
+        max_workers = RECOGNITION_SETTINGS['max_workers']
+        try:
+            from config_manager import get_config
+            recognition_settings = get_config().get_json('recognition', {})
+            max_workers = int(recognition_settings.get('max_workers', max_workers))
+            self.name_confidence_threshold = float(recognition_settings.get(
+                'name_confidence_threshold', self.name_confidence_threshold))
+            self.profession_confidence_threshold = float(recognition_settings.get(
+                'profession_confidence_threshold', self.profession_confidence_threshold))
+            self.unknown_name_confidence_factor = float(recognition_settings.get(
+                'unknown_name_confidence_factor', self.unknown_name_confidence_factor))
+            self.unknown_name_min_votes = int(recognition_settings.get(
+                'unknown_name_min_votes', self.unknown_name_min_votes))
+            self.vote_margin = int(recognition_settings.get('vote_margin', self.vote_margin))
+            self.preprocess_profile = recognition_settings.get('preprocess_profile', self.preprocess_profile)
+        except Exception as e:
+            print(f"加载识别设置失败: {str(e)}")
+        if max_workers <= 0:
+            max_workers = min(MAX_AUTO_WORKERS, os.cpu_count() or 1)
+        self.max_workers = max_workers
+
+    def create_ocr(self, cpu_threads=None):
+        """创建一个PaddleOCR实例
+        
+        参数:
+            cpu_threads: 该实例推理使用的CPU线程数，默认使用PaddleOCR的默认值
+        """
+        # 优化OCR配置参数，专注于中文识别
+        options = dict(
+            use_angle_cls=True,      # 启用文字角度分类器
+            lang='ch',               # 使用中文模型
+            use_gpu=False,           # 关闭GPU
+            rec_char_dict_path=None, # 使用默认中文字典
+            det_db_thresh=0.3,       # 降低检测阈值，提高小字体检测能力
+            rec_batch_num=1,         # 每次识别一个文本块
+            show_log=False           # 关闭日志显示
+        )
+        if cpu_threads:
+            options['cpu_threads'] = cpu_threads
+        return paddleocr.PaddleOCR(**options)
 
     def init_ocr(self):
-        """初始化OCR引擎"""
+        """初始化OCR引擎（调用线程使用的实例）"""
         try:
-            # 优化OCR配置参数，专注于中文识别
-            self.ocr = PaddleOCR(
-                use_angle_cls=True,      # 启用文字角度分类器
-                lang='ch',               # 使用中文模型
-                use_gpu=False,           # 关闭GPU
-                rec_char_dict_path=None, # 使用默认中文字典
-                det_db_thresh=0.3,       # 降低检测阈值，提高小字体检测能力
-                rec_batch_num=1,         # 每次识别一个文本块
-                show_log=False           # 关闭日志显示
-            )
+            self._ocr = self.create_ocr()
         except Exception as e:
             print(f"OCR初始化失败: {str(e)}")
             raise
 
+    @property
+    def ocr(self):
+        """调用线程共享的OCR实例，第一次使用时创建
+
+        识别线程池的工作线程使用各自的实例，只通过线程池识别时不会创建这个实例。
+        """
+        if self._ocr is None:
+            self.init_ocr()
+        return self._ocr
+
+    def _init_worker_ocr(self, cpu_threads):
+        """线程池初始化函数：为工作线程创建自己的OCR实例"""
+        try:
+            self._thread_ocr.ocr = self.create_ocr(cpu_threads)
+        except Exception as e:
+            print(f"工作线程创建OCR实例失败，改为共享主OCR实例（串行识别）: {str(e)}")
+            self._thread_ocr.ocr = None
+
+    def run_ocr(self, rgb_image):
+        """用当前线程的OCR实例识别图像
+        
+        工作线程使用自己的实例，不需要加锁；其他线程（或工作线程没有实例时）使用共享的 self.ocr，加锁调用。
+        """
+        ocr = getattr(self._thread_ocr, 'ocr', None)
+        if ocr is not None:
+            return ocr.ocr(rgb_image, cls=True)
+        with self._ocr_lock:
+            return self.ocr.ocr(rgb_image, cls=True)
+
+    def _get_executor(self, workers):
+        """获取常驻的识别线程池，线程数变化时重建
+        
+        线程池在多次识别之间保留，工作线程的OCR实例只在线程第一次启动时创建。
+        每个实例的推理线程数按核心数平分，避免多个实例同时推理时过度占用CPU。
+        """
+        if self._executor is None or self._executor_workers != workers:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            cpu_threads = max(1, (os.cpu_count() or 1) // workers)
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='recognition',
+                                                initializer=self._init_worker_ocr, initargs=(cpu_threads,))
+            self._executor_workers = workers
+        return self._executor
+
+    def shutdown(self):
+        """关闭识别线程池，释放工作线程的OCR实例"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._executor_workers = 0
+
     def ensure_profession_icons_dir(self):
         """确保职业图标目录存在"""
         if not os.path.exists(self.profession_icons_dir):
@@ -101,17 +224,29 @@ class TeammateRecognition:
             
         return icons
 
-    def preprocess_image(self, image: np.ndarray, for_ocr: bool = False) -> np.ndarray:
+    def preprocess_image(self, image: np.ndarray, for_ocr: bool = False, profile: Optional[str] = None) -> np.ndarray:
         """图像预处理，提高图像质量
         Image preprocessing to improve image quality
         
+        预处理档位 / Preprocessing profiles:
+            fast: 只做对比度拉伸 / contrast stretch only
+            balanced: 对比度增强加中值/双边滤波 / contrast enhancement plus median/bilateral filtering
+            quality: 非局部均值降噪（最慢） / non-local means denoising (slowest)
+        
         Args:
             image: 输入图像 (BGR格式) / Input image (BGR format)
             for_ocr: 是否为OCR进行特定预处理 / Whether to perform specific preprocessing for OCR
+            profile: 预处理档位，默认使用 self.preprocess_profile / Preprocessing profile
             
         Returns:
             处理后的图像 / Processed image
         """
+        if profile is None:
+            profile = self.preprocess_profile
+        if profile not in PREPROCESS_PROFILES:
+            print(f"未知的预处理档位 '{profile}'，使用 balanced / Unknown preprocessing profile '{profile}', using balanced")
+            profile = 'balanced'
+
         try:
             # 检查图像是否为空
             if image is None or image.size == 0:
@@ -136,15 +271,22 @@ class TeammateRecognition:
                 beta = self.brightness # 使用设置的亮度
                 adjusted = cv2.convertScaleAbs(rgb_img, alpha=alpha, beta=beta)
                 
-                # 3. 适度降噪
-                denoised = cv2.fastNlMeansDenoisingColored(adjusted, None, 10, 10, 7, 21)
+                # 3. 按档位降噪
+                if profile == 'fast':
+                    return adjusted
+                if profile == 'balanced':
+                    return cv2.medianBlur(adjusted, 3)
                 
                 # 不再进行二值化，让OCR引擎处理原始彩色图像
-                return denoised
+                return cv2.fastNlMeansDenoisingColored(adjusted, None, 10, 10, 7, 21)
             else:
                 # 图标匹配专用处理 (转为灰度)
                 gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
                 
+                if profile == 'fast':
+                    # 线性拉伸到完整灰度范围
+                    return cv2.normalize(gray, None, 0, 255, cv2.NORM_MINMAX)
+                
                 # 使用CLAHE增强对比度
                 clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
                 adjusted = clahe.apply(gray)
@@ -155,6 +297,10 @@ class TeammateRecognition:
                                  [-1,-1,-1]])
                 sharpened = cv2.filter2D(adjusted, -1, kernel)
                 
+                if profile == 'balanced':
+                    # 双边滤波保留图标边缘，代价远低于非局部均值降噪
+                    return cv2.bilateralFilter(sharpened, 5, 40, 40)
+                
                 # 轻度降噪
                 denoised = cv2.fastNlMeansDenoising(sharpened, None, h=10, templateWindowSize=7, searchWindowSize=21)
                 
@@ -169,6 +315,15 @@ class TeammateRecognition:
         """匹配职业图标
         Match profession icon
         """
+        return self.match_profession_icon_with_score(screenshot, icons)[0]
+
+    def match_profession_icon_with_score(self, screenshot: np.ndarray, icons: dict) -> Tuple[Optional[str], float]:
+        """匹配职业图标并返回匹配分数
+        Match profession icon and return its match score
+        
+        Returns:
+            (职业名称, 匹配分数)，未匹配时为 (None, 0.0)
+        """
         best_match = None
         highest_score = 0.70  # 稍微降低最低匹配阈值，增加匹配成功率
         match_results = {}  # 存储所有匹配结果 / Store all matching results
@@ -177,7 +332,7 @@ class TeammateRecognition:
             # 检查截图是否为空 / Check if the screenshot is empty
             if screenshot is None or screenshot.size == 0:
                 print("错误: 截图为空或无效 / Error: Screenshot is empty or invalid")
-                return None
+                return None, 0.0
 
             # 确保截图是BGR格式 / Ensure screenshot is in BGR format
             if len(screenshot.shape) == 3 and screenshot.shape[2] == 4:
@@ -186,22 +341,22 @@ class TeammateRecognition:
                 screenshot_bgr = screenshot # Already BGR
             else:
                 print(f"错误: 截图格式不正确，期望BGR或BGRA但得到 shape {screenshot.shape} / Error: Incorrect screenshot format, expected BGR or BGRA but got shape {screenshot.shape}")
-                return None
+                return None, 0.0
 
             if not icons:
                 print("错误: 没有加载任何职业图标模板 / Error: No profession icon templates loaded")
-                return None
+                return None, 0.0
                 
             # 预处理截图为灰度图 (不用于OCR) / Preprocess screenshot to grayscale (not for OCR)
             # 使用 for_ocr=False 调用更新后的 preprocess_image / Call updated preprocess_image with for_ocr=False
             processed_screenshot_gray = self.preprocess_image(screenshot_bgr, for_ocr=False)
             if processed_screenshot_gray is None or processed_screenshot_gray.size == 0:
                 print("错误: 截图预处理失败 / Error: Screenshot preprocessing failed")
-                return None
+                return None, 0.0
             # 确保预处理后是灰度图 / Ensure it's grayscale after preprocessing
             if len(processed_screenshot_gray.shape) != 2:
                  print(f"错误: 预处理后的截图不是灰度图, shape: {processed_screenshot_gray.shape} / Error: Preprocessed screenshot is not grayscale, shape: {processed_screenshot_gray.shape}")
-                 return None
+                 return None, 0.0
             
             # 创建多种尺寸的截图用于匹配 / Create multiple sizes of the screenshot for matching
             scales = [0.8, 0.9, 1.0, 1.1, 1.2]  # 缩放比例 / Scaling factors
@@ -224,7 +379,7 @@ class TeammateRecognition:
 
             if not scaled_screenshots:
                 print("错误: 未能成功生成任何缩放后的截图 / Error: Failed to generate any scaled screenshots")
-                return None
+                return None, 0.0
 
             # 预处理图标模板为灰度图 / Preprocess icon templates to grayscale
             processed_icons_gray = {}
@@ -243,7 +398,7 @@ class TeammateRecognition:
 
             if not processed_icons_gray:
                 print("错误: 未能成功预处理任何图标模板 / Error: Failed to preprocess any icon templates")
-                return None
+                return None, 0.0
 
             # --- 开始匹配 --- / --- Start Matching --- 
             for profession, template_gray in processed_icons_gray.items():
@@ -308,23 +463,46 @@ class TeammateRecognition:
             import traceback
             traceback.print_exc()
 
-        return best_match
+        return best_match, (highest_score if best_match else 0.0)
 
     def create_selection_box(self):
         """创建屏幕区域选择框"""
         from 选择框 import TransparentSelectionBox
         return TransparentSelectionBox()
 
+    def resolve_name(self, raw_name: str) -> Tuple[str, Optional[float]]:
+        """将OCR名称吸附到最近的已知队友名称
+        Snap an OCR name to the nearest known teammate name
+        
+        Returns:
+            (名称, 吸附置信度)，不在已知名称范围内时置信度为None
+        """
+        return self.name_index.resolve(raw_name)
+
+    def remember_name(self, name: str):
+        """将确认的队友名称加入已知名称索引"""
+        self.name_index.add(name)
+
     def extract_name(self, screenshot: np.ndarray) -> str:
         """提取玩家名称
         Extract player name using OCR
         """
+        return self.extract_name_with_confidence(screenshot)[0]
+
+    def extract_name_with_confidence(self, screenshot: np.ndarray) -> Tuple[str, float]:
+        """提取玩家名称及其置信度
+        Extract player name using OCR, snapped to known teammate names
+        
+        Returns:
+            (名称, 置信度)。置信度为OCR置信度，吸附到已知名称时再乘以吸附置信度；未识别时为0
+        """
         name = '未识别' # Default value
+        name_confidence = 0.0
         try:
             # 检查截图 / Check screenshot
             if screenshot is None or screenshot.size == 0:
                 print("错误: 输入截图无效 / Error: Invalid input screenshot")
-                return name
+                return name, name_confidence
                 
             # 确保是BGR格式 / Ensure BGR format
             if len(screenshot.shape) == 3 and screenshot.shape[2] == 4:
@@ -333,7 +511,7 @@ class TeammateRecognition:
                 screenshot_bgr = screenshot
             else:
                 print(f"错误: 输入截图格式不正确，期望BGR或BGRA但得到 shape {screenshot.shape} / Error: Incorrect input screenshot format, expected BGR or BGRA but got shape {screenshot.shape}")
-                return name
+                return name, name_confidence
 
             # 转换为RGB格式(PaddleOCR使用RGB格式)
             rgb_image = cv2.cvtColor(screenshot_bgr, cv2.COLOR_BGR2RGB)
@@ -345,7 +523,7 @@ class TeammateRecognition:
                 for attempt in range(3): # 增加到3次重试
                     try:
                         # 直接传入RGB图像，不做任何预处理
-                        ocr_results = self.ocr.ocr(rgb_image, cls=True)
+                        ocr_results = self.run_ocr(rgb_image)
                         
                         # 检查结果是否有效 
                         if ocr_results and isinstance(ocr_results, list):
@@ -413,8 +591,12 @@ class TeammateRecognition:
                             # 允许中文、英文、数字、下划线
                             cleaned_name = re.sub(r'[^\u4e00-\u9fa5a-zA-Z0-9_]', '', detected_name)
                             if cleaned_name: # 确保清理后名称不为空
-                                name = cleaned_name
-                                print(f"OCR识别到的名称: {name} (置信度 / Confidence: {confidence:.2f})")
+                                # 吸附到已知队友名称，避免单个字符误识别产生新队员
+                                name, snap_confidence = self.resolve_name(cleaned_name)
+                                name_confidence = float(confidence)
+                                if snap_confidence is not None:
+                                    name_confidence *= snap_confidence
+                                print(f"OCR识别到的名称: {name} (置信度 / Confidence: {name_confidence:.2f})")
                             else:
                                 print(f"名称 '{detected_name}' 清理后为空，忽略 / Name '{detected_name}' became empty after cleaning, ignoring")
                         else:
@@ -432,13 +614,168 @@ class TeammateRecognition:
                 import traceback
                 traceback.print_exc()
 
-            return name
+            return name, name_confidence
 
         except Exception as e:
             print(f"提取名称时出错: {str(e)} / Error extracting name: {str(e)}")
             import traceback
             traceback.print_exc()
-            return name # 返回默认值 '未识别' / Return default value '未识别'
+            return name, name_confidence # 返回默认值 '未识别' / Return default value '未识别'
+
+    def recognize_teammate(self, sample_images: list, icons: dict) -> dict:
+        """识别单个队友，对多张采样图像进行顺序投票
+        Recognize one teammate with sequential voting over several sample images
+        
+        按顺序处理采样图像，名称和职业各自独立判定：当某个结果的置信度达到阈值且没有分歧，
+        或领先票数达到 vote_margin 时即视为确定，之后不再对该项进行识别。
+        只有在投票出现分歧或置信度不足时才会继续使用后续采样，因此通常只需要一次OCR。
+        
+        Args:
+            sample_images: 同一区域预先截取的多张截图 (BGR格式)
+            icons: 职业图标模板
+            
+        Returns:
+            包含 name、profession、name_votes、profession_votes、samples_used 的字典，名称未识别时为'未识别'
+        """
+        profession_votes = {}  # 职业投票结果
+        name_votes = {}        # 名称投票结果
+        profession_scores = {}  # 每个职业的最高匹配分数
+        name_scores = {}        # 每个名称的最高置信度
+        name_settled = False
+        profession_settled = False
+        samples_used = 0
+        
+        for sample_img in sample_images:
+            if name_settled and profession_settled:
+                break
+            samples_used += 1
+            
+            # 识别职业
+            if not profession_settled:
+                profession, score = self.match_profession_icon_with_score(sample_img, icons)
+                if profession:
+                    profession_votes[profession] = profession_votes.get(profession, 0) + 1
+                    profession_scores[profession] = max(profession_scores.get(profession, 0.0), score)
+                profession_settled = self._vote_settled(profession_votes, profession_scores,
+                                                        self.profession_confidence_threshold)
+            
+            # 识别名称 - 直接将原始图像传递给OCR，不进行额外的预处理
+            if not name_settled:
+                name, confidence = self.extract_name_with_confidence(sample_img)
+                if name and name != '未识别':
+                    name_votes[name] = name_votes.get(name, 0) + 1
+                    # 不在已知名称中的新名称无法校验，需要更多采样确认（至少 unknown_name_min_votes 票一致）
+                    if name not in self.name_index:
+                        confidence *= self.unknown_name_confidence_factor
+                    name_scores[name] = max(name_scores.get(name, 0.0), confidence)
+                name_settled = self._vote_settled(name_votes, name_scores,
+                                                  self.name_confidence_threshold, self.name_index)
+        
+        print(f"队友识别使用了 {samples_used}/{len(sample_images)} 个采样")
+        
+        # 根据投票结果确定最终识别结果
+        final_profession = None
+        if profession_votes:
+            final_profession = max(profession_votes.items(), key=lambda x: x[1])[0]
+        
+        final_name = '未识别'
+        if name_votes:
+            # 优先选择汉字名称，即使其投票数较少
+            import re
+            chinese_names = {name: votes for name, votes in name_votes.items() 
+                            if re.search(r'[\u4e00-\u9fff]', name)}
+            
+            if chinese_names:
+                # 如果有汉字名称，选择投票数最高的汉字名称
+                final_name = max(chinese_names.items(), key=lambda x: x[1])[0]
+                print(f"选择汉字名称: {final_name} (票数: {chinese_names[final_name]})")
+            else:
+                # 如果没有汉字名称，选择投票数最高的名称
+                final_name = max(name_votes.items(), key=lambda x: x[1])[0]
+                print(f"无汉字名称可用，选择: {final_name} (票数: {name_votes[final_name]})")
+        
+        return {
+            'name': final_name,
+            'profession': final_profession,
+            'name_votes': name_votes,
+            'profession_votes': profession_votes,
+            'samples_used': samples_used
+        }
+
+    def _vote_settled(self, votes: dict, scores: dict, confidence_threshold: float, known=None) -> bool:
+        """判断顺序投票是否已经可以停止
+        
+        Args:
+            votes: {结果: 票数}
+            scores: {结果: 最高置信度}
+            confidence_threshold: 无分歧时单票即可确定所需的置信度
+            known: 已知结果（名称索引）；领先结果不在其中时，无分歧也要至少 unknown_name_min_votes 票才能确定
+            
+        Returns:
+            领先结果没有分歧且置信度达到阈值，或领先票数达到 vote_margin 时返回True
+        """
+        if not votes:
+            return False
+        ranked = sorted(votes.items(), key=lambda x: x[1], reverse=True)
+        leader, leader_votes = ranked[0]
+        runner_up_votes = ranked[1][1] if len(ranked) > 1 else 0
+        min_votes = 1 if known is None or leader in known else self.unknown_name_min_votes
+        if runner_up_votes == 0 and leader_votes >= min_votes and scores.get(leader, 0.0) >= confidence_threshold:
+            return True
+        return leader_votes - runner_up_votes >= self.vote_margin
+
+    def recognize_many(self, tasks: list, icons: dict, on_result=None, on_idle=None, max_workers: Optional[int] = None,
+                       should_stop=None) -> dict:
+        """使用线程池并行识别多个队友，每个血条一个任务
+        Recognize several teammates in parallel, one task per bar
+        
+        图标匹配等OpenCV操作和PaddleOCR推理都会释放GIL，每个工作线程使用自己的OCR实例，
+        因此整队识别的耗时随可用核心数下降。线程池在多次识别之间常驻，OCR实例只创建一次。
+        每个任务完成后立即在调用线程中回调 on_result，结果按完成顺序返回。
+        
+        Args:
+            tasks: [(key, sample_images), ...]
+            icons: 职业图标模板
+            on_result: 单个任务完成时的回调 on_result(key, result)，result为None表示识别出错
+            on_idle: 等待结果期间周期性调用的回调（如 QApplication.processEvents）
+            max_workers: 工作线程数，默认使用 self.max_workers
+            should_stop: 返回True时取消尚未开始的任务并立即返回已完成的结果
+            
+        Returns:
+            {key: result} 字典
+        """
+        results = {}
+        if not tasks:
+            return results
+        
+        # 线程池按配置的线程数创建（任务少时只启动需要的线程），不随每次的任务数重建
+        workers = max(1, max_workers or self.max_workers)
+        print(f"开始并行识别 {len(tasks)} 个队友，工作线程数: {min(workers, len(tasks))}")
+        
+        executor = self._get_executor(workers)
+        pending = {executor.submit(self.recognize_teammate, images, icons): key for key, images in tasks}
+        while pending:
+            if should_stop and should_stop():
+                # 取消尚未开始的任务，正在执行的任务结束后丢弃其结果
+                for future in pending:
+                    future.cancel()
+                print(f"识别已取消，{len(pending)} 个队友未完成识别")
+                break
+            done, _ = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"识别任务 {key} 出错: {str(e)}")
+                    result = None
+                results[key] = result
+                if on_result:
+                    on_result(key, result)
+            if not done and on_idle:
+                on_idle()
+        
+        return results
 
     def filter_text(self, text, valid_texts=None):
         """过滤和处理OCR识别的文本
@@ -454,10 +791,11 @@ class TeammateRecognition:
                 valid_texts.append(filtered_text)
                 print(f"提取文本: {filtered_text}")
 
-        # 返回第一个非空的文本
+        # 返回第一个非空的文本，吸附到已知队友名称
         if valid_texts:
-            print(f"最终识别结果: {valid_texts[0]}")
-            return valid_texts[0]
+            final_text = self.resolve_name(valid_texts[0])[0]
+            print(f"最终识别结果: {final_text}")
+            return final_text
 
         print("警告: 未找到有效的中英文文本")
         return '未识别'
@@ -719,121 +1057,107 @@ class RecognitionUI(QWidget):
         profession_icons = self.recognition.load_profession_icons()
         
         results = []
-        success_count = 0
+        success_count = [0]  # 使用列表包装计数，使其可以在嵌套函数中修改
         
         # 使用TeammateRecognition类中设置的采样次数
         num_samples = self.recognition.num_samples  # 使用用户设置的采样次数
         
-        # 逐个识别队友
-        for teammate in self.pending_teammates:
-            if teammate.get('recognized', False):
-                continue  # 跳过已识别的队友
+        # 先在UI线程中为每个队友截取全部采样图像（屏幕截图必须在UI线程中进行）
+        tasks = []
+        for teammate in unrecognized:
+            index = teammate['index']
+            self.result_label.setText(f'正在截取队友 #{index} 的采样图像...')
+            QApplication.processEvents()
+            tasks.append((index, self.capture_samples(teammate, num_samples)))
+        
+        teammates_by_index = {t['index']: t for t in unrecognized}
+        completed = [0]  # 已完成识别的队友数量
+        recognized_names = []  # 整批识别结束后再加入已知名称，识别期间名称索引不变
+        
+        def on_result(index, recognition_result):
+            """单个队友识别完成后立即处理结果"""
+            teammate = teammates_by_index[index]
+            completed[0] += 1
+            self.result_label.setText(f'已完成 {completed[0]}/{len(unrecognized)} 个队友的识别...')
+            QApplication.processEvents()
             
-            try:
-                img_array = teammate['image']
-                index = teammate['index']
-                rect = teammate['rect']
-                
-                self.result_label.setText(f'正在识别队友 #{index}...')
-                QApplication.processEvents()
-                
-                # 多次采样识别
-                profession_votes = {}  # 职业投票结果
-                name_votes = {}        # 名称投票结果
-                
-                # 创建多个采样图像
-                sample_images = []
-                
-                # 原始图像
-                sample_images.append(img_array)
-                
-                # 重新截取屏幕区域（如果可能）
-                try:
-                    for i in range(num_samples - 1):
-                        # 使用选择框的get_selected_image方法获取新的截图
-                        screen = QApplication.primaryScreen()
-                        screenshot = screen.grabWindow(0, rect.x(), rect.y(), rect.width(), rect.height())
-                        if not screenshot.isNull():
-                            # 转换为OpenCV格式
-                            img = screenshot.toImage()
-                            buffer = img.bits().tobytes()
-                            new_img_array = np.frombuffer(buffer, dtype=np.uint8).reshape((img.height(), img.width(), 4))
-                            # 转换为BGR格式
-                            new_img_array = cv2.cvtColor(new_img_array, cv2.COLOR_RGBA2BGR)
-                            sample_images.append(new_img_array)
-                except Exception as e:
-                    print(f"获取额外采样图像失败: {str(e)}")
-                
-                # 对每个采样图像进行识别
-                for i, sample_img in enumerate(sample_images):
-                    self.result_label.setText(f'正在识别队友 #{index} (采样 {i+1}/{len(sample_images)})...')
-                    QApplication.processEvents()
-                    
-                    # 识别职业
-                    profession = self.recognition.match_profession_icon(sample_img, profession_icons)
-                    if profession:
-                        profession_votes[profession] = profession_votes.get(profession, 0) + 1
-                    
-                    # 识别名称 - 直接将原始图像传递给extract_name，不进行额外的预处理
-                    name = self.recognition.extract_name(sample_img)
-                    if name and name != '未识别':
-                        name_votes[name] = name_votes.get(name, 0) + 1
-                
-                # 根据投票结果确定最终识别结果
-                final_profession = None
-                if profession_votes:
-                    final_profession = max(profession_votes.items(), key=lambda x: x[1])[0]
-                
-                final_name = '未识别'
-                if name_votes:
-                    # 优先选择汉字名称，即使其投票数较少
-                    import re
-                    chinese_names = {name: votes for name, votes in name_votes.items() 
-                                    if re.search(r'[\u4e00-\u9fff]', name)}
-                    
-                    if chinese_names:
-                        # 如果有汉字名称，选择投票数最高的汉字名称
-                        final_name = max(chinese_names.items(), key=lambda x: x[1])[0]
-                        print(f"选择汉字名称: {final_name} (票数: {chinese_names[final_name]})")
-                    else:
-                        # 如果没有汉字名称，选择投票数最高的名称
-                        final_name = max(name_votes.items(), key=lambda x: x[1])[0]
-                        print(f"无汉字名称可用，选择: {final_name} (票数: {name_votes[final_name]})")
-                
-                # 记录识别结果
-                teammate['recognized'] = True
-                teammate['name'] = final_name
-                teammate['profession'] = final_profession
-                
-                # 保存配置文件
-                if final_name != '未识别':
-                    self.save_teammate_config(final_name, final_profession, teammate['rect'])
-                    success_count += 1
-                    results.append(f"队友 #{index}: 名称={final_name}, 职业={final_profession or '未识别'}")
-                    # 显示投票详情
-                    vote_details = f"  - 名称投票: {name_votes}\n  - 职业投票: {profession_votes}"
-                    results.append(vote_details)
-                else:
-                    results.append(f"队友 #{index}: 识别失败，未能识别名称")
-                
-            except Exception as e:
-                results.append(f"队友 #{index}: 识别出错 - {str(e)}")
-                print(f"识别队友 #{index} 时出错: {str(e)}")
+            if recognition_result is None:
+                results.append(f"队友 #{index}: 识别出错")
+                return
+            
+            final_name = recognition_result['name']
+            final_profession = recognition_result['profession']
+            
+            # 记录识别结果
+            teammate['recognized'] = True
+            teammate['name'] = final_name
+            teammate['profession'] = final_profession
+            
+            # 保存配置文件
+            if final_name != '未识别':
+                self.save_teammate_config(final_name, final_profession, teammate['rect'])
+                recognized_names.append(final_name)
+                success_count[0] += 1
+                results.append(f"队友 #{index}: 名称={final_name}, 职业={final_profession or '未识别'}")
+                # 显示投票详情
+                vote_details = (f"  - 名称投票: {recognition_result['name_votes']}\n"
+                                f"  - 职业投票: {recognition_result['profession_votes']}\n"
+                                f"  - 使用采样: {recognition_result['samples_used']}/{num_samples}")
+                results.append(vote_details)
+            else:
+                results.append(f"队友 #{index}: 识别失败，未能识别名称")
+        
+        self.result_label.setText(f'正在并行识别 {len(tasks)} 个队友...')
+        QApplication.processEvents()
+        try:
+            self.recognition.recognize_many(tasks, profession_icons, on_result=on_result,
+                                            on_idle=QApplication.processEvents)
+        except Exception as e:
+            results.append(f"批量识别出错 - {str(e)}")
+            print(f"批量识别队友时出错: {str(e)}")
+        for name in recognized_names:
+            self.recognition.remember_name(name)
         
         # 更新待识别队友列表显示
         self.update_pending_list()
         
         # 显示识别结果
-        result_text = f"批量识别完成，成功识别 {success_count}/{len(unrecognized)} 个队友\n\n识别结果:\n"
+        result_text = f"批量识别完成，成功识别 {success_count[0]}/{len(unrecognized)} 个队友\n\n识别结果:\n"
         result_text += "\n".join(results)
         self.result_label.setText(result_text)
     
+    def capture_samples(self, teammate, num_samples):
+        """获取队友区域的采样图像：添加时的原始截图加上重新截取的屏幕区域
+        
+        参数:
+            teammate: 待识别队友字典，包含 rect 和 image
+            num_samples: 采样总数
+            
+        返回:
+            list: BGR格式的采样图像列表
+        """
+        sample_images = [teammate['image']]
+        rect = teammate['rect']
+        try:
+            screen = QApplication.primaryScreen()
+            for i in range(num_samples - 1):
+                screenshot = screen.grabWindow(0, rect.x(), rect.y(), rect.width(), rect.height())
+                if not screenshot.isNull():
+                    # 转换为OpenCV格式
+                    img = screenshot.toImage()
+                    buffer = img.bits().tobytes()
+                    new_img_array = np.frombuffer(buffer, dtype=np.uint8).reshape((img.height(), img.width(), 4))
+                    # 转换为BGR格式
+                    sample_images.append(cv2.cvtColor(new_img_array, cv2.COLOR_RGBA2BGR))
+        except Exception as e:
+            print(f"获取额外采样图像失败: {str(e)}")
+        return sample_images
+
     def save_teammate_config(self, name, profession, rect):
-        """保存队友配置文件"""
+        """保存队友配置到队员配置存储"""
         try:
-            # 为队员创建单独的配置文件
-            config_dir = os.path.dirname(os.path.abspath(__file__))
-            config_file = os.path.join(config_dir, f"{name}_config.json")
+            from member_store import get_member_store
+            store = get_member_store()
             
             # 创建配置数据结构，使用选择区域作为默认血条位置
             config_data = {
@@ -852,41 +1176,21 @@ class RecognitionUI(QWidget):
                 }
             }
             
-            # 如果文件已存在，读取现有配置中的坐标和颜色信息
-            if os.path.exists(config_file) and os.path.getsize(config_file) > 0:
-                try:
-                    with open(config_file, 'r', encoding='utf-8') as f:
-                        existing_config = json.load(f)
-                        # 保留现有的血条坐标和颜色设置
-                        if 'health_bar' in existing_config:
-                            if 'coordinates' in existing_config['health_bar']:
-                                config_data['health_bar']['coordinates'] = existing_config['health_bar']['coordinates']
-                            if 'color' in existing_config['health_bar']:
-                                config_data['health_bar']['color'] = existing_config['health_bar']['color']
-                except json.JSONDecodeError:
-                    print(f'配置文件 {config_file} 格式错误，将使用默认设置')
-            
-            # 使用临时文件保存配置
-            temp_file = config_file + '.tmp'
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, ensure_ascii=False, indent=4)
-            
-            # 如果写入成功，替换原配置文件
-            if os.path.exists(config_file):
-                os.remove(config_file)
-            os.rename(temp_file, config_file)
-            
-            print(f'已将识别结果保存到配置文件: {config_file}')
+            # 如果已有该队友的配置，保留其中的血条坐标和颜色信息
+            existing_config = store.get(name)
+            if existing_config and 'health_bar' in existing_config:
+                if 'coordinates' in existing_config['health_bar']:
+                    config_data['health_bar']['coordinates'] = existing_config['health_bar']['coordinates']
+                if 'color' in existing_config['health_bar']:
+                    config_data['health_bar']['color'] = existing_config['health_bar']['color']
+            
+            if not store.put(name, config_data):
+                return False
+            print(f'已将识别结果保存到队员配置存储: {name}')
             return True
                 
         except Exception as e:
-            print(f'保存配置文件时出错: {str(e)}')
-            # 如果临时文件存在，清理它
-            if 'temp_file' in locals() and os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
+            print(f'保存配置时出错: {str(e)}')
             return False
 
 def main():
@@ -0,0 +1,189 @@
+import heapq
+import time
+from collections import deque
+
+from config_defaults import TRIAGE_SETTINGS
+from member_status import UNMEASURED
+
+
+def load_triage_settings():
+    """读取分诊设置，配置中缺少的项使用默认值
+
+    返回的是配置管理器的只读视图，配置文件被修改后自动更新
+    """
+    try:
+        from config_manager import get_config
+        return get_config().view('triage', TRIAGE_SETTINGS)
+    except Exception as e:
+        print(f"加载分诊设置失败: {str(e)}")
+        return dict(TRIAGE_SETTINGS)
+
+
+class MemberTrend:
+    """单个队员的短期血量历史与趋势估计
+
+    属性:
+        history (deque): [(时间, 血量百分比), ...]，只保留 history_seconds 内的记录
+        damage_rate (float): 血量变化速度（百分比/秒），负值表示掉血
+        time_to_zero (float): 按当前掉血速度预计的阵亡时间（秒），不在掉血时为无穷大
+    """
+
+    def __init__(self, history_seconds):
+        self.history_seconds = history_seconds
+        self.history = deque()
+        self.damage_rate = 0.0
+        self.time_to_zero = float('inf')
+
+    def add(self, timestamp, hp):
+        """记录一次血量并更新趋势"""
+        self.history.append((timestamp, hp))
+        while self.history and timestamp - self.history[0][0] > self.history_seconds:
+            self.history.popleft()
+        self.damage_rate = self._slope()
+        if self.damage_rate < 0 and hp > 0:
+            self.time_to_zero = hp / -self.damage_rate
+        else:
+            self.time_to_zero = float('inf')
+
+    def _slope(self):
+        """用最小二乘拟合历史记录的斜率，比只看最近两次更抗噪"""
+        n = len(self.history)
+        if n < 2:
+            return 0.0
+        t0 = self.history[0][0]
+        mean_t = sum(t - t0 for t, _ in self.history) / n
+        mean_hp = sum(hp for _, hp in self.history) / n
+        var = sum((t - t0 - mean_t) ** 2 for t, _ in self.history)
+        if var <= 0:
+            return 0.0
+        cov = sum((t - t0 - mean_t) * (hp - mean_hp) for t, hp in self.history)
+        return cov / var
+
+    def projected_hp(self, lookahead):
+        """预测 lookahead 秒后的血量（只考虑掉血，不预测回血）"""
+        if not self.history:
+            return 100.0
+        hp = self.history[-1][1]
+        return max(0.0, hp + min(self.damage_rate, 0.0) * lookahead)
+
+
+class TriageEngine:
+    """按预测紧急程度对队员排序的分诊引擎
+
+    每个队员保留短期血量历史，估计掉血速度和预计阵亡时间。
+    紧急度分数 = 预测 lookahead 秒后的血量 / 职业权重（priority_roles 中的职业权重更高），
+    单独设置的优先职业再减去固定加成；分数越小越紧急。
+    分数放在小根堆中，每次更新只压入新条目，旧条目在取出时按版本号丢弃（惰性删除），
+    因此每个tick的更新代价为 O(log n)。
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or load_triage_settings()
+        self.trends = {}
+        self.scores = {}
+        self.heap = []
+        self.versions = {}
+        self.priority_roles = []
+        self.priority_profession = None
+
+    def set_priorities(self, priority_roles=None, priority_profession=None):
+        """设置优先职业，变更后需要重新计算所有分数"""
+        self.priority_roles = list(priority_roles or [])
+        self.priority_profession = priority_profession
+
+    def role_weight(self, member):
+        """队员的职业权重"""
+        if member.profession in self.priority_roles:
+            return self.settings['role_weight']
+        return 1.0
+
+    def score(self, member, trend):
+        """计算紧急度分数，值越小越紧急"""
+        projected = trend.projected_hp(self.settings['lookahead_seconds'])
+        score = projected / self.role_weight(member)
+        # 如果该队员的职业是当前设置的单个优先职业，则给予分数加成（降低分数以提高优先级）
+        if self.priority_profession and member.profession == self.priority_profession:
+            score -= self.settings['priority_profession_bonus']
+        return score
+
+    def update(self, member, timestamp=None):
+        """用队员的最新血量更新趋势和堆中的分数"""
+        if timestamp is None:
+            timestamp = time.time()
+        trend = self.trends.get(member.name)
+        if trend is None:
+            trend = self.trends[member.name] = MemberTrend(self.settings['history_seconds'])
+        if not member.is_alive:
+            # 阵亡的队员清空历史，复活后重新估计
+            trend.history.clear()
+        if member.status in UNMEASURED:
+            # 超出范围或无法识别时血量是沿用的旧值，不计入历史，以免把掉血速度拉平
+            return
+        trend.add(timestamp, member.health_percentage)
+        member.damage_rate = trend.damage_rate
+
+        score = self.score(member, trend)
+        self.scores[member.name] = score
+        version = self.versions.get(member.name, 0) + 1
+        self.versions[member.name] = version
+        heapq.heappush(self.heap, (score, trend.time_to_zero, version, member.name))
+
+        # 过期条目过多时重建堆，避免无限增长
+        if len(self.heap) > 4 * len(self.versions) + 16:
+            self.heap = [(self.scores[name], self.trends[name].time_to_zero, self.versions[name], name)
+                         for name in self.versions]
+            heapq.heapify(self.heap)
+
+    def update_all(self, members, timestamp=None):
+        """更新所有队员，并移除已不在队伍中的队员"""
+        if timestamp is None:
+            timestamp = time.time()
+        names = set()
+        for member in members:
+            names.add(member.name)
+            self.update(member, timestamp)
+        for name in list(self.versions):
+            if name not in names:
+                self.remove(name)
+
+    def remove(self, name):
+        """移除队员，其在堆中的条目会在取出时被丢弃"""
+        self.versions.pop(name, None)
+        self.trends.pop(name, None)
+        self.scores.pop(name, None)
+
+    def select(self, members, predicate):
+        """取出满足条件且最紧急的队员
+
+        参数:
+            members (list): 当前队员列表
+            predicate (callable): 队员是否可以作为目标
+
+        返回:
+            TeamMember: 最紧急的目标，没有时返回None
+        """
+        by_name = {member.name: member for member in members}
+        skipped = []
+        target = None
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            _, _, version, name = entry
+            if self.versions.get(name) != version:
+                continue  # 过期条目
+            skipped.append(entry)
+            member = by_name.get(name)
+            if member is not None and predicate(member):
+                target = member
+                break
+        for entry in skipped:
+            heapq.heappush(self.heap, entry)
+        return target
+
+    def describe(self, member):
+        """返回队员的趋势说明，用于日志"""
+        trend = self.trends.get(member.name)
+        if trend is None:
+            return ""
+        if trend.time_to_zero == float('inf'):
+            return f"掉血速度 {trend.damage_rate:+.1f}%/s"
+        return f"掉血速度 {trend.damage_rate:+.1f}%/s，预计 {trend.time_to_zero:.1f} 秒后阵亡"